@@ -0,0 +1 @@
+# benchmark suite: python -m benchmarks.run
@@ -0,0 +1,156 @@
+import csv
+import random
+from typing import Any, Dict, List, Sequence
+
+from src.records import REQUIREMENT_FIELDS
+
+# key and type spellings the schema extractor recognises (see schema_loader)
+ALIAS_KEYS = ("field_key", "fieldKey", "name", "key")
+ALIAS_TYPES = ("type", "fieldType", "component")
+FIELD_TYPES = ("text", "email", "number", "date", "select", "radio", "checkbox", "textarea")
+CHOICE_TYPES = ("select", "radio")
+WORDS = (
+    "account", "address", "amount", "billing", "birth", "city", "company", "contact", "country",
+    "customer", "delivery", "email", "employer", "first", "holder", "income", "last", "line",
+    "mobile", "number", "order", "passport", "payment", "phone", "postal", "primary", "reference",
+    "region", "secondary", "shipping", "status", "street", "tax", "title", "zip",
+)
+# missing requirements are built from letters no generated key uses in this pattern
+_MISSING_LETTERS = "qxzjvkw"
+
+
+def field_keys(count: int, seed: int = 0) -> List[str]:
+    """``count`` distinct camelCase keys such as ``billingCityNumber17``."""
+    rnd = random.Random(seed)
+    return [
+        rnd.choice(WORDS) + "".join(w.capitalize() for w in rnd.sample(WORDS, 2)) + str(i)
+        for i in range(count)
+    ]
+
+
+def generate_schema(
+    fields: int,
+    depth: int = 2,
+    breadth: int = 4,
+    options: int = 10,
+    aliases: Sequence[str] = ALIAS_KEYS,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """A form schema with ``fields`` fields spread over nested groups.
+
+    Groups nest ``depth`` levels deep with ``breadth`` children each; fields
+    sit in the innermost groups. Field nodes rotate through the ``aliases``
+    key spellings and the type spellings, choice fields carry ``options``
+    options and text fields carry length validations.
+    """
+    rnd = random.Random(seed)
+    nodes = []
+    for i, key in enumerate(field_keys(fields, seed)):
+        ftype = rnd.choice(FIELD_TYPES)
+        node: Dict[str, Any] = {
+            aliases[i % len(aliases)]: key,
+            ALIAS_TYPES[i % len(ALIAS_TYPES)]: ftype,
+            "required": rnd.random() < 0.4,
+            "label": key[:1].upper() + key[1:],
+        }
+        if ftype in CHOICE_TYPES:
+            node["options"] = [f"option {j}" for j in range(options)]
+        elif ftype in ("text", "textarea"):
+            node["validations"] = {"minLength": 1, "maxLength": 20 + i % 200}
+        nodes.append(node)
+
+    leaves: List[Dict[str, Any]] = []
+
+    def group(level: int, path: str) -> Dict[str, Any]:
+        if level == depth:
+            leaf = {"title": f"Group {path}", "fields": []}
+            leaves.append(leaf)
+            return leaf
+        return {"title": f"Group {path}", "groups": [group(level + 1, f"{path}.{b}") for b in range(breadth)]}
+
+    root = group(0, "0")
+    for i, node in enumerate(nodes):
+        leaves[i % len(leaves)]["fields"].append(node)
+    return {"form": root}
+
+
+def _typo(key: str, rnd: random.Random) -> str:
+    # one dropped or swapped letter inside the word part keeps the key within the fuzzy threshold
+    word_end = len(key.rstrip("0123456789"))
+    i = rnd.randrange(1, word_end - 2)
+    if rnd.random() < 0.5:
+        return key[:i] + key[i + 1:]
+    return key[:i] + key[i + 1] + key[i] + key[i + 2:]
+
+
+def generate_requirements(
+    fields: List[Dict[str, Any]],
+    rows: int,
+    exact: float = 0.7,
+    fuzzy: float = 0.2,
+    missing: float = 0.1,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """Requirement rows for extracted schema ``fields`` in the given proportions.
+
+    ``exact`` rows use a schema key with its type, required flag, options and
+    lengths (so they match), ``fuzzy`` rows a key with one typo (a
+    POSSIBLE_MATCH) and ``missing`` rows a key that is far from every schema
+    key. Rows are shuffled.
+    """
+    total = exact + fuzzy + missing
+    if total <= 0 or not fields:
+        raise ValueError("need schema fields and a positive ratio")
+    rnd = random.Random(seed)
+    n_fuzzy = round(rows * fuzzy / total)
+    n_missing = round(rows * missing / total)
+    kinds = ["fuzzy"] * n_fuzzy + ["missing"] * n_missing + ["exact"] * (rows - n_fuzzy - n_missing)
+    rnd.shuffle(kinds)
+    keys = {f["field_key"].lower() for f in fields}
+
+    out = []
+    for i, kind in enumerate(kinds):
+        field = fields[rnd.randrange(len(fields))]
+        row = dict.fromkeys(REQUIREMENT_FIELDS)
+        row["req_id"] = f"R{i}"
+        if kind == "missing":
+            row["field_key"] = "".join(rnd.choice(_MISSING_LETTERS) for _ in range(10)) + str(i)
+            row["type"] = rnd.choice(FIELD_TYPES)
+            row["required"] = False
+        else:
+            key = field["field_key"]
+            if kind == "fuzzy":
+                key = _typo(key, rnd)
+                while key.lower() in keys:
+                    key = _typo(field["field_key"], rnd)
+            validations = field.get("validations") or {}
+            row.update(
+                field_key=key,
+                type=field.get("type"),
+                required=bool(field.get("required")),
+                label=field.get("label"),
+                min_len=validations.get("minLength"),
+                max_len=validations.get("maxLength"),
+                options=field.get("options"),
+            )
+        out.append(row)
+    return out
+
+
+def write_requirements_csv(rows: List[Dict[str, Any]], path: str) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(REQUIREMENT_FIELDS)
+        for row in rows:
+            values = []
+            for name in REQUIREMENT_FIELDS:
+                v = row.get(name)
+                if isinstance(v, list):
+                    v = ", ".join(map(str, v))
+                elif isinstance(v, bool):
+                    v = "yes" if v else "no"
+                values.append("" if v is None else v)
+            writer.writerow(values)
+
+
+__all__ = ["generate_schema", "generate_requirements", "write_requirements_csv", "field_keys", "ALIAS_KEYS"]
@@ -0,0 +1,159 @@
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from src.matcher import SchemaIndex, compare_all, compare_requirement_to_schema
+from src.report_visuals import generate_report_visuals
+from src.report_writer import REPORT_FORMATS, write_report
+from src.requirement_loader import load_requirements
+from src.schema_loader import extract_fields
+
+from .generators import generate_requirements, generate_schema, write_requirements_csv
+
+LOG = logging.getLogger(__name__)
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+# a stage regresses when it is this much slower than its baseline...
+REGRESSION_THRESHOLD = 0.25
+# ...and slower by at least this many seconds, so timer noise on tiny stages is ignored
+MIN_REGRESSION_SECONDS = 0.01
+# requirements compared one by one through compare_requirement_to_schema
+COMPARE_BATCH = 500
+
+SCALES: Dict[str, Dict[str, Any]] = {
+    "small": {"fields": 500, "depth": 2, "breadth": 4, "options": 20, "rows": 1_000},
+    "medium": {"fields": 5_000, "depth": 3, "breadth": 6, "options": 100, "rows": 10_000},
+    "large": {"fields": 20_000, "depth": 4, "breadth": 8, "options": 500, "rows": 50_000},
+}
+STAGES = (
+    "extract_fields",
+    "load_requirements",
+    "compare_requirement_to_schema",
+    "compare_all",
+    "write_report",
+    "generate_report_visuals",
+)
+
+
+def _best_of(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_scale(scale: str, workdir: Path, repeat: int = 3, report_format: str = "excel", ratios: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Time every stage at ``scale`` on generated data; returns the best of ``repeat`` runs per stage."""
+    cfg = SCALES[scale]
+    schema = generate_schema(cfg["fields"], depth=cfg["depth"], breadth=cfg["breadth"], options=cfg["options"])
+    fields = extract_fields(schema)
+    req_path = workdir / f"{scale}_requirements.csv"
+    write_requirements_csv(generate_requirements(fields, cfg["rows"], **(ratios or {})), str(req_path))
+    reqs = load_requirements(str(req_path))
+    index = SchemaIndex(fields)
+    rows = compare_all(reqs, index)
+    report_path = workdir / f"{scale}_report{REPORT_FORMATS[report_format]}"
+    # openpyxl and matplotlib are imported on first use; keep that out of the timed runs
+    warmup_path = workdir / f"warmup{REPORT_FORMATS[report_format]}"
+    write_report(rows[:10], str(warmup_path), fmt=report_format, sidecars=True)
+    generate_report_visuals(str(warmup_path), workdir)
+
+    stages: Dict[str, Callable[[], Any]] = {
+        "extract_fields": lambda: extract_fields(schema),
+        "load_requirements": lambda: load_requirements(str(req_path)),
+        "compare_requirement_to_schema": lambda: [compare_requirement_to_schema(r, index) for r in reqs[:COMPARE_BATCH]],
+        "compare_all": lambda: compare_all(reqs, index),
+        # writes the summary sidecar the visuals read
+        "write_report": lambda: write_report(rows, str(report_path), fmt=report_format, sidecars=True),
+        "generate_report_visuals": lambda: generate_report_visuals(str(report_path), workdir),
+    }
+    results = {}
+    for name in STAGES:
+        results[name] = round(_best_of(stages[name], repeat), 4)
+        LOG.info("%s %s: %.4fs", scale, name, results[name])
+    return results
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, float]],
+    baselines: Dict[str, Dict[str, float]],
+    threshold: float = REGRESSION_THRESHOLD,
+) -> List[str]:
+    """Describe every stage slower than its baseline by more than ``threshold``."""
+    regressions = []
+    for scale, stages in results.items():
+        for stage, secs in stages.items():
+            base = baselines.get(scale, {}).get(stage)
+            if base is None:
+                continue
+            if secs > base * (1 + threshold) and secs - base >= MIN_REGRESSION_SECONDS:
+                regressions.append(f"{scale} {stage}: {secs:.4f}s vs baseline {base:.4f}s (+{(secs / base - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _load_baselines(path: Path) -> Dict[str, Dict[str, float]]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def _print_table(results: Dict[str, Dict[str, float]], baselines: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'scale':<8} {'stage':<30} {'seconds':>9} {'baseline':>9} {'change':>8}")
+    for scale, stages in results.items():
+        for stage, secs in stages.items():
+            base = baselines.get(scale, {}).get(stage)
+            change = f"{(secs / base - 1) * 100:+.0f}%" if base else ""
+            print(f"{scale:<8} {stage:<30} {secs:>9.4f} {base if base is not None else '':>9} {change:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the comparison pipeline on generated schemas and requirements")
+    parser.add_argument("--scale", action="append", choices=list(SCALES), help="Scale to run (repeatable, default: small and medium)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest counts")
+    parser.add_argument("--format", choices=list(REPORT_FORMATS), default="excel", help="Report format for write_report")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline timings (JSON)")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Allowed slowdown before a stage counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these timings as the new baseline for the scales run")
+    parser.add_argument("--out", help="Also write the timings to this JSON file")
+    parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    scales = args.scale or ["small", "medium"]
+    with tempfile.TemporaryDirectory(prefix="qapilot-bench-") as tmp:
+        results = {scale: bench_scale(scale, Path(tmp), repeat=args.repeat, report_format=args.format) for scale in scales}
+
+    baseline_path = Path(args.baseline)
+    baselines = _load_baselines(baseline_path)
+    _print_table(results, baselines)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    if args.update_baseline:
+        baselines.update(results)
+        with open(baseline_path, "w", encoding="utf-8") as fh:
+            json.dump(baselines, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        print(f"Baseline updated: {baseline_path}")
+        sys.exit(0)
+
+    regressions = find_regressions(results, baselines, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    sys.exit(1 if regressions else 0)
+
+
+__all__ = ["bench_scale", "find_regressions", "main", "SCALES", "STAGES"]
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 import React, {useEffect, useState, useRef} from 'react'
 import axios from 'axios'
 
+const PAGE_SIZE = 50
+
 export default function Reports(){
   const [reports, setReports] = useState([])
+  const [total, setTotal] = useState(0)
+  const [query, setQuery] = useState('')
   const [loading, setLoading] = useState(false)
   const [imgs, setImgs] = useState(null)
   const [modalOpen, setModalOpen] = useState(false)
@@ -30,11 +34,14 @@ export default function Reports(){
     loadReports()
   },[])
 
-  async function loadReports(){
-    setLoading(true)
+  // the server pages the catalog; "Load more" appends the next page
+  async function loadReports(more = false){
+    setLoading(!more)
     try{
-      const res = await axios.get('/reports')
-      setReports(res.data || [])
+      const offset = more ? reports.length : 0
+      const res = await axios.get('/reports', {params:{offset, limit: PAGE_SIZE, q: query || undefined}})
+      setReports(more ? [...reports, ...(res.data || [])] : (res.data || []))
+      setTotal(Number(res.headers['x-total-count'] || 0))
     }catch(e){
       console.error(e)
     }finally{setLoading(false)}
@@ -101,7 +108,11 @@ export default function Reports(){
   return (
     <div>
       <div className="card">
-        <h4 style={{margin:0}}>Reports</h4>
+        <div style={{display:'flex',alignItems:'center',justifyContent:'space-between'}}>
+          <h4 style={{margin:0}}>Reports</h4>
+          <input className="url-input" style={{maxWidth:260}} placeholder="Filter by name, schema or file" value={query}
+            onChange={e=>setQuery(e.target.value)} onKeyDown={e=>{ if(e.key === 'Enter') loadReports() }} />
+        </div>
         <div style={{marginTop:8}}>
           {loading ? <div className="text-muted">Loading...</div> : (
             reports.length === 0 ? <div className="text-muted">No reports available</div> : (
@@ -110,7 +121,7 @@ export default function Reports(){
                   <div key={r.path} style={{display:'flex',alignItems:'center',justifyContent:'space-between',padding:8,borderRadius:6,background:'rgba(255,255,255,0.01)'}}>
                     <div style={{flex:1}}>
                       <div style={{fontWeight:700}}>{r.name}</div>
-                      <div style={{fontSize:12,color:'var(--muted)'}}>{new Date(r.modified).toLocaleString()} • {r.size} bytes</div>
+                      <div style={{fontSize:12,color:'var(--muted)'}}>{new Date(r.modified).toLocaleString()} • {r.size} bytes{r.counts ? ` • ${r.rows} rows, ${r.counts.MISMATCH} mismatch, ${r.counts.MISSING} missing` : ''}</div>
                     </div>
                     <div style={{display:'flex',gap:8}}>
                       <a className="btn" href={`/download?path=${encodeURIComponent(r.path)}`} target="_blank" rel="noreferrer">Download</a>
@@ -120,6 +131,7 @@ export default function Reports(){
                     </div>
                   </div>
                 ))}
+                {reports.length < total && <button className="btn" onClick={()=>loadReports(true)}>Load more ({total - reports.length} left)</button>}
               </div>
             )
           )}
@@ -1,11 +1,50 @@
 import React, {useState} from 'react'
-import axios from 'axios'
 import { toast } from 'react-toastify'
 
 export default function UploadForm({onResult}){
   const [file, setFile] = useState(null)
   const [schemaUrl, setSchemaUrl] = useState('')
   const [loading, setLoading] = useState(false)
+  const [progress, setProgress] = useState('')
+
+  // read the NDJSON stream from /api/compare and hand partial results up as rows arrive
+  async function streamCompare(fd){
+    const resp = await fetch('/api/compare?stream=ndjson', { method: 'POST', body: fd })
+    if(!resp.ok){
+      const err = await resp.json().catch(()=> ({}))
+      throw new Error(err.error || `HTTP ${resp.status}`)
+    }
+    const reader = resp.body.getReader()
+    const decoder = new TextDecoder()
+    const rows = []
+    const counts = {MATCHED:0, MISMATCH:0, MISSING:0, POSSIBLE_MATCH:0}
+    let buf = ''
+    let schemaId = null
+    while(true){
+      const {done, value} = await reader.read()
+      if(done) throw new Error('Comparison stream ended early')
+      buf += decoder.decode(value, {stream: true})
+      const lines = buf.split('\n')
+      buf = lines.pop()
+      for(const line of lines){
+        if(!line) continue
+        const rec = JSON.parse(line)
+        if(rec.type === 'start'){
+          schemaId = rec.schema_id
+        }else if(rec.type === 'row'){
+          rows.push(rec.row)
+          counts[rec.row.status] = (counts[rec.row.status] || 0) + 1
+        }else if(rec.type === 'summary'){
+          onResult({rows, counts: rec.counts, report: rec.report, schema_id: rec.schema_id})
+          return
+        }else if(rec.type === 'error'){
+          throw new Error(rec.error)
+        }
+      }
+      onResult({rows: rows.slice(), counts: {...counts}, report: null, schema_id: schemaId})
+      setProgress(`${rows.length} rows...`)
+    }
+  }
 
   async function submit(e){
     e.preventDefault()
@@ -16,13 +55,11 @@ export default function UploadForm({onResult}){
     fd.append('schema_url', schemaUrl)
     try{
       setLoading(true)
-      const r = await axios.post('/api/compare', fd, { headers: {'Content-Type':'multipart/form-data'} })
-      if(r.data.error){ toast.error(r.data.error); return }
-      onResult(r.data)
+      await streamCompare(fd)
       toast.success('Comparison finished')
     }catch(err){
-      console.error(err); toast.error('Failed to run comparison')
-    }finally{ setLoading(false) }
+      console.error(err); toast.error(err.message || 'Failed to run comparison')
+    }finally{ setLoading(false); setProgress('') }
   }
 
   return (
@@ -31,7 +68,7 @@ export default function UploadForm({onResult}){
         <div className="url-row">
           <div className="method-pill">POST</div>
           <input className="url-input" placeholder="Schema JSON URL" value={schemaUrl} onChange={e=>setSchemaUrl(e.target.value)} />
-          <button className="btn compare-btn" disabled={loading} type="submit">{loading? 'Running...' : 'Compare'}</button>
+          <button className="btn compare-btn" disabled={loading} type="submit">{loading? (progress || 'Running...') : 'Compare'}</button>
         </div>
 
         <div className="file-chooser">
@@ -8,6 +8,7 @@ export default defineConfig({
     proxy: {
       '/api': 'http://127.0.0.1:8000',
       '/download': 'http://127.0.0.1:8000',
+      '/jobs': 'http://127.0.0.1:8000',
       '/reports': 'http://127.0.0.1:8000'
     }
   }
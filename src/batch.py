@@ -0,0 +1,272 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from .matcher import STATUSES, SchemaIndex, count_statuses, iter_compare_blocks
+from .report_writer import REPORT_FORMATS, ReportWriter
+from .requirement_loader import load_requirements
+from .schema_loader import SchemaCache, load_schema_fields
+
+LOG = logging.getLogger(__name__)
+
+SUMMARY_NAME = "batch_summary.json"
+SCHEMA_FETCH_THREADS = 8
+# "dev=https://..." names a schema on the command line
+_NAMED_URL = re.compile(r"^([A-Za-z0-9_.-]+)=(.+)$")
+
+# set in each worker process by _init_worker: schema name -> fields, and the indexes built from them
+_SCHEMAS: Dict[str, List[Dict[str, Any]]] = {}
+_INDEXES: Dict[str, SchemaIndex] = {}
+_PRUNE = False
+_CLOSEST_MISSING = True
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", value).strip("_") or "x"
+
+
+def schema_name(url: str) -> str:
+    """Short file-name-safe name for a schema URL, e.g. ``schema-1a2b3c4d``."""
+    parsed = urlparse(url)
+    stem = Path(parsed.path).stem or parsed.netloc or "schema"
+    return f"{_slug(stem)}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}"
+
+
+def expand_requirements(patterns: List[str], base: Optional[str] = None) -> List[str]:
+    """Expand requirement paths and globs (relative to ``base``) in order, without duplicates."""
+    paths: List[str] = []
+    for pattern in patterns:
+        full = pattern if base is None or os.path.isabs(pattern) else os.path.join(base, pattern)
+        matches = sorted(glob.glob(full)) if any(c in full for c in "*?[") else [full]
+        matches = [m for m in matches if os.path.isfile(m)]
+        if not matches:
+            raise ValueError(f"no requirement files match {pattern!r}")
+        paths.extend(m for m in matches if m not in paths)
+    return paths
+
+
+def schema_map(entries: List[Any]) -> Dict[str, str]:
+    """Name -> URL for a list of URLs, ``name=URL`` strings or ``{"name", "url"}`` objects."""
+    schemas: Dict[str, str] = {}
+    for entry in entries:
+        if isinstance(entry, str):
+            named = _NAMED_URL.match(entry)
+            url, name = (named.group(2), named.group(1)) if named else (entry, schema_name(entry))
+        else:
+            url = entry["url"]
+            name = _slug(entry.get("name") or schema_name(url))
+        if name in schemas and schemas[name] != url:
+            raise ValueError(f"schema name {name!r} is used twice")
+        schemas[name] = url
+    return schemas
+
+
+def load_manifest(path: str) -> Tuple[List[str], Dict[str, str]]:
+    """Read a batch manifest and return ``(requirement paths, schema name -> URL)``.
+
+    The manifest is JSON with ``requirements`` (paths or globs, relative to
+    the manifest) and ``schemas`` (URLs or ``{"name", "url"}`` objects).
+    Every requirement file is compared against every schema.
+    """
+    with open(path, "r", encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    base = os.path.dirname(os.path.abspath(path))
+    return expand_requirements(manifest.get("requirements") or [], base), schema_map(manifest.get("schemas") or [])
+
+
+def fetch_schemas(
+    schemas: Dict[str, str], use_cache: bool = True, stream: bool = False
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, str]]:
+    """Fetch and extract every schema once, concurrently. Returns ``(fields, errors)`` by name."""
+    cache = SchemaCache() if use_cache else None
+    fields: Dict[str, List[Dict[str, Any]]] = {}
+    errors: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(SCHEMA_FETCH_THREADS, len(schemas)))) as pool:
+        futures = {pool.submit(load_schema_fields, url, cache=cache, stream=stream): name for name, url in schemas.items()}
+        for fut in as_completed(futures):
+            name = futures[fut]
+            try:
+                fields[name] = fut.result()
+                LOG.info("Schema %s: %d fields", name, len(fields[name]))
+            except Exception as e:
+                LOG.error("Failed to load schema %s (%s): %s", name, schemas[name], e)
+                errors[name] = str(e)
+    return fields, errors
+
+
+def _init_worker(schemas: Dict[str, List[Dict[str, Any]]], prune: bool, closest_missing: bool = True) -> None:
+    global _PRUNE, _CLOSEST_MISSING
+    _SCHEMAS.clear()
+    _SCHEMAS.update(schemas)
+    _INDEXES.clear()
+    _PRUNE = prune
+    _CLOSEST_MISSING = closest_missing
+
+
+def _index(name: str) -> SchemaIndex:
+    # built on first use, then shared by every pair this process compares
+    index = _INDEXES.get(name)
+    if index is None:
+        index = _INDEXES[name] = SchemaIndex(_SCHEMAS[name], prune=_PRUNE, closest_missing=_CLOSEST_MISSING)
+    return index
+
+
+def _compare_pair(reqs: List[Dict[str, Any]], name: str, out_path: str, fmt: str, workers: int) -> Dict[str, Any]:
+    start = time.perf_counter()
+    index = _index(name)
+    counts = {k: 0 for k in STATUSES}
+    with ReportWriter(out_path, fmt) as writer:
+        for block in iter_compare_blocks(reqs, index, workers=workers):
+            writer.write_rows(block)
+            for k, n in count_statuses(block).items():
+                counts[k] += n
+    return {"rows": len(reqs), "counts": counts, "seconds": round(time.perf_counter() - start, 3)}
+
+
+def _compare_file(req_path: str, pairs: List[Tuple[str, str]], fmt: str, workers: int) -> List[Dict[str, Any]]:
+    # the requirements are parsed once and compared against each (schema, report) pair
+    start = time.perf_counter()
+    reqs = load_requirements(req_path)
+    loaded = time.perf_counter() - start
+    results = []
+    for name, out_path in pairs:
+        try:
+            result = _compare_pair(reqs, name, out_path, fmt, workers)
+            result["seconds"] = round(result["seconds"] + loaded, 3)
+        except Exception as e:
+            result = {"error": str(e)}
+        results.append(result)
+    return results
+
+
+def _report_paths(req_paths: List[str], names: List[str], out_dir: Path, ext: str) -> Dict[Tuple[str, str], Path]:
+    paths: Dict[Tuple[str, str], Path] = {}
+    stems: Dict[str, str] = {}
+    for req in req_paths:
+        stem = _slug(Path(req).name.split(".")[0])
+        # same file name in different directories
+        n = 2
+        while stem in stems.values():
+            stem = f"{_slug(Path(req).name.split('.')[0])}-{n}"
+            n += 1
+        stems[req] = stem
+        for name in names:
+            paths[(req, name)] = out_dir / f"{stem}__{name}{ext}"
+    return paths
+
+
+def run_batch(
+    req_paths: List[str],
+    schemas: Dict[str, str],
+    out_dir: str,
+    fmt: str = "excel",
+    fail_on: bool = True,
+    jobs: Optional[int] = None,
+    workers: int = 1,
+    prune: bool = False,
+    stream_schema: bool = False,
+    use_cache: bool = True,
+    closest_missing: bool = True,
+) -> int:
+    """Compare every requirement file against every schema and write one report per pair.
+
+    Schemas are fetched once, concurrently; each requirements file is loaded
+    once and compared against every schema on one of ``jobs`` processes
+    (default: all cores). Writes ``batch_summary.json`` into
+    ``out_dir`` and returns 1 if any pair failed, else 2 if ``fail_on`` and
+    any pair has MISMATCH/MISSING rows, else 0.
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    LOG.info("Batch: %d requirement files x %d schemas", len(req_paths), len(schemas))
+    fields, schema_errors = fetch_schemas(schemas, use_cache=use_cache, stream=stream_schema)
+
+    report_paths = _report_paths(req_paths, list(schemas), out, REPORT_FORMATS[fmt])
+    entries: List[Dict[str, Any]] = []
+    # one task per requirements file: (file, [(entry, schema name, report path), ...])
+    tasks: Dict[str, List[Tuple[Dict[str, Any], str, str]]] = {}
+    for (req, name), report in report_paths.items():
+        entry = {"requirements": req, "schema": name, "schema_url": schemas[name], "report": str(report),
+                 "rows": None, "counts": None, "seconds": None, "error": schema_errors.get(name)}
+        entries.append(entry)
+        if entry["error"] is None:
+            tasks.setdefault(req, []).append((entry, name, str(report)))
+
+    def finish(pairs, results: List[Dict[str, Any]]) -> None:
+        for (entry, _, _), result in zip(pairs, results):
+            if "error" in result:
+                LOG.error("Comparing %s with %s failed: %s", entry["requirements"], entry["schema"], result["error"])
+                entry["error"] = result["error"]
+                entry["report"] = None
+            else:
+                entry.update(result)
+                LOG.info("%s x %s: %d rows in %.2fs", entry["requirements"], entry["schema"], result["rows"], result["seconds"])
+
+    def file_args(req: str, pairs):
+        return req, [(name, report) for _, name, report in pairs], fmt, workers
+
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    start = time.perf_counter()
+    if jobs <= 1:
+        _init_worker(fields, prune, closest_missing)
+        for req, pairs in tasks.items():
+            try:
+                finish(pairs, _compare_file(*file_args(req, pairs)))
+            except Exception as e:
+                finish(pairs, [{"error": str(e)}] * len(pairs))
+    elif tasks:
+        # every worker gets the extracted fields once and indexes each schema on first use
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(fields, prune, closest_missing)) as pool:
+            futures = {pool.submit(_compare_file, *file_args(req, pairs)): pairs for req, pairs in tasks.items()}
+            for fut in as_completed(futures):
+                pairs = futures[fut]
+                try:
+                    finish(pairs, fut.result())
+                except Exception as e:
+                    finish(pairs, [{"error": str(e)}] * len(pairs))
+
+    totals = {k: 0 for k in STATUSES}
+    for entry in entries:
+        for k, n in (entry["counts"] or {}).items():
+            totals[k] += n
+    failed = sum(1 for e in entries if e["error"])
+    summary = {
+        "pairs": len(entries),
+        "failed": failed,
+        "seconds": round(time.perf_counter() - start, 3),
+        "status_counts": totals,
+        "results": entries,
+    }
+    with open(out / SUMMARY_NAME, "w", encoding="utf-8") as fh:
+        json.dump(summary, fh, indent=2)
+
+    for entry in entries:
+        if entry["error"]:
+            print(f"{entry['requirements']} x {entry['schema']}: ERROR {entry['error']}")
+        else:
+            c = entry["counts"]
+            print(f"{entry['requirements']} x {entry['schema']}: MATCHED {c['MATCHED']}, MISMATCH {c['MISMATCH']}, MISSING {c['MISSING']}, POSSIBLE_MATCH {c['POSSIBLE_MATCH']}")
+    print(f"MATCHED: {totals['MATCHED']}")
+    print(f"MISMATCH: {totals['MISMATCH']}")
+    print(f"MISSING: {totals['MISSING']}")
+    print(f"POSSIBLE_MATCH: {totals['POSSIBLE_MATCH']}")
+    print(f"FAILED PAIRS: {failed}")
+
+    if failed:
+        LOG.error("Failing because %d of %d pairs could not be compared", failed, len(entries))
+        return 1
+    if fail_on and (totals["MISMATCH"] > 0 or totals["MISSING"] > 0):
+        LOG.error("Failing because mismatches or missing fields found")
+        return 2
+    return 0
+
+
+__all__ = ["run_batch", "load_manifest", "expand_requirements", "schema_map", "schema_name", "fetch_schemas", "SUMMARY_NAME"]
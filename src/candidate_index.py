@@ -0,0 +1,70 @@
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+LOG = logging.getLogger(__name__)
+
+
+def _sort_tokens(s: str) -> str:
+    # the string token_sort_ratio actually compares
+    return " ".join(sorted(s.split()))
+
+
+class CandidateIndex:
+    """Character n-gram inverted index over schema keys for fuzzy pre-filtering.
+
+    ``shortlist`` returns every key that can still reach ``score_cutoff`` under
+    ``fuzz.token_sort_ratio``, using a length filter and the q-gram count
+    filter for indel distance. Keys it drops are guaranteed to score below
+    the cutoff, so POSSIBLE_MATCH results are the same as exhaustive scoring.
+    """
+
+    def __init__(self, choices: List[str], q: int = 2):
+        self.q = q
+        self.size = len(choices)
+        postings: Dict[str, List[int]] = {}
+        lengths: List[int] = []
+        for i, choice in enumerate(choices):
+            s = _sort_tokens(choice)
+            lengths.append(len(s))
+            for j in range(len(s) - q + 1):
+                postings.setdefault(s[j:j + q], []).append(i)
+
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.postings = {g: np.asarray(ids, dtype=np.int64) for g, ids in postings.items()}
+        self.length_values = np.unique(self.lengths)
+        self.max_length = int(self.length_values[-1]) if len(self.length_values) else 0
+        LOG.debug("Built candidate index: %d keys, %d grams", self.size, len(self.postings))
+
+    def shortlist(self, query: str, score_cutoff: Optional[float] = 85) -> np.ndarray:
+        """Return sorted choice indices that may score >= ``score_cutoff`` against ``query``."""
+        if not score_cutoff or score_cutoff <= 0:
+            return np.arange(self.size, dtype=np.int64)
+        if not self.size:
+            return np.empty(0, dtype=np.int64)
+
+        q = self.q
+        s = _sort_tokens(query)
+        la = len(s)
+        lbs = self.length_values
+
+        # ratio = 200 * LCS / (la + lb), so a hit needs LCS >= lmin
+        lmin = np.ceil(score_cutoff * (la + lbs) / 200.0 - 1e-9)
+        feasible = lmin <= np.minimum(la, lbs)
+        # each deletion kills at most q grams, each insertion at most q - 1
+        t1 = (la - q + 1) - q * (la - lmin) - (q - 1) * (lbs - lmin)
+        t2 = (lbs - q + 1) - q * (lbs - lmin) - (q - 1) * (la - lmin)
+        thr = np.maximum(t1, t2)
+        thr[~feasible] = np.inf
+
+        grams = {s[j:j + q] for j in range(la - q + 1)}
+        hits = [self.postings[g] for g in grams if g in self.postings]
+        thr_by_length = np.full(self.max_length + 1, np.inf)
+        thr_by_length[lbs] = thr
+        # lengths whose bound is <= 0 pass with no shared gram at all
+        counts = np.bincount(np.concatenate(hits), minlength=self.size) if hits else np.zeros(self.size, dtype=np.int64)
+        return np.flatnonzero(counts >= thr_by_length[self.lengths])
+
+
+__all__ = ["CandidateIndex"]
@@ -1,12 +1,12 @@
 import argparse
 import logging
 import sys
-from typing import List
+from typing import Dict, Optional
+from .report_writer import REPORT_FORMATS, ReportWriter, report_format
+from .metrics import Timings
 
-from .requirement_loader import load_requirements
-from .schema_loader import load_schema_from_url, extract_fields
-from .matcher import compare_requirement_to_schema
-from .report_writer import write_report
+# The comparison pipeline (numpy, rapidfuzz, pandas via the loaders) is imported
+# by the command that runs it, so --help and usage errors return immediately.
 
 LOG = logging.getLogger(__name__)
 
@@ -16,39 +16,85 @@ def setup_logging(debug: bool = False):
     logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
 
-def run(req_path: str, schema_url: str, out_path: str, fmt: str = "excel", fail_on: bool = True, debug: bool = False) -> int:
+def run(req_path: str, schema_url: str, out_path: str, fmt: str = "excel", fail_on: bool = True, debug: bool = False, workers: int = 1, prune: bool = False, stream_schema: bool = False, use_cache: bool = True, state_path: Optional[str] = None, closest_missing: bool = True) -> int:
     setup_logging(debug)
+    from .incremental import ComparisonState
+    from .matcher import FUZZY_THRESHOLD, STATUSES, SchemaIndex, count_statuses, iter_compare_blocks
+    from .requirement_loader import load_requirements
+    from .schema_loader import SchemaCache, load_schema_fields
+
+    timings = Timings()
     LOG.info("Loading requirements from %s", req_path)
-    reqs = load_requirements(req_path)
+    with timings.stage("load_requirements"):
+        reqs = load_requirements(req_path)
+    timings.set("rows", len(reqs))
     LOG.info("Fetching schema from %s", schema_url)
-    schema_json = load_schema_from_url(schema_url)
-    LOG.info("Extracting fields from schema")
-    schema_fields = extract_fields(schema_json)
+    cache = SchemaCache() if use_cache else None
+    schema_fields = load_schema_fields(schema_url, cache=cache, stream=stream_schema, timings=timings)
     LOG.info("Found %d schema fields", len(schema_fields))
+    timings.set("fields", len(schema_fields))
+
+    with timings.stage("index_schema"):
+        index = SchemaIndex(schema_fields, prune=prune, closest_missing=closest_missing)
 
-    rows: List[dict] = []
-    counts = {"MATCHED": 0, "MISMATCH": 0, "MISSING": 0, "POSSIBLE_MATCH": 0}
-    for r in reqs:
-        rep = compare_requirement_to_schema(r, schema_fields)
-        rows.append(rep)
-        st = rep.get("status")
-        if st == "MATCHED":
-            counts["MATCHED"] += 1
-        elif st == "MISMATCH":
-            counts["MISMATCH"] += 1
-        elif st == "POSSIBLE_MATCH":
-            counts["POSSIBLE_MATCH"] += 1
-        elif st == "MISSING":
-            counts["MISSING"] += 1
+    # incremental mode: reuse fuzzy results from the last run against this state file
+    state = fuzzy = None
+    if state_path:
+        state = ComparisonState.load(state_path)
+        delta = state.prepare(index)
+        LOG.info("Schema since last run: %(added)d fields added, %(removed)d removed, %(changed)d changed", delta)
 
+        def fuzzy(queries):
+            keys, scores = state.memo.best_matches(queries, workers=workers, candidates=index.candidates)
+            if not closest_missing:
+                # the memo keeps closest keys for later runs; this report leaves them out
+                keys = [k if sc >= FUZZY_THRESHOLD else None for k, sc in zip(keys, scores)]
+                scores = [sc if sc >= FUZZY_THRESHOLD else 0.0 for sc in scores]
+            return keys, scores
+
+    # rows go straight to the report as each block is compared
     LOG.info("Writing report to %s", out_path)
-    write_report(rows, out_path, fmt=fmt)
+    counts = {k: 0 for k in STATUSES}
+    changes = []
+    done = 0
+    fallbacks = 0
+    blocks = iter_compare_blocks(reqs, index, workers=workers, fuzzy=fuzzy)
+    with ReportWriter(out_path, fmt) as writer:
+        while True:
+            with timings.stage("match"):
+                block = next(blocks, None)
+            if block is None:
+                break
+            with timings.stage("write_report"):
+                writer.write_rows(block)
+            for k, n in count_statuses(block).items():
+                counts[k] += n
+            fallbacks += sum(1 for r in block if r["found"] != "YES")
+            if state is not None:
+                changes.extend(state.record(reqs[done:done + len(block)], block))
+            done += len(block)
+        with timings.stage("write_report"):
+            writer.close()
+    timings.set("fuzzy_fallbacks", fallbacks)
+    LOG.debug("Stage timings: %s", timings.summary())
+
+    if state is not None:
+        LOG.info("Fuzzy-scored %d requirement keys from scratch; %d rows changed status", state.memo.scored, len(changes))
+        for c in changes:
+            if c["before"] is None:
+                LOG.info("  %s %s: new -> %s", c["req_id"], c["field_key"], c["after"])
+            else:
+                cause = "requirement edited" if c["requirement_changed"] else "schema changed"
+                LOG.info("  %s %s: %s -> %s (%s)", c["req_id"], c["field_key"], c["before"], c["after"], cause)
+        state.save(state_path)
 
     # print summary
     print(f"MATCHED: {counts['MATCHED']}")
     print(f"MISMATCH: {counts['MISMATCH']}")
     print(f"MISSING: {counts['MISSING']}")
     print(f"POSSIBLE_MATCH: {counts['POSSIBLE_MATCH']}")
+    if state is not None:
+        print(f"CHANGED: {len(changes)}")
 
     if fail_on and (counts["MISMATCH"] > 0 or counts["MISSING"] > 0):
         LOG.error("Failing because mismatches or missing fields found")
@@ -56,18 +102,96 @@ def run(req_path: str, schema_url: str, out_path: str, fmt: str = "excel", fail_
     return 0
 
 
+def run_matrix(req_path: str, schemas: Dict[str, str], out_path: str, fmt: str = "excel", fail_on: bool = True, debug: bool = False, workers: int = 1, prune: bool = False, stream_schema: bool = False, use_cache: bool = True, closest_missing: bool = True) -> int:
+    setup_logging(debug)
+    from .batch import fetch_schemas
+    from .matcher import SchemaIndex
+    from .matrix import compare_matrix, matrix_columns
+    from .requirement_loader import load_requirements
+
+    LOG.info("Loading requirements from %s", req_path)
+    reqs = load_requirements(req_path)
+    LOG.info("Fetching %d schemas", len(schemas))
+    fields, errors = fetch_schemas(schemas, use_cache=use_cache, stream=stream_schema)
+    if errors:
+        LOG.error("Cannot build the matrix without every schema: %s", ", ".join(sorted(errors)))
+        return 1
+    indexes = {name: SchemaIndex(fields[name], prune=prune, closest_missing=closest_missing) for name in schemas}
+
+    rows, counts = compare_matrix(reqs, indexes, workers=workers)
+    LOG.info("Writing matrix report to %s", out_path)
+    with ReportWriter(out_path, fmt, columns=matrix_columns(list(schemas))) as writer:
+        writer.write_rows(rows)
+
+    for name, c in counts.items():
+        print(f"{name}: MATCHED {c['MATCHED']}, MISMATCH {c['MISMATCH']}, MISSING {c['MISSING']}, POSSIBLE_MATCH {c['POSSIBLE_MATCH']}")
+    print(f"DIVERGING: {sum(1 for r in rows if r['diverges'])}")
+
+    if fail_on and any(c["MISMATCH"] > 0 or c["MISSING"] > 0 for c in counts.values()):
+        LOG.error("Failing because mismatches or missing fields found")
+        return 2
+    return 0
+
+
 def main(argv=None):
     parser = argparse.ArgumentParser(description="Compare requirements with schema JSON and produce a report")
-    parser.add_argument("--req", required=True, help="Path to requirements CSV/XLSX")
-    parser.add_argument("--schema-url", required=True, help="URL to schema JSON")
-    parser.add_argument("--out", required=True, help="Output report path (xlsx or csv)")
-    parser.add_argument("--format", choices=["excel", "csv"], default=None, help="Output format")
+    parser.add_argument("--req", action="append", default=[], help="Path to requirements CSV/XLSX (repeat or use a glob for a batch)")
+    parser.add_argument("--schema-url", action="append", default=[], help="URL to schema JSON (repeat for a batch)")
+    parser.add_argument("--out", help="Output report path (xlsx, csv, csv.gz or parquet)")
+    parser.add_argument("--manifest", help="Batch manifest (JSON with requirements globs and schemas)")
+    parser.add_argument("--out-dir", help="Batch output directory: one report per requirements/schema pair plus batch_summary.json")
+    parser.add_argument("--matrix", action="store_true", help="Compare one requirements file against every --schema-url (name=URL to label them) in one matrix report")
+    parser.add_argument("--jobs", type=int, default=None, help="Batch worker processes (default: all cores)")
+    parser.add_argument("--format", choices=list(REPORT_FORMATS), default=None, help="Output format (default: from the --out suffix, else excel)")
     parser.add_argument("--no-fail", dest="fail", action="store_false", help="Do not exit non-zero on mismatch/missing")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    parser.add_argument("--workers", type=int, default=1, help="Worker threads for fuzzy matching (-1 = all cores)")
+    parser.add_argument("--prune", action="store_true", help="Shortlist fuzzy candidates with an n-gram index (large schemas)")
+    parser.add_argument("--no-closest-match", dest="closest_missing", action="store_false", help="Leave best_match_key/score empty on MISSING rows instead of searching the closest key (with --prune: no exhaustive scoring)")
+    parser.add_argument("--stream-schema", action="store_true", help="Parse the schema incrementally instead of loading it whole (huge schemas)")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="Bypass the on-disk schema cache")
+    parser.add_argument("--incremental", metavar="STATE", default=None, help="Reuse fuzzy results from the previous run stored in STATE and report status changes")
 
     args = parser.parse_args(argv)
-    fmt = args.format or ("csv" if args.out.lower().endswith('.csv') else "excel")
-    code = run(args.req, args.schema_url, args.out, fmt=fmt, fail_on=args.fail, debug=args.debug)
+    if args.matrix:
+        if len(args.req) != 1 or len(args.schema_url) < 2 or not args.out:
+            parser.error("--matrix needs one --req, at least two --schema-url and --out")
+        from .batch import schema_map
+        try:
+            schemas = schema_map(args.schema_url)
+        except ValueError as e:
+            parser.error(str(e))
+        fmt = args.format or report_format(args.out) or "excel"
+        code = run_matrix(args.req[0], schemas, args.out, fmt=fmt, fail_on=args.fail, debug=args.debug, workers=args.workers, prune=args.prune, stream_schema=args.stream_schema, use_cache=args.cache, closest_missing=args.closest_missing)
+        sys.exit(code)
+
+    batch = args.manifest or args.out_dir or len(args.req) > 1 or len(args.schema_url) > 1 or any(c in "".join(args.req) for c in "*?[")
+    if batch:
+        if args.incremental:
+            parser.error("--incremental compares a single pair")
+        if not args.out_dir:
+            parser.error("a batch needs --out-dir")
+        from .batch import expand_requirements, load_manifest, run_batch, schema_map
+        try:
+            req_paths = expand_requirements(args.req)
+            schemas = schema_map(args.schema_url)
+            if args.manifest:
+                more_reqs, more_schemas = load_manifest(args.manifest)
+                req_paths += [p for p in more_reqs if p not in req_paths]
+                schemas.update(more_schemas)
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"invalid batch: {e}")
+        if not req_paths or not schemas:
+            parser.error("a batch needs at least one requirements file and one schema")
+        setup_logging(args.debug)
+        code = run_batch(req_paths, schemas, args.out_dir, fmt=args.format or "excel", fail_on=args.fail, jobs=args.jobs, workers=args.workers, prune=args.prune, stream_schema=args.stream_schema, use_cache=args.cache, closest_missing=args.closest_missing)
+        sys.exit(code)
+
+    if not (args.req and args.schema_url and args.out):
+        parser.error("--req, --schema-url and --out are required (or use --manifest/--out-dir for a batch)")
+    args.req, args.schema_url = args.req[0], args.schema_url[0]
+    fmt = args.format or report_format(args.out) or "excel"
+    code = run(args.req, args.schema_url, args.out, fmt=fmt, fail_on=args.fail, debug=args.debug, workers=args.workers, prune=args.prune, stream_schema=args.stream_schema, use_cache=args.cache, state_path=args.incremental, closest_missing=args.closest_missing)
     sys.exit(code)
 
 
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .candidate_index import CandidateIndex
+from .matcher import SchemaIndex, fuzzy_best_matches
+
+LOG = logging.getLogger(__name__)
+
+STATE_VERSION = 2
+# schema entry keys (as extract_fields emits them) that _compute_diffs compares;
+# length and pattern constraints live under "validations", and label is never compared
+_FIELD_KEYS = ("field_key", "type", "required", "options", "validations")
+_REQ_KEYS = ("req_id", "field_key", "type", "required", "label", "min_len", "max_len", "regex", "options")
+
+
+def _digest(record: Dict[str, Any], keys) -> str:
+    blob = json.dumps([record.get(k) for k in keys], sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def _first_positions(choices: List[str]) -> Dict[str, int]:
+    pos: Dict[str, int] = {}
+    for i, key in enumerate(choices):
+        pos.setdefault(key, i)
+    return pos
+
+
+def _row_key(row: Dict[str, Any]) -> Tuple[Any, Any]:
+    return row.get("req_id"), row.get("field_key")
+
+
+class FuzzyMemo:
+    """Best fuzzy match per query string, kept valid across schema versions.
+
+    ``rebase`` moves the memo to a new choice list: entries whose best key
+    was removed are dropped, and the rest are only re-scored against the
+    added keys, keeping the earlier choice on ties like ``extractOne``. If the
+    surviving keys were reordered the memo starts over, since tie-breaking
+    depends on choice order. Results equal a full ``fuzzy_best_matches`` run.
+    """
+
+    def __init__(self, choices: Optional[List[str]] = None, results: Optional[Dict[str, Tuple[Optional[str], float]]] = None):
+        self.choices: List[str] = list(choices or [])
+        self.results: Dict[str, Tuple[Optional[str], float]] = dict(results or {})
+        # queries whose result already accounts for every current choice
+        self._current = set(self.results)
+        self._added: List[str] = []
+        self._pos = _first_positions(self.choices)
+        self.scored = 0
+
+    def rebase(self, choices: List[str]) -> None:
+        if choices == self.choices:
+            return
+        # entries not yet re-scored against the last added keys cannot be carried further
+        self.results = self.snapshot()
+        old, new = set(self.choices), set(choices)
+        survivors_old = [k for k in self._pos if k in new]
+        new_pos = _first_positions(choices)
+        survivors_new = [k for k in new_pos if k in old]
+        if not self.choices or survivors_old != survivors_new:
+            if self.results:
+                LOG.info("Fuzzy memo reset: schema keys were reordered")
+            self.results.clear()
+        else:
+            removed = old - new
+            self.results = {q: r for q, r in self.results.items() if r[0] not in removed}
+        # added keys in choice order, so the first one wins ties among them
+        self._added = [k for k in new_pos if k not in old]
+        self._current = set() if self._added else set(self.results)
+        self.choices = list(choices)
+        self._pos = new_pos
+
+    def best_matches(
+        self, queries: List[str], workers: int = 1, candidates: Optional[CandidateIndex] = None
+    ) -> Tuple[List[Optional[str]], List[float]]:
+        unique = list(dict.fromkeys(queries))
+        unknown = [q for q in unique if q not in self.results]
+        stale = [q for q in unique if q in self.results and q not in self._current]
+
+        if unknown:
+            keys, scores = fuzzy_best_matches(unknown, self.choices, score_cutoff=None, workers=workers, candidates=candidates)
+            self.results.update(zip(unknown, zip(keys, scores)))
+            self.scored += len(unknown)
+        if stale:
+            keys, scores = fuzzy_best_matches(stale, self._added, score_cutoff=None, workers=workers)
+            for q, ka, sa in zip(stale, keys, scores):
+                kb, sb = self.results[q]
+                if ka is not None and (sa > sb or (sa == sb and self._pos[ka] < self._pos.get(kb, len(self.choices)))):
+                    self.results[q] = (ka, sa)
+        self._current.update(unknown)
+        self._current.update(stale)
+
+        best = [self.results[q] for q in queries]
+        return [b[0] for b in best], [b[1] for b in best]
+
+    def snapshot(self) -> Dict[str, Tuple[Optional[str], float]]:
+        # only entries that account for every current choice can be saved with it
+        return {q: r for q, r in self.results.items() if q in self._current}
+
+
+class ComparisonState:
+    """What an incremental run keeps for the next one.
+
+    Holds the fuzzy memo, a hash per schema field and per requirement row,
+    and each row's status keyed by ``(req_id, field_key)``. A run calls
+    ``prepare`` once, ``record`` for every block of results and then ``save``.
+    """
+
+    def __init__(self):
+        self.memo = FuzzyMemo()
+        self.field_hashes: Dict[str, str] = {}
+        self.req_hashes: Dict[Tuple[Any, Any], str] = {}
+        self.statuses: Dict[Tuple[Any, Any], str] = {}
+        self._previous: Tuple[Dict, Dict] = ({}, {})
+
+    @classmethod
+    def load(cls, path: str) -> "ComparisonState":
+        try:
+            with open(path, "rb") as fh:
+                data = pickle.load(fh)
+            if data.get("version") != STATE_VERSION:
+                raise ValueError(f"state version {data.get('version')}")
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            LOG.warning("Ignoring unreadable comparison state %s: %s", path, e)
+            return cls()
+        state = cls()
+        state.memo = FuzzyMemo(data["choices"], data["fuzzy"])
+        state.field_hashes = data["field_hashes"]
+        state.req_hashes = data["req_hashes"]
+        state.statuses = data["statuses"]
+        return state
+
+    def save(self, path: str) -> None:
+        data = {
+            "version": STATE_VERSION,
+            "choices": self.memo.choices,
+            "fuzzy": self.memo.snapshot(),
+            "field_hashes": self.field_hashes,
+            "req_hashes": self.req_hashes,
+            "statuses": self.statuses,
+        }
+        tmp = Path(f"{path}.tmp")
+        with open(tmp, "wb") as fh:
+            pickle.dump(data, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def prepare(self, index: SchemaIndex) -> Dict[str, int]:
+        """Rebase the memo on ``index`` and return added/removed/changed field counts."""
+        hashes: Dict[str, str] = {}
+        for f in index.fields:
+            hashes.setdefault(f["field_key"], _digest(f, _FIELD_KEYS))
+        old = self.field_hashes
+        delta = {
+            "added": sum(1 for k in hashes if k not in old),
+            "removed": sum(1 for k in old if k not in hashes),
+            "changed": sum(1 for k, h in hashes.items() if k in old and old[k] != h),
+        }
+        self.memo.rebase(index.choices)
+        self.field_hashes = hashes
+        # rows are recorded afresh; the last run's are kept to diff against
+        self._previous = (self.req_hashes, self.statuses)
+        self.req_hashes, self.statuses = {}, {}
+        return delta
+
+    def record(self, reqs: List[Dict[str, Any]], rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Store the statuses of one block of results and return its rows whose status changed.
+
+        Each change lists the old and new status (``before`` is None for new
+        rows) and whether the requirement itself was edited; otherwise the
+        schema caused it.
+        """
+        prev_hashes, prev_statuses = self._previous
+        changes = []
+        for req, row in zip(reqs, rows):
+            key = _row_key(row)
+            req_hash = self.req_hashes[key] = _digest(req, _REQ_KEYS)
+            self.statuses[key] = row["status"]
+            before = prev_statuses.get(key)
+            if before != row["status"]:
+                changes.append({
+                    "req_id": row.get("req_id"),
+                    "field_key": row.get("field_key"),
+                    "before": before,
+                    "after": row["status"],
+                    "requirement_changed": prev_hashes.get(key) != req_hash,
+                })
+        return changes
+
+
+__all__ = ["ComparisonState", "FuzzyMemo", "STATE_VERSION"]
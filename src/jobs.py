@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+LOG = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = "queued"
+        self.stage = "queued"
+        self.rows_total: Optional[int] = None
+        self.rows_processed = 0
+        self.counts: Optional[Dict[str, int]] = None
+        self.report: Optional[Dict[str, str]] = None
+        self.error: Optional[str] = None
+        self.result: Any = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "rows_total": self.rows_total,
+            "rows_processed": self.rows_processed,
+            "counts": self.counts,
+            "report": self.report,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobManager:
+    """Runs submitted coroutines as jobs with bounded concurrency and queue size.
+
+    At most ``concurrency`` jobs run at once; ``submit`` raises
+    ``JobQueueFull`` once ``max_queue`` jobs are queued or running. Finished
+    jobs (and their results) are kept for polling until ``retention`` newer
+    ones have finished.
+    """
+
+    def __init__(self, concurrency: int = 2, max_queue: int = 20, retention: int = 100):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.retention = retention
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, run: Callable[[Job], Awaitable[Any]]) -> Job:
+        if sum(1 for j in self.jobs.values() if j.active) >= self.max_queue:
+            raise JobQueueFull(f"job queue is full ({self.max_queue} jobs queued or running)")
+        job = Job(uuid.uuid4().hex)
+        self.jobs[job.id] = job
+        self._prune()
+        task = asyncio.get_running_loop().create_task(self._run(job, run))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def _run(self, job: Job, run: Callable[[Job], Awaitable[Any]]) -> None:
+        async with self._semaphore:
+            job.status = "running"
+            job.started = time.time()
+            try:
+                job.result = await run(job)
+                job.status = job.stage = "done"
+            except Exception as e:
+                LOG.exception("Job %s failed: %s", job.id, e)
+                job.status = job.stage = "failed"
+                job.error = str(e)
+            finally:
+                job.finished = time.time()
+
+    def _prune(self) -> None:
+        finished = [j.id for j in self.jobs.values() if not j.active]
+        for job_id in finished[: max(0, len(finished) - self.retention)]:
+            del self.jobs[job_id]
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+__all__ = ["Job", "JobManager", "JobQueueFull"]
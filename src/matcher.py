@@ -1,10 +1,23 @@
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from itertools import islice
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple, Union
+import numpy as np
 from rapidfuzz import process, fuzz
 
+from .candidate_index import CandidateIndex
+from .records import FieldNorm, Requirement, as_requirement
+
 LOG = logging.getLogger(__name__)
 
 
+STATUSES = ("MATCHED", "MISMATCH", "MISSING", "POSSIBLE_MATCH")
+FUZZY_THRESHOLD = 85
+# upper bound on score matrix cells held at once by the bulk fuzzy stage (8 bytes each)
+FUZZY_CHUNK_CELLS = 4_000_000
+# requirement rows per exact + fuzzy pass (granularity of progress and streaming)
+FUZZY_BLOCK_ROWS = 2000
+
+
 def _bool_to_str(v: Optional[bool]) -> str:
     if v is True:
         return "True"
@@ -13,18 +26,92 @@ def _bool_to_str(v: Optional[bool]) -> str:
     return ""
 
 
-def compare_requirement_to_schema(req: Dict[str, Any], schema_fields: List[Dict[str, Any]]) -> Dict[str, Any]:
-    # prepare map of schema keys
-    schema_map = {f["field_key"].lower(): f for f in schema_fields}
-    req_key = (req.get("field_key") or "").strip()
-    req_key_l = req_key.lower()
+class SchemaIndex:
+    """Lookup structures over ``extract_fields`` output, built once per schema.
+
+    Holds the lower-cased key map used for exact matches, the fuzzy choice
+    list, exact key -> field and raw_json_path -> field lookups and the
+    per-field values that
+    ``_compute_diffs`` would otherwise re-normalize for every requirement.
+    With ``prune=True`` it also builds a ``CandidateIndex`` over the keys.
+    ``closest_missing=False`` skips looking up the closest key of MISSING
+    rows (their ``best_match_key``/``best_match_score`` stay empty), which
+    with pruning means no requirement is ever scored against every key.
+    """
+
+    def __init__(self, schema_fields: List[Dict[str, Any]], prune: bool = False, closest_missing: bool = True):
+        self.fields: List[Dict[str, Any]] = list(schema_fields)
+        self.by_lower: Dict[str, Dict[str, Any]] = {}
+        self.by_key: Dict[str, Dict[str, Any]] = {}
+        self.by_path: Dict[str, Dict[str, Any]] = {}
+        self.choices: List[str] = []
+        self.norm: Dict[int, FieldNorm] = {}
+        for f in self.fields:
+            key = f["field_key"]
+            # later duplicates win for exact matches, the first one wins for lookups
+            self.by_lower[key.lower()] = f
+            self.by_key.setdefault(key, f)
+            self.by_path.setdefault(f.get("raw_json_path"), f)
+            self.choices.append(key)
+            self.norm[id(f)] = _normalize_field(f)
+        # optional n-gram index that shortlists fuzzy candidates on large schemas
+        self.candidates: Optional[CandidateIndex] = CandidateIndex(self.choices) if prune else None
+        self.closest_missing = closest_missing
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def get(self, field_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not field_key:
+            return None
+        return self.by_key.get(field_key)
+
+
+def _normalize_field(schema_field: Dict[str, Any]) -> FieldNorm:
+    act_opts_raw = schema_field.get("options")
+    act_opts = None
+    if act_opts_raw:
+        if isinstance(act_opts_raw, dict):
+            act_opts = frozenset(str(v).strip().lower() for v in act_opts_raw.values())
+        elif isinstance(act_opts_raw, list):
+            act_opts = frozenset(str(x).strip().lower() for x in act_opts_raw)
+        else:
+            act_opts = frozenset([str(act_opts_raw).strip().lower()])
+
+    val = schema_field.get("validations") or {}
+    if not isinstance(val, dict):
+        val = {}
+    pattern = val.get("pattern")
 
-    report: Dict[str, Any] = {
-        "req_id": req.get("req_id"),
-        "field_key": req_key,
-        "expected_type": req.get("type"),
+    return FieldNorm(
+        type=str(schema_field.get("type") or "").strip().lower(),
+        options=act_opts,
+        min_len=_to_int(val.get("minLength")),
+        max_len=_to_int(val.get("maxLength")),
+        pattern=str(pattern).strip() if pattern else None,
+    )
+
+
+def _to_int(v: Any) -> Optional[int]:
+    if not v:
+        return None
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_index(schema: Union["SchemaIndex", List[Dict[str, Any]]]) -> "SchemaIndex":
+    return schema if isinstance(schema, SchemaIndex) else SchemaIndex(schema)
+
+
+def _new_report(req: Requirement) -> Dict[str, Any]:
+    return {
+        "req_id": req.req_id,
+        "field_key": req.key,
+        "expected_type": req.type,
         "actual_type": None,
-        "expected_required": _bool_to_str(req.get("required")),
+        "expected_required": _bool_to_str(req.required),
         "actual_required": None,
         "found": "NO",
         "status": "MISSING",
@@ -34,83 +121,276 @@ def compare_requirement_to_schema(req: Dict[str, Any], schema_fields: List[Dict[
         "raw_json_path": None,
     }
 
+
+def _apply_match(report: Dict[str, Any], req: Requirement, s: Dict[str, Any], index: "SchemaIndex") -> None:
+    report["actual_type"] = s.get("type")
+    report["actual_required"] = _bool_to_str(s.get("required"))
+    report["raw_json_path"] = s.get("raw_json_path")
+    diffs = _compute_diffs(req, s, index.norm.get(id(s)))
+    report["differences"] = "; ".join(diffs) if diffs else ""
+
+
+def _compare_exact(req: Requirement, index: "SchemaIndex") -> Tuple[Dict[str, Any], bool]:
+    """Build the report for ``req`` from an exact key match.
+
+    Returns the report and whether it still needs the fuzzy stage.
+    """
+    report = _new_report(req)
+
     # exact match
-    if req_key_l in schema_map:
-        s = schema_map[req_key_l]
+    s = index.by_lower.get(req.key_lower)
+    if s is not None:
         report["found"] = "YES"
-        report["actual_type"] = s.get("type")
-        report["actual_required"] = _bool_to_str(s.get("required"))
-        report["raw_json_path"] = s.get("raw_json_path")
-        diffs = _compute_diffs(req, s)
-        report["differences"] = "; ".join(diffs) if diffs else ""
-        report["status"] = "MATCHED" if not diffs else "MISMATCH"
+        _apply_match(report, req, s, index)
+        report["status"] = "MATCHED" if not report["differences"] else "MISMATCH"
         report["best_match_key"] = s.get("field_key")
         report["best_match_score"] = 100
-        return report
+        return report, False
+
+    return report, bool(index.choices)
+
+
+def _apply_fuzzy(report: Dict[str, Any], req: Requirement, best_key: Optional[str], best_score: float, index: "SchemaIndex") -> None:
+    report["best_match_key"] = best_key
+    report["best_match_score"] = int(best_score or 0)
+
+    if best_score >= FUZZY_THRESHOLD:
+        # POSSIBLE_MATCH
+        s = index.get(best_key)
+        if s:
+            report["found"] = "POSSIBLE"
+            _apply_match(report, req, s, index)
+            report["status"] = "POSSIBLE_MATCH"
+
+
+def fuzzy_best_matches(
+    queries: List[str],
+    choices: List[str],
+    score_cutoff: Optional[float] = FUZZY_THRESHOLD,
+    workers: int = 1,
+    candidates: Optional[CandidateIndex] = None,
+    exhaustive_fallback: bool = True,
+) -> Tuple[List[Optional[str]], List[float]]:
+    """Score every query against every choice with ``token_sort_ratio`` in bulk.
+
+    Returns the best choice and its score per query, picking the first choice
+    on ties like ``process.extractOne`` does. Queries with nothing at or above
+    ``score_cutoff`` get ``(None, 0)``. The score matrix is computed in row
+    chunks so memory stays bounded; ``workers=-1`` uses all cores.
+
+    With ``candidates`` each query is only scored against its shortlist of
+    keys that can reach ``score_cutoff`` (``FUZZY_THRESHOLD`` when it is
+    None), so any result at or above that cutoff is the exhaustive answer.
+    Below it, a None ``score_cutoff`` reports the closest shortlisted key,
+    which may differ from the closest key overall. Queries with an empty
+    shortlist and no ``score_cutoff`` are scored exhaustively when
+    ``exhaustive_fallback`` is set and reported as ``(None, 0)`` otherwise.
+    """
+    if not queries or not choices:
+        return [None] * len(queries), [0.0] * len(queries)
+    if candidates is not None:
+        return _pruned_best_matches(queries, choices, score_cutoff, workers, candidates, exhaustive_fallback)
+
+    best_keys: List[Optional[str]] = []
+    best_scores: List[float] = []
+    rows_per_chunk = max(1, FUZZY_CHUNK_CELLS // len(choices))
+    for start in range(0, len(queries), rows_per_chunk):
+        chunk = queries[start:start + rows_per_chunk]
+        scores = process.cdist(
+            chunk,
+            choices,
+            scorer=fuzz.token_sort_ratio,
+            # explicit in every scorer call: rapidfuzz 2.x defaulted cdist and extractOne to different processors
+            processor=None,
+            score_cutoff=score_cutoff,
+            dtype=np.float64,
+            workers=workers,
+        )
+        idx = scores.argmax(axis=1)
+        top = scores[np.arange(len(chunk)), idx]
+        for i, sc in zip(idx.tolist(), top.tolist()):
+            if score_cutoff is not None and sc < score_cutoff:
+                best_keys.append(None)
+                best_scores.append(0.0)
+            else:
+                best_keys.append(choices[i])
+                best_scores.append(sc)
+    return best_keys, best_scores
+
+
+def _pruned_best_matches(
+    queries: List[str],
+    choices: List[str],
+    score_cutoff: Optional[float],
+    workers: int,
+    candidates: CandidateIndex,
+    exhaustive_fallback: bool,
+) -> Tuple[List[Optional[str]], List[float]]:
+    best_keys: List[Optional[str]] = [None] * len(queries)
+    best_scores: List[float] = [0.0] * len(queries)
+    fallback: List[int] = []
+    cutoff = FUZZY_THRESHOLD if score_cutoff is None else score_cutoff
+    for qi, query in enumerate(queries):
+        shortlist = candidates.shortlist(query, cutoff)
+        if not len(shortlist):
+            # with a cutoff the answer is (None, 0) without scoring anything
+            if score_cutoff is None and exhaustive_fallback:
+                fallback.append(qi)
+            continue
+        # shortlist is in choice order, so ties still go to the first choice
+        best = process.extractOne(
+            query, [choices[i] for i in shortlist.tolist()], scorer=fuzz.token_sort_ratio, processor=None, score_cutoff=score_cutoff
+        )
+        if best:
+            best_keys[qi], best_scores[qi] = best[0], best[1]
+
+    if fallback:
+        keys, scores = fuzzy_best_matches([queries[i] for i in fallback], choices, score_cutoff, workers)
+        for qi, key, sc in zip(fallback, keys, scores):
+            best_keys[qi], best_scores[qi] = key, sc
+    LOG.debug("Fuzzy pruning: %d queries, %d scored exhaustively", len(queries), len(fallback))
+    return best_keys, best_scores
+
+
+def compare_requirement_to_schema(req: Dict[str, Any], schema_fields: Union["SchemaIndex", List[Dict[str, Any]]]) -> Dict[str, Any]:
+    # accept a prebuilt index so callers comparing many requirements build it once
+    index = _as_index(schema_fields)
+    req = as_requirement(req)
+    report, needs_fuzzy = _compare_exact(req, index)
 
     # fuzzy match
-    choices = [f["field_key"] for f in schema_fields]
-    if choices:
-        best: Tuple[str, int, int] = process.extractOne(req_key, choices, scorer=fuzz.token_sort_ratio) or (None, 0, None)
+    if needs_fuzzy:
+        best: Tuple[str, int, int] = process.extractOne(report["field_key"], index.choices, scorer=fuzz.token_sort_ratio, processor=None) or (None, 0, None)
         best_key, best_score, _ = best
-        report["best_match_key"] = best_key
-        report["best_match_score"] = int(best_score or 0)
-
-        if best_score >= 85:
-            # POSSIBLE_MATCH
-            s = next((f for f in schema_fields if f["field_key"] == best_key), None)
-            if s:
-                report["found"] = "POSSIBLE"
-                report["actual_type"] = s.get("type")
-                report["actual_required"] = _bool_to_str(s.get("required"))
-                report["raw_json_path"] = s.get("raw_json_path")
-                diffs = _compute_diffs(req, s)
-                report["differences"] = "; ".join(diffs) if diffs else ""
-                report["status"] = "POSSIBLE_MATCH"
-                return report
+        _apply_fuzzy(report, req, best_key, best_score, index)
 
     # else missing
     return report
 
 
-def _compute_diffs(req: Dict[str, Any], schema_field: Dict[str, Any]) -> List[str]:
+def iter_compare_blocks(
+    reqs: Iterable[Dict[str, Any]],
+    index: Union["SchemaIndex", List[Dict[str, Any]]],
+    workers: int = 1,
+    block_rows: int = FUZZY_BLOCK_ROWS,
+    fuzzy: Optional[Callable[[List[str]], Tuple[List[Optional[str]], List[float]]]] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield result rows block by block, in requirement order.
+
+    Each block of ``block_rows`` requirements gets an exact pass and then one
+    bulk fuzzy pass (see ``fuzzy_best_matches``) spread over ``workers``,
+    shortlisted by ``index.candidates`` when the index was built with pruning.
+    Requirements are consumed lazily, so callers can stream results out;
+    plain dicts are turned into ``Requirement`` records as they are read.
+
+    ``fuzzy`` replaces the bulk pass: it gets the block's unmatched keys and
+    returns the best choice and score for each, e.g. from a ``FuzzyMemo``.
+    MISSING rows report their closest key unless the index was built with
+    ``closest_missing=False``.
+    """
+    index = _as_index(index)
+    it = iter(reqs)
+    while True:
+        block = [as_requirement(r) for r in islice(it, block_rows)]
+        if not block:
+            return
+        rows: List[Dict[str, Any]] = []
+        pending: List[int] = []
+        for r in block:
+            report, needs_fuzzy = _compare_exact(r, index)
+            if needs_fuzzy:
+                pending.append(len(rows))
+            rows.append(report)
+
+        if pending:
+            queries = [rows[i]["field_key"] for i in pending]
+            if fuzzy is not None:
+                best_keys, best_scores = fuzzy(queries)
+            else:
+                # no cutoff: MISSING rows still report their closest key and score
+                best_keys, best_scores = fuzzy_best_matches(
+                    queries,
+                    index.choices,
+                    score_cutoff=None if index.closest_missing else FUZZY_THRESHOLD,
+                    workers=workers,
+                    candidates=index.candidates,
+                )
+            for i, best_key, best_score in zip(pending, best_keys, best_scores):
+                _apply_fuzzy(rows[i], block[i], best_key, best_score, index)
+        yield rows
+
+
+def compare_all(
+    reqs: Iterable[Dict[str, Any]],
+    index: Union["SchemaIndex", List[Dict[str, Any]]],
+    workers: int = 1,
+    progress: Optional[Callable[[int], None]] = None,
+    fuzzy: Optional[Callable[[List[str]], Tuple[List[Optional[str]], List[float]]]] = None,
+) -> List[Dict[str, Any]]:
+    """Compare every requirement against ``index`` (see ``iter_compare_blocks``).
+
+    ``progress`` is called with the number of finished rows after every block.
+    """
+    rows: List[Dict[str, Any]] = []
+    for block in iter_compare_blocks(reqs, index, workers=workers, fuzzy=fuzzy):
+        rows.extend(block)
+        if progress:
+            progress(len(rows))
+    return rows
+
+
+def count_statuses(rows: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    counts = {k: 0 for k in STATUSES}
+    for rep in rows:
+        st = rep.get("status")
+        if st in counts:
+            counts[st] += 1
+    return counts
+
+
+def _compute_diffs(req: Requirement, schema_field: Dict[str, Any], norm: Optional[FieldNorm] = None) -> List[str]:
+    # both sides arrive normalized: the requirement when its record was built, the field by SchemaIndex
+    req = as_requirement(req)
+    if norm is None:
+        norm = _normalize_field(schema_field)
     diffs: List[str] = []
     # type
-    if (req.get("type") or "").strip().lower() and (schema_field.get("type") or "").strip().lower():
-        if req.get("type").strip().lower() != str(schema_field.get("type")).strip().lower():
-            diffs.append(f"type: expected={req.get('type')} actual={schema_field.get('type')}")
+    if req.type_norm and norm.type:
+        if req.type_norm != norm.type:
+            diffs.append(f"type: expected={req.type} actual={schema_field.get('type')}")
 
     # required
-    r_expected = req.get("required")
+    r_expected = req.required
     r_actual = schema_field.get("required")
     if r_expected is not None and r_actual is not None:
         if bool(r_expected) != bool(r_actual):
             diffs.append(f"required: expected={r_expected} actual={r_actual}")
 
     # options
-    if req.get("options") and schema_field.get("options"):
-        exp_opts = [str(x).strip().lower() for x in (req.get("options") or [])]
-        act_opts_raw = schema_field.get("options")
-        if isinstance(act_opts_raw, dict):
-            act_opts = [str(v).strip().lower() for v in act_opts_raw.values()]
-        elif isinstance(act_opts_raw, list):
-            act_opts = [str(x).strip().lower() for x in act_opts_raw]
-        else:
-            act_opts = [str(act_opts_raw).strip().lower()]
-        if set(exp_opts) != set(act_opts):
-            diffs.append(f"options differ: expected={req.get('options')} actual={schema_field.get('options')}")
+    if req.options_norm is not None and norm.options is not None:
+        if req.options_norm != norm.options:
+            diffs.append(f"options differ: expected={req.options} actual={schema_field.get('options')}")
 
     # basic validations (min_len/max_len/regex)
-    val = schema_field.get("validations") or {}
-    if isinstance(val, dict):
-        if req.get("min_len") and val.get("minLength") and int(req.get("min_len")) != int(val.get("minLength")):
-            diffs.append(f"min_len: expected={req.get('min_len')} actual={val.get('minLength')}")
-        if req.get("max_len") and val.get("maxLength") and int(req.get("max_len")) != int(val.get("maxLength")):
-            diffs.append(f"max_len: expected={req.get('max_len')} actual={val.get('maxLength')}")
-        if req.get("regex") and val.get("pattern") and str(req.get("regex")).strip() != str(val.get("pattern")).strip():
-            diffs.append(f"regex: expected={req.get('regex')} actual={val.get('pattern')}")
+    if req.min_len or req.max_len or req.regex:
+        val = schema_field.get("validations") or {}
+        if req.min_len and norm.min_len and int(req.min_len) != norm.min_len:
+            diffs.append(f"min_len: expected={req.min_len} actual={val.get('minLength')}")
+        if req.max_len and norm.max_len and int(req.max_len) != norm.max_len:
+            diffs.append(f"max_len: expected={req.max_len} actual={val.get('maxLength')}")
+        if req.regex and norm.pattern and req.regex_norm != norm.pattern:
+            diffs.append(f"regex: expected={req.regex} actual={val.get('pattern')}")
 
     return diffs
 
 
-__all__ = ["compare_requirement_to_schema"]
+__all__ = [
+    "compare_requirement_to_schema",
+    "compare_all",
+    "iter_compare_blocks",
+    "count_statuses",
+    "fuzzy_best_matches",
+    "SchemaIndex",
+    "STATUSES",
+    "FUZZY_THRESHOLD",
+]
@@ -0,0 +1,52 @@
+import logging
+from typing import Any, Dict, List, Tuple
+
+from .matcher import SchemaIndex, compare_all, count_statuses
+
+LOG = logging.getLogger(__name__)
+
+# per-schema columns of a matrix row, prefixed with the schema name ("dev:status")
+MATRIX_FIELDS = ("status", "best_match_key", "differences")
+
+
+def matrix_columns(names: List[str]) -> List[str]:
+    columns = ["req_id", "field_key"]
+    for name in names:
+        columns += [f"{name}:{f}" for f in MATRIX_FIELDS]
+    return columns + ["diverges", "divergence"]
+
+
+def compare_matrix(
+    reqs: List[Dict[str, Any]], indexes: Dict[str, SchemaIndex], workers: int = 1
+) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, int]]]:
+    """Compare the requirements against every schema in ``indexes`` (name -> index).
+
+    Returns ``(rows, counts)``: one row per requirement with its status, best
+    match and differences for each schema, and per-schema status counts. A
+    row ``diverges`` when the schemas disagree on its status or differences;
+    ``divergence`` then lists each schema's status.
+    """
+    names = list(indexes)
+    results = {}
+    counts = {}
+    for name, index in indexes.items():
+        results[name] = compare_all(reqs, index, workers=workers)
+        counts[name] = count_statuses(results[name])
+        LOG.debug("Matrix: compared %d requirements against %s", len(reqs), name)
+
+    rows = []
+    for i, req in enumerate(reqs):
+        row = {"req_id": req.get("req_id"), "field_key": req.get("field_key")}
+        for name in names:
+            r = results[name][i]
+            for f in MATRIX_FIELDS:
+                row[f"{name}:{f}"] = r.get(f)
+        statuses = [row[f"{name}:status"] for name in names]
+        diffs = [row[f"{name}:differences"] for name in names]
+        row["diverges"] = len(set(statuses)) > 1 or len(set(diffs)) > 1
+        row["divergence"] = ", ".join(f"{n}={s}" for n, s in zip(names, statuses)) if row["diverges"] else ""
+        rows.append(row)
+    return rows, counts
+
+
+__all__ = ["compare_matrix", "matrix_columns", "MATRIX_FIELDS"]
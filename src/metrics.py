@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+LOG = logging.getLogger(__name__)
+
+# stages of one comparison, in pipeline order
+STAGES = ("load_requirements", "fetch_schema", "extract_fields", "index_schema", "match", "write_report")
+# seconds
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# rows, fields and bytes
+SIZE_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000, 1_000_000_000)
+# per-comparison values kept by Timings.set -> (metric name, help)
+VALUE_METRICS = {
+    "rows": ("qapilot_comparison_rows", "Requirement rows per comparison."),
+    "fields": ("qapilot_schema_fields", "Schema fields per comparison."),
+    "schema_bytes": ("qapilot_schema_bytes", "Schema body size per comparison."),
+    "fuzzy_fallbacks": ("qapilot_fuzzy_fallbacks", "Rows per comparison without an exact key match."),
+}
+
+
+class Timings:
+    """Stage durations and sizes of one comparison.
+
+    ``stage`` accumulates, so a stage entered once per block adds up; the
+    object may be shared by the threads working on the same comparison.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def set(self, name: str, value: Optional[float]) -> None:
+        if value is not None:
+            self.values[name] = value
+
+    def _ordered(self) -> List[Tuple[str, float]]:
+        order = {s: i for i, s in enumerate(STAGES)}
+        return sorted(self.stages.items(), key=lambda kv: order.get(kv[0], len(order)))
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` header value, durations in milliseconds."""
+        return ", ".join(f"{name};dur={secs * 1000:.1f}" for name, secs in self._ordered())
+
+    def summary(self) -> str:
+        parts = [f"{name}={secs:.3f}s" for name, secs in self._ordered()]
+        parts += [f"{name}={value:g}" for name, value in self.values.items()]
+        return " ".join(parts)
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Cumulative histograms and counters rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> (type, help, buckets, {labels: histogram or count})
+        self._families: Dict[str, Tuple[str, str, Sequence[float], Dict[Tuple[Tuple[str, str], ...], object]]] = {}
+
+    def _family(self, name: str, kind: str, help_text: str, buckets: Sequence[float] = ()):
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = (kind, help_text, buckets, {})
+        return family[3]
+
+    def observe(self, name: str, value: float, help_text: str, buckets: Sequence[float] = TIME_BUCKETS, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._family(name, "histogram", help_text, buckets)
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(buckets)
+            hist.observe(value)
+
+    def inc(self, name: str, help_text: str, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._family(name, "counter", help_text)
+            series[key] = series.get(key, 0) + amount
+
+    def record(self, timings: Timings, endpoint: str) -> None:
+        """Add one finished comparison."""
+        for name, secs in timings.stages.items():
+            self.observe("qapilot_stage_seconds", secs, "Time spent per comparison stage.", stage=name)
+        for name, value in timings.values.items():
+            if name in VALUE_METRICS:
+                metric, help_text = VALUE_METRICS[name]
+                self.observe(metric, value, help_text, buckets=SIZE_BUCKETS)
+        self.inc("qapilot_comparisons_total", "Finished comparisons.", endpoint=endpoint)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, help_text, buckets, series) in sorted(self._families.items()):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(series.items()):
+                    if kind == "counter":
+                        lines.append(f"{name}{_labels(key)} {_num(value)}")
+                        continue
+                    cumulative = 0
+                    for bound, n in zip(value.buckets, value.counts):
+                        cumulative += n
+                        lines.append(f"{name}_bucket{_labels(key, le=_num(bound))} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(key, le='+Inf')} {value.count}")
+                    lines.append(f"{name}_sum{_labels(key)} {_num(value.sum)}")
+                    lines.append(f"{name}_count{_labels(key)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _num(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not float(value).is_integer() else str(int(value))
+
+
+def _labels(key: Tuple[Tuple[str, str], ...], **extra: str) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+__all__ = ["Timings", "MetricsRegistry", "STAGES", "TIME_BUCKETS", "SIZE_BUCKETS"]
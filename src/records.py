@@ -0,0 +1,174 @@
+import logging
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+LOG = logging.getLogger(__name__)
+
+REQUIREMENT_FIELDS = (
+    "req_id",
+    "field_key",
+    "type",
+    "required",
+    "label",
+    "min_len",
+    "max_len",
+    "regex",
+    "options",
+)
+_REQUIREMENT_FIELD_SET = frozenset(REQUIREMENT_FIELDS)
+
+
+# requirement columns repeat a handful of values, so each distinct string is normalized once
+# (only plain strings are cached: 1, 1.0 and True would share a cache entry)
+@lru_cache(maxsize=4096)
+def _norm_str(value: str) -> str:
+    return value.strip().lower()
+
+
+@lru_cache(maxsize=4096)
+def _norm_str_tuple(values: tuple) -> FrozenSet[str]:
+    return frozenset(x.strip().lower() for x in values)
+
+
+def norm_text(value: Any) -> str:
+    if type(value) is str:
+        return _norm_str(value)
+    return str(value or "").strip().lower()
+
+
+def norm_options(values: Optional[Iterable[Any]]) -> Optional[FrozenSet[str]]:
+    if not values:
+        return None
+    values = tuple(values)
+    if all(type(x) is str for x in values):
+        return _norm_str_tuple(values)
+    return frozenset(str(x).strip().lower() for x in values)
+
+
+class Requirement:
+    """One requirement row with its normalized values computed once.
+
+    Reads like the dict it replaces (``req["type"]``, ``req.get("options")``)
+    so callers can keep using either; ``to_dict`` converts it back at the
+    API/report boundary. ``key``/``key_lower`` hold the stripped field key,
+    ``type_norm``, ``options_norm`` and ``regex_norm`` the values
+    ``_compute_diffs`` compares.
+    """
+
+    __slots__ = REQUIREMENT_FIELDS + ("key", "key_lower", "type_norm", "options_norm", "regex_norm")
+
+    def __init__(
+        self,
+        req_id: Any = None,
+        field_key: Optional[str] = None,
+        type: Optional[str] = None,
+        required: Optional[bool] = None,
+        label: Optional[str] = None,
+        min_len: Optional[int] = None,
+        max_len: Optional[int] = None,
+        regex: Optional[str] = None,
+        options: Optional[list] = None,
+    ):
+        self.req_id = req_id
+        self.field_key = field_key
+        self.type = type
+        self.required = required
+        self.label = label
+        self.min_len = min_len
+        self.max_len = max_len
+        self.regex = regex
+        self.options = options
+        self.key = (field_key or "").strip()
+        self.key_lower = self.key.lower()
+        self.type_norm = norm_text(type)
+        self.options_norm = norm_options(options)
+        self.regex_norm = str(regex).strip() if regex else None
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> "Requirement":
+        return cls(*(record.get(k) for k in REQUIREMENT_FIELDS))
+
+    @classmethod
+    def from_parts(
+        cls,
+        req_id: Any,
+        field_key: Optional[str],
+        type: Optional[str],
+        required: Optional[bool],
+        label: Optional[str],
+        min_len: Optional[int],
+        max_len: Optional[int],
+        regex: Optional[str],
+        options: Optional[list],
+        key_lower: str,
+        type_norm: str,
+        options_norm: Optional[FrozenSet[str]],
+    ) -> "Requirement":
+        """Build a record from values the caller already normalized.
+
+        ``field_key`` and ``regex`` must already be stripped. The loader uses
+        this to normalize each distinct column value once instead of once per row.
+        """
+        self = cls.__new__(cls)
+        self.req_id = req_id
+        self.field_key = self.key = field_key
+        self.type = type
+        self.required = required
+        self.label = label
+        self.min_len = min_len
+        self.max_len = max_len
+        self.regex = self.regex_norm = regex
+        self.options = options
+        self.key_lower = key_lower
+        self.type_norm = type_norm
+        self.options_norm = options_norm
+        return self
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name in _REQUIREMENT_FIELD_SET:
+            return getattr(self, name)
+        return default
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in _REQUIREMENT_FIELD_SET:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in _REQUIREMENT_FIELD_SET
+
+    def keys(self):
+        return iter(REQUIREMENT_FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in REQUIREMENT_FIELDS}
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Requirement):
+            return all(getattr(self, k) == getattr(other, k) for k in REQUIREMENT_FIELDS)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Requirement({self.to_dict()!r})"
+
+
+def as_requirement(req: Any) -> Requirement:
+    return req if isinstance(req, Requirement) else Requirement.from_dict(req)
+
+
+class FieldNorm:
+    """Normalized view of one schema field, built once per field by ``SchemaIndex``."""
+
+    __slots__ = ("type", "options", "min_len", "max_len", "pattern")
+
+    def __init__(self, type: str, options: Optional[FrozenSet[str]], min_len: Optional[int], max_len: Optional[int], pattern: Optional[str]):
+        self.type = type
+        self.options = options
+        self.min_len = min_len
+        self.max_len = max_len
+        self.pattern = pattern
+
+
+__all__ = ["Requirement", "FieldNorm", "as_requirement", "norm_text", "norm_options", "REQUIREMENT_FIELDS"]
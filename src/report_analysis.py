@@ -0,0 +1,276 @@
+import abc
+import hashlib
+import inspect
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .report_writer import sidecar_paths
+
+LOG = logging.getLogger(__name__)
+
+# seconds per analysis request
+ANALYSIS_TIMEOUT = float(os.environ.get("ANALYSIS_TIMEOUT", "90"))
+# known Generative API endpoint variants, tried in order until one answers
+GENAI_ENDPOINTS = (
+    "https://generativelanguage.googleapis.com/v1/models/text-bison-001:generate?key={key}",
+    "https://generativelanguage.googleapis.com/v1beta2/models/text-bison-001:generate?key={key}",
+)
+
+
+class AnalysisUnavailable(Exception):
+    """The backend could not produce an analysis; callers fall back to ``simulated_analysis``."""
+
+
+def build_prompt(summary: Dict[str, Any]) -> str:
+    counts = summary.get("status_counts") or None
+    prompt_lines = []
+    prompt_lines.append('You are an expert QA analyst. Provide a concise summary and a full-length report analysis of the QA comparison results. Use the provided counts and examples to ground your observations and cite example req_id values where relevant.')
+    if counts:
+        prompt_lines.append('Counts:')
+        for k, v in counts.items():
+            prompt_lines.append(f"- {k}: {v}")
+    prompt_lines.append('Here are up to 10 example rows (selected mismatches first) in JSON format:')
+    prompt_lines.append(json.dumps(summary.get("samples"), indent=2, ensure_ascii=False))
+    prompt_lines.append('Produce: (1) a short summary paragraph (max 80-100 words) that highlights the most important findings, and (2) a longer full-length analysis (around 400-1200 words) that discusses patterns, the most common mismatches, references specific example req_id values, provides technical recommendations, and suggests next steps for remediation. Return both clearly labelled.')
+    return '\n\n'.join(prompt_lines)
+
+
+def _response_text(data: Any) -> str:
+    # attempt to extract content from known response shapes
+    try:
+        if isinstance(data, dict):
+            if 'candidates' in data and len(data['candidates']) > 0:
+                return data['candidates'][0].get('content') or data['candidates'][0].get('output')
+            if 'outputs' in data and len(data['outputs']) > 0:
+                out = data['outputs'][0]
+                return out.get('content') or out.get('text')
+            if 'output' in data and isinstance(data['output'], list) and len(data['output']) > 0:
+                return data['output'][0].get('content')
+            if 'candidates' in data:
+                return json.dumps(data['candidates'])
+            return json.dumps(data)
+        return str(data)
+    except Exception:
+        return str(data)
+
+
+def simulated_analysis(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Heuristic analysis built from the counts alone, used when no backend is reachable."""
+    samples = summary.get("samples")
+    sim_counts = summary.get("status_counts") or {}
+    matched = int(sim_counts.get('MATCHED', 0) or 0)
+    mism = int(sim_counts.get('MISMATCH', 0) or 0)
+    miss = int(sim_counts.get('MISSING', 0) or 0)
+    total = max(1, matched + mism + miss)
+    score = int(max(40, min(95, round((matched / total) * 100))))
+    # heuristics for timings (ms)
+    fcp = f"{int(800 + (100 - score) * 12)}ms"
+    lcp = f"{int(1400 + (100 - score) * 14)}ms"
+    tbt = f"{int(80 + (100 - score) * 4)}ms"
+    speedIndex = f"{int(900 + (100 - score) * 10)}ms"
+    advice = (
+        "Minimize main-thread work by deferring non-critical JavaScript, "
+        "compress and properly size images, and add explicit caching headers for static assets."
+    )
+    structured = {
+        "performanceScore": score,
+        "fcp": fcp,
+        "lcp": lcp,
+        "tbt": tbt,
+        "speedIndex": speedIndex,
+        "advice": advice,
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "examples": samples,
+    }
+    # short summary and a longer analysis text
+    # reference a few example req_ids in the long text to tie analysis to actual data
+    example_ids = [str(x.get('req_id')) for x in (samples or []) if x.get('req_id')][:3]
+    examples_str = ', '.join(example_ids) if example_ids else 'N/A'
+    short = f"Summary: overall score {score}. Most issues relate to resource loading and main-thread work. Example affected req_ids: {examples_str}."
+    long_lines = [short, "\nRecommendations:"]
+    long_lines.append("- Defer non-critical JavaScript and split bundles to reduce main-thread work.")
+    long_lines.append("- Optimize and compress images; use responsive image sizes.")
+    long_lines.append("- Apply caching and CDN for static assets; minimize time to first byte.")
+    return {"analysis": "\n".join(long_lines), "structured": structured, "simulated": True}
+
+
+class AnalysisBackend(abc.ABC):
+    """Turns a report summary (see ``ReportSummary``) into the ``/reports/analysis`` response.
+
+    ``name`` keys the cached analyses, so results from different backends
+    never mix. ``analyze`` raises ``AnalysisUnavailable`` when it cannot answer.
+    """
+
+    name = "base"
+
+    @abc.abstractmethod
+    async def analyze(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        ...
+
+
+class SimulatedBackend(AnalysisBackend):
+    name = "simulated"
+
+    async def analyze(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        return simulated_analysis(summary)
+
+
+class GenerativeBackend(AnalysisBackend):
+    """Posts the prompt to text-generation endpoints speaking the Generative API ``generate`` shape.
+
+    ``client`` returns the shared ``httpx.AsyncClient``. Endpoints that
+    answered 404 are skipped on later calls instead of being retried on
+    every request.
+    """
+
+    def __init__(self, name: str, endpoints: List[str], client: Callable[[], httpx.AsyncClient], timeout: float = ANALYSIS_TIMEOUT):
+        self.name = name
+        self.endpoints = list(endpoints)
+        self.client = client
+        self.timeout = timeout
+        self._missing: set = set()
+
+    async def analyze(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        payload = {
+            "prompt": {"text": build_prompt(summary)},
+            "temperature": 0.2,
+            "maxOutputTokens": 1500,
+        }
+        last_err: Optional[Exception] = None
+        for url in self.endpoints:
+            if url in self._missing:
+                continue
+            # the query string carries the API key
+            shown = urlsplit(url)._replace(query="").geturl()
+            try:
+                resp = await self.client().post(url, json=payload, timeout=self.timeout)
+                resp.raise_for_status()
+                return {"analysis": _response_text(resp.json())}
+            except httpx.HTTPStatusError as he:
+                last_err = he
+                LOG.warning("Analysis backend %s: HTTP error for %s: %s (response: %s)", self.name, shown, he.response.status_code, he.response.text[:500])
+                if he.response.status_code == 404:
+                    self._missing.add(url)
+                    continue
+                break
+            except Exception as e:
+                last_err = e
+                LOG.warning("Analysis backend %s: request to %s failed: %r", self.name, shown, e)
+                continue
+        raise AnalysisUnavailable(str(last_err) if last_err else "no usable endpoint")
+
+
+def _genai_backend(client: Callable[[], httpx.AsyncClient]) -> AnalysisBackend:
+    api_key = os.environ.get('GENAI_API_KEY')
+    if not api_key:
+        raise ValueError("GENAI_API_KEY not set on server")
+    return GenerativeBackend("genai", [e.format(key=api_key) for e in GENAI_ENDPOINTS], client)
+
+
+def _local_backend(client: Callable[[], httpx.AsyncClient]) -> AnalysisBackend:
+    # a local stand-in model server exposing the same generate API
+    url = os.environ.get("ANALYSIS_LOCAL_URL")
+    if not url:
+        raise ValueError("ANALYSIS_LOCAL_URL not set on server")
+    return GenerativeBackend("local", [url], client)
+
+
+# ANALYSIS_BACKEND name -> factory taking the shared HTTP client getter
+BACKENDS: Dict[str, Callable[[Callable[[], httpx.AsyncClient]], AnalysisBackend]] = {
+    "genai": _genai_backend,
+    "local": _local_backend,
+    "simulated": lambda client: SimulatedBackend(),
+}
+
+
+def register_backend(name: str, factory: Callable[[Callable[[], httpx.AsyncClient]], AnalysisBackend]) -> None:
+    """Register ``factory`` as ``name``; a backend class that leaves ``analyze`` abstract is rejected here."""
+    if inspect.isclass(factory) and inspect.isabstract(factory):
+        raise TypeError(f"analysis backend {name!r} does not implement analyze()")
+    BACKENDS[name] = factory
+
+
+def make_backend(name: str, client: Callable[[], httpx.AsyncClient]) -> AnalysisBackend:
+    """Build the backend registered as ``name``; raises ValueError when it is unknown or unconfigured."""
+    factory = BACKENDS.get(name)
+    if factory is None:
+        raise ValueError(f"unknown analysis backend {name!r} (known: {', '.join(sorted(BACKENDS))})")
+    return factory(client)
+
+
+def _report_key(path: str) -> Dict[str, int]:
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def _content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_sidecar(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(sidecar_paths(path)[3], encoding="utf-8") as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_sidecar(path: str, entry: Dict[str, Any]) -> None:
+    target = sidecar_paths(path)[3]
+    tmp = target + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fp:
+        json.dump(entry, fp, ensure_ascii=False, default=str)
+    os.replace(tmp, target)
+
+
+def _current_entry(path: str) -> Dict[str, Any]:
+    # the sidecar is valid while the report's content hash matches; the file key
+    # (mtime, size) only saves rehashing a report that was not touched
+    key = _report_key(path)
+    entry = _load_sidecar(path)
+    if entry and entry.get("report_key") == key:
+        return entry
+    content_hash = _content_hash(path)
+    if entry and entry.get("content_hash") == content_hash:
+        entry["report_key"] = key
+        return entry
+    return {"content_hash": content_hash, "report_key": key, "analyses": {}}
+
+
+def cached_analysis(path: str, backend: str) -> Optional[Dict[str, Any]]:
+    """Return the analysis ``backend`` produced for this report's content, or None."""
+    return _current_entry(path)["analyses"].get(backend)
+
+
+def store_analysis(path: str, backend: str, result: Dict[str, Any]) -> None:
+    entry = _current_entry(path)
+    entry["analyses"][backend] = result
+    try:
+        _write_sidecar(path, entry)
+    except OSError as e:
+        LOG.debug("Could not write analysis cache for %s: %s", path, e)
+
+
+__all__ = [
+    "AnalysisBackend",
+    "AnalysisUnavailable",
+    "GenerativeBackend",
+    "SimulatedBackend",
+    "BACKENDS",
+    "register_backend",
+    "make_backend",
+    "build_prompt",
+    "simulated_analysis",
+    "cached_analysis",
+    "store_analysis",
+]
@@ -0,0 +1,183 @@
+import logging
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .report_writer import is_report_file, read_report_summary, report_format
+
+LOG = logging.getLogger(__name__)
+
+CATALOG_NAME = "catalog.sqlite3"
+# status -> catalog column
+STATUS_COLUMNS = {"MATCHED": "matched", "MISMATCH": "mismatch", "MISSING": "missing", "POSSIBLE_MATCH": "possible_match"}
+SORT_COLUMNS = ("name", "modified", "size", "rows", "matched", "mismatch", "missing", "possible_match")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    format TEXT,
+    size INTEGER,
+    modified REAL,
+    rows INTEGER,
+    matched INTEGER,
+    mismatch INTEGER,
+    missing INTEGER,
+    possible_match INTEGER,
+    schema_url TEXT,
+    schema_id TEXT,
+    requirements_name TEXT
+);
+CREATE INDEX IF NOT EXISTS reports_modified ON reports (modified);
+CREATE INDEX IF NOT EXISTS reports_schema_url ON reports (schema_url);
+"""
+
+
+class ReportCatalog:
+    """SQLite index of the reports in one directory.
+
+    Entries are added when the app writes a report and removed when it
+    deletes one; ``sync`` reconciles the catalog with files changed behind
+    its back. Each call opens its own connection, so the catalog can be used
+    from any thread.
+    """
+
+    def __init__(self, directory: Path, path: Optional[Path] = None):
+        self.directory = Path(directory)
+        self.path = Path(path) if path else self.directory / CATALOG_NAME
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(str(self.path), timeout=30)
+        db.row_factory = sqlite3.Row
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            # one transaction per call
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def add(
+        self,
+        report_path: str,
+        schema_url: Optional[str] = None,
+        schema_id: Optional[str] = None,
+        requirements_name: Optional[str] = None,
+    ) -> int:
+        """Insert or refresh the entry for ``report_path`` and return its id."""
+        p = Path(report_path)
+        st = p.stat()
+        summary = read_report_summary(str(p)) or {}
+        counts = summary.get("status_counts") or {}
+        values = {
+            "name": p.name,
+            "path": str(p),
+            "format": report_format(p.name),
+            "size": st.st_size,
+            "modified": st.st_mtime,
+            "rows": summary.get("rows"),
+            "schema_url": schema_url,
+            "schema_id": schema_id,
+            "requirements_name": requirements_name,
+        }
+        for status, col in STATUS_COLUMNS.items():
+            values[col] = counts.get(status, 0) if summary else None
+
+        cols = ", ".join(values)
+        marks = ", ".join(f":{c}" for c in values)
+        # keep source details recorded earlier when a refresh does not know them
+        updates = ", ".join(
+            f"{c} = COALESCE(excluded.{c}, {c})" if c in ("schema_url", "schema_id", "requirements_name") else f"{c} = excluded.{c}"
+            for c in values if c != "name"
+        )
+        with self._connect() as db:
+            db.execute(f"INSERT INTO reports ({cols}) VALUES ({marks}) ON CONFLICT(name) DO UPDATE SET {updates}", values)
+            return db.execute("SELECT id FROM reports WHERE name = ?", (p.name,)).fetchone()["id"]
+
+    def remove(self, report_path: str) -> None:
+        with self._connect() as db:
+            db.execute("DELETE FROM reports WHERE name = ?", (Path(report_path).name,))
+
+    def get(self, report_id: int) -> Optional[Dict[str, Any]]:
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM reports WHERE id = ?", (report_id,)).fetchone()
+        return _entry(row) if row else None
+
+    def query(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        sort: str = "modified",
+        order: str = "desc",
+        q: Optional[str] = None,
+        status: Optional[str] = None,
+        fmt: Optional[str] = None,
+        schema_url: Optional[str] = None,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Return ``(total, entries)`` for one page of matching reports.
+
+        ``q`` matches the report name, schema URL or requirements file name;
+        ``status`` keeps reports with at least one row in that status.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"cannot sort by {sort!r}")
+        direction = "ASC" if str(order).lower() == "asc" else "DESC"
+
+        where, params = [], []
+        if q:
+            where.append("(name LIKE ? OR schema_url LIKE ? OR requirements_name LIKE ?)")
+            params += [f"%{q}%"] * 3
+        if status:
+            col = STATUS_COLUMNS.get(status.upper())
+            if col is None:
+                raise ValueError(f"unknown status {status!r}")
+            where.append(f"{col} > 0")
+        if fmt:
+            where.append("format = ?")
+            params.append(fmt)
+        if schema_url:
+            where.append("schema_url = ?")
+            params.append(schema_url)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        with self._connect() as db:
+            total = db.execute(f"SELECT COUNT(*) FROM reports {clause}", params).fetchone()[0]
+            rows = db.execute(
+                f"SELECT * FROM reports {clause} ORDER BY {sort} {direction}, id {direction} LIMIT ? OFFSET ?",
+                params + [max(0, int(limit)), max(0, int(offset))],
+            ).fetchall()
+        return total, [_entry(r) for r in rows]
+
+    def sync(self) -> Tuple[int, int]:
+        """Add report files missing from the catalog and drop entries whose file is gone."""
+        on_disk = {p.name: p for p in self.directory.iterdir() if p.is_file() and is_report_file(p.name)}
+        with self._connect() as db:
+            known = {r["name"]: (r["size"], r["modified"]) for r in db.execute("SELECT name, size, modified FROM reports")}
+            gone = [name for name in known if name not in on_disk]
+            db.executemany("DELETE FROM reports WHERE name = ?", [(n,) for n in gone])
+        added = 0
+        for name, p in on_disk.items():
+            st = p.stat()
+            if known.get(name) != (st.st_size, st.st_mtime):
+                self.add(str(p))
+                added += 1
+        if added or gone:
+            LOG.info("Report catalog synced: %d added or refreshed, %d removed", added, len(gone))
+        return added, len(gone)
+
+
+def _entry(row: sqlite3.Row) -> Dict[str, Any]:
+    entry = dict(row)
+    entry["modified"] = datetime.utcfromtimestamp(entry["modified"]).isoformat() + "Z"
+    counts = {status: entry.pop(col) for status, col in STATUS_COLUMNS.items()}
+    entry["counts"] = counts if entry["rows"] is not None else None
+    return entry
+
+
+__all__ = ["ReportCatalog", "CATALOG_NAME"]
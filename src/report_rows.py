@@ -0,0 +1,134 @@
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .report_writer import read_report, sidecar_paths
+
+LOG = logging.getLogger(__name__)
+
+# bumped when the index layout changes, so older sidecars are rebuilt
+ROW_INDEX_VERSION = 2
+# columns ``q`` searches, each stored as TEXT with a NOCASE index
+SEARCH_COLUMNS = ("field_key", "best_match_key")
+# one build at a time per report
+_BUILD_LOCKS: Dict[str, threading.Lock] = {}
+_BUILD_LOCKS_GUARD = threading.Lock()
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _build_lock(path: str) -> threading.Lock:
+    with _BUILD_LOCKS_GUARD:
+        return _BUILD_LOCKS.setdefault(path, threading.Lock())
+
+
+def ensure_row_index(report_path: str) -> str:
+    """Return the SQLite row index of a report, building it if missing or stale.
+
+    The index is a sidecar (see ``sidecar_paths``) holding every row in
+    report order with indexes on ``status`` and the ``SEARCH_COLUMNS``.
+    """
+    index_path = sidecar_paths(report_path)[2]
+    with _build_lock(index_path):
+        try:
+            if os.path.getmtime(index_path) >= os.path.getmtime(report_path) and _index_version(index_path) == ROW_INDEX_VERSION:
+                return index_path
+        except (OSError, sqlite3.Error):
+            pass
+        _build_row_index(report_path, index_path)
+    return index_path
+
+
+def _index_version(index_path: str) -> int:
+    db = sqlite3.connect(index_path)
+    try:
+        return db.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        db.close()
+
+
+def _build_row_index(report_path: str, index_path: str) -> None:
+    df = read_report(report_path)
+    columns = [str(c) for c in df.columns]
+    values = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+    tmp = index_path + ".tmp"
+    if os.path.exists(tmp):
+        os.unlink(tmp)
+    db = sqlite3.connect(tmp)
+    try:
+        with db:
+            # TEXT affinity on the searched columns lets LIKE use their NOCASE indexes
+            defs = ", ".join(_quote(c) + (" TEXT" if c in SEARCH_COLUMNS else "") for c in columns)
+            db.execute(f"CREATE TABLE rows (seq INTEGER PRIMARY KEY, {defs})")
+            marks = ", ".join("?" for _ in columns)
+            db.executemany(f"INSERT INTO rows ({', '.join(_quote(c) for c in columns)}) VALUES ({marks})", values)
+            if "status" in columns:
+                db.execute("CREATE INDEX rows_status ON rows (status)")
+            for c in SEARCH_COLUMNS:
+                if c in columns:
+                    db.execute(f"CREATE INDEX rows_{c} ON rows ({_quote(c)} COLLATE NOCASE)")
+            db.execute(f"PRAGMA user_version = {ROW_INDEX_VERSION}")
+    finally:
+        db.close()
+    os.replace(tmp, index_path)
+    LOG.debug("Built row index for %s (%d rows)", report_path, len(df))
+
+
+def query_rows(
+    report_path: str,
+    status: Optional[str] = None,
+    q: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 100,
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """Return ``(total, rows)`` for one page of a report's rows, in report order.
+
+    ``status`` matches exactly (case-insensitive); ``q`` is a case-insensitive
+    prefix of ``field_key`` or ``best_match_key``. Prefix rather than substring
+    matching, so the filter is a range scan of the columns' NOCASE indexes
+    instead of a scan of every row.
+    """
+    index_path = ensure_row_index(report_path)
+    db = sqlite3.connect(index_path)
+    db.row_factory = sqlite3.Row
+    try:
+        columns = [r["name"] for r in db.execute("PRAGMA table_info(rows)")]
+        where, params = [], []
+        if status:
+            if "status" not in columns:
+                return 0, []
+            where.append("status = ?")
+            params.append(status.upper())
+        if q:
+            searched = [c for c in SEARCH_COLUMNS if c in columns]
+            if not searched:
+                return 0, []
+            where.append("(" + " OR ".join(f"{_quote(c)} LIKE ? ESCAPE '\\'" for c in searched) + ")")
+            params += [_like_prefix(q)] * len(searched)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        total = db.execute(f"SELECT COUNT(*) FROM rows {clause}", params).fetchone()[0]
+        page = db.execute(
+            f"SELECT * FROM rows {clause} ORDER BY seq LIMIT ? OFFSET ?",
+            params + [max(0, int(limit)), max(0, int(offset))],
+        ).fetchall()
+    finally:
+        db.close()
+    rows = []
+    for r in page:
+        row = dict(r)
+        del row["seq"]
+        rows.append(row)
+    return total, rows
+
+
+def _like_prefix(q: str) -> str:
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+__all__ = ["ensure_row_index", "query_rows"]
@@ -1,36 +1,98 @@
+import logging
+import shutil
 from pathlib import Path
-import pandas as pd
-import matplotlib.pyplot as plt
+from typing import Dict, List, Optional
 import json
 
+from .report_writer import load_report_summary
+
+LOG = logging.getLogger(__name__)
+
+VISUALS_SUFFIX = "_visuals"
+# written last into a visuals folder; records which report version the images show
+VISUALS_MANIFEST = "visuals.json"
+
+
+def visuals_dir(report_path: str, out_base: Path) -> Path:
+    return Path(out_base) / f"{Path(report_path).stem}{VISUALS_SUFFIX}"
+
+
+def _report_key(p: Path) -> Dict[str, int]:
+    st = p.stat()
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def cached_report_visuals(report_path: str, out_base: Path) -> Optional[List[str]]:
+    """Return the images already rendered for this version of the report, or None."""
+    p = Path(report_path)
+    if not p.exists():
+        raise FileNotFoundError(report_path)
+    out_dir = visuals_dir(report_path, out_base)
+    try:
+        with open(out_dir / VISUALS_MANIFEST, encoding="utf-8") as fp:
+            manifest = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    images = [out_dir / name for name in manifest.get("images", [])]
+    if manifest.get("report") != p.name or manifest.get("key") != _report_key(p):
+        return None
+    if not all(img.exists() for img in images):
+        return None
+    return [str(x) for x in images]
+
+
+def evict_orphaned_visuals(out_base: Path) -> int:
+    """Remove visuals folders whose report no longer exists; return how many."""
+    out_base = Path(out_base)
+    stems = {f.stem for f in out_base.iterdir() if f.is_file()}
+    removed = 0
+    for d in out_base.glob(f"*{VISUALS_SUFFIX}"):
+        if d.is_dir() and d.name[: -len(VISUALS_SUFFIX)] not in stems:
+            shutil.rmtree(d, ignore_errors=True)
+            removed += 1
+    if removed:
+        LOG.info("Removed %d orphaned visuals folders", removed)
+    return removed
+
+
+def _pyplot():
+    # matplotlib and pandas are imported on the first render, not at server start
+    import matplotlib
+    # headless backend: charts are rendered on server worker threads
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
 
 def generate_report_visuals(report_path: str, out_base: Path) -> list:
     """Generate PNG visualizations for a report file and return list of output file paths.
 
-    report_path: path to .xlsx or .csv report generated by the app
+    report_path: path to a report generated by the app (.xlsx, .csv, .csv.gz or .parquet)
     out_base: base directory (typically REPORTS_DIR) where visuals folder will be created
     """
     p = Path(report_path)
     if not p.exists():
         raise FileNotFoundError(report_path)
+    # taken before reading, so a report rewritten meanwhile is re-rendered next time
+    key = _report_key(p)
 
-    # load dataframe
-    if p.suffix.lower() in (".xls", ".xlsx"):
-        df = pd.read_excel(p)
-    else:
-        df = pd.read_csv(p)
+    # counts and longest differences come from the report's JSON summary sidecar
+    summary = load_report_summary(str(p))
 
     # ensure status column
-    if "status" not in df.columns:
+    if "status" not in summary["columns"]:
         raise ValueError("report missing 'status' column")
 
-    out_dir = out_base / f"{p.stem}_visuals"
+    out_dir = visuals_dir(report_path, out_base)
     out_dir.mkdir(parents=True, exist_ok=True)
 
+    import pandas as pd
+    plt = _pyplot()
+
     images = []
 
     # Pie chart of statuses
-    status_counts = df['status'].value_counts()
+    status_counts = pd.Series(summary["status_counts"], dtype="int64")
     fig, ax = plt.subplots(figsize=(6,6), facecolor="#0b0f14")
     colors = {
         'MATCHED':'#064e3b',
@@ -71,14 +133,13 @@ def generate_report_visuals(report_path: str, out_base: Path) -> list:
     images.append(out_path2)
 
     # Small diagnostics: top mismatches by difference length (if differences column exists)
-    if 'differences' in df.columns:
+    if 'differences' in summary["columns"]:
         try:
-            difflen = df['differences'].fillna('').apply(lambda x: len(str(x)))
-            top = difflen.sort_values(ascending=False).head(10)
+            top = summary["top_differences"]
             fig, ax = plt.subplots(figsize=(8,4), facecolor="#0b0f14")
-            ax.barh(range(len(top)), top.values, color='#0ea5a4')
+            ax.barh(range(len(top)), [t["length"] for t in top], color='#0ea5a4')
             ax.set_yticks(range(len(top)))
-            ax.set_yticklabels(df.loc[top.index, 'field_key'].fillna('-'))
+            ax.set_yticklabels([t["field_key"] if t["field_key"] is not None else '-' for t in top])
             ax.invert_yaxis()
             ax.set_xlabel('Difference length', color='#9aa4b2')
             ax.tick_params(colors='#9aa4b2')
@@ -89,4 +150,7 @@ def generate_report_visuals(report_path: str, out_base: Path) -> list:
         except Exception:
             pass
 
+    with open(out_dir / VISUALS_MANIFEST, "w", encoding="utf-8") as fp:
+        json.dump({"report": p.name, "key": key, "images": [Path(x).name for x in images]}, fp)
+
     return [str(x) for x in images]
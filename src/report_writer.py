@@ -1,18 +1,467 @@
+import csv
+import gzip
+import heapq
+import importlib.util
+import io
+import json
 import logging
-from typing import List, Dict, Any
-import pandas as pd
+import os
+import shutil
+import tempfile
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 LOG = logging.getLogger(__name__)
 
+# format name -> file suffix
+REPORT_FORMATS = {"excel": ".xlsx", "csv": ".csv", "csv.gz": ".csv.gz", "parquet": ".parquet"}
+REPORT_MEDIA_TYPES = {
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "csv.gz": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+}
+# rows buffered per Parquet row group
+PARQUET_BATCH_ROWS = 10_000
+# sidecars kept next to a report: a Parquet copy of the rows, a JSON summary,
+# a SQLite row index built on first use (see report_rows), cached analyses
+# (see report_analysis) and a gzipped copy for downloads (see gzip_sidecar)
+SIDECAR_ROWS_SUFFIX = ".rows.parquet"
+SIDECAR_SUMMARY_SUFFIX = ".summary.json"
+SIDECAR_INDEX_SUFFIX = ".rows.sqlite3"
+SIDECAR_ANALYSIS_SUFFIX = ".analysis.json"
+SIDECAR_GZIP_SUFFIX = ".download.gz"
+# formats worth compressing for download; xlsx, parquet and csv.gz already are
+COMPRESSIBLE_FORMATS = {"csv"}
+
+
+def report_format(path: str) -> Optional[str]:
+    """Return the report format implied by ``path``'s suffix, or None."""
+    name = str(path).lower()
+    if name.endswith(".xls"):
+        return "excel"
+    # longest suffix first so .csv.gz is not taken for something else
+    for fmt, suffix in sorted(REPORT_FORMATS.items(), key=lambda kv: -len(kv[1])):
+        if name.endswith(suffix):
+            return fmt
+    return None
+
+
+def is_report_file(name: str) -> bool:
+    """True for report files, False for sidecars and anything else."""
+    name = str(name).lower()
+    return bool(report_format(name)) and not name.endswith(SIDECAR_ROWS_SUFFIX)
+
+
+def sidecar_paths(report_path: str) -> Tuple[str, str, str, str, str]:
+    """Return ``(rows_path, summary_path, index_path, analysis_path, gzip_path)`` for the report at ``report_path``."""
+    path = str(report_path)
+    fmt = report_format(path)
+    suffix = ".xls" if path.lower().endswith(".xls") else REPORT_FORMATS.get(fmt, "")
+    base = path[: len(path) - len(suffix)] if suffix else path
+    return base + SIDECAR_ROWS_SUFFIX, base + SIDECAR_SUMMARY_SUFFIX, base + SIDECAR_INDEX_SUFFIX, base + SIDECAR_ANALYSIS_SUFFIX, base + SIDECAR_GZIP_SUFFIX
+
+
+class ReportSummary:
+    """Status counts, longest differences and analysis samples, gathered row by row."""
+
+    TOP_DIFFERENCES = 10
+    SAMPLE_ROWS = 10
+    SAMPLE_MISMATCHES = 8
+
+    def __init__(self):
+        self.rows = 0
+        self.columns: Optional[List[str]] = None
+        self.counts: Dict[str, int] = {}
+        self._top: List[Tuple[int, int, Any]] = []
+        self._head: List[Dict[str, Any]] = []
+        self._mismatches: List[Dict[str, Any]] = []
+
+    def add(self, row: Dict[str, Any]) -> None:
+        if self.columns is None:
+            self.columns = list(row)
+        status = row.get("status")
+        if status is not None:
+            self.counts[status] = self.counts.get(status, 0) + 1
+        # keep the longest differences; on ties the earlier row wins
+        item = (len(str(row.get("differences") or "")), -self.rows, row.get("field_key"))
+        if len(self._top) < self.TOP_DIFFERENCES:
+            heapq.heappush(self._top, item)
+        elif item > self._top[0]:
+            heapq.heapreplace(self._top, item)
+        if len(self._head) < self.SAMPLE_ROWS:
+            self._head.append(row)
+        if status == "MISMATCH" and len(self._mismatches) < self.SAMPLE_MISMATCHES:
+            self._mismatches.append(row)
+        self.rows += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        columns = self.columns or []
+        # most frequent first, ties in order of first appearance
+        counts = dict(sorted(self.counts.items(), key=lambda kv: -kv[1]))
+        top = [{"field_key": key, "length": length} for length, _, key in sorted(self._top, reverse=True)]
+        return {
+            "rows": self.rows,
+            "columns": columns,
+            "status_counts": counts,
+            "top_differences": top if "differences" in columns else [],
+            "samples": self._samples(columns),
+        }
+
+    def _samples(self, columns: List[str]) -> List[Dict[str, Any]]:
+        # up to SAMPLE_ROWS rows for /reports/analysis, mismatches first
+        if not {"req_id", "field_key", "status", "best_match_key"}.issubset(columns):
+            return [dict(r) for r in self._head]
+
+        def entry(r):
+            e = {k: r.get(k) for k in ("req_id", "field_key", "status", "best_match_key")}
+            if "raw_snippet" in columns:
+                # only reports written before snippets moved to /api/snippet have this column
+                snip = str(r.get("raw_snippet") or "")
+                e["raw_snippet"] = snip[:1000] + ("... (truncated)" if len(snip) > 1000 else "")
+            return e
+
+        samples = [entry(r) for r in self._mismatches]
+        for r in self._head:
+            if len(samples) >= self.SAMPLE_ROWS:
+                break
+            e = entry(r)
+            if e not in samples:
+                samples.append(e)
+        return samples[: self.SAMPLE_ROWS]
+
+
+class ReportWriter:
+    """Write result rows to a report file as they arrive.
+
+    Columns are taken from ``columns`` or the first row written. xlsx is
+    written with openpyxl's write-only workbook, CSV (optionally gzipped)
+    through ``csv.writer`` and Parquet (needs ``pyarrow``) one row group per
+    ``PARQUET_BATCH_ROWS`` rows, so no format holds the whole report in memory.
+    Rows go to a hidden temp file next to ``out_path`` that replaces it on
+    ``close``, so readers never see a half-written report; ``discard`` (or
+    leaving a ``with`` block on an exception) deletes what was written.
+
+    With ``sidecars`` the writer also keeps a ``ReportSummary`` and a Parquet
+    copy of the rows (when ``pyarrow`` is installed) and writes both next to
+    the report on close; see ``sidecar_paths``.
+    """
+
+    def __init__(self, out_path: str, fmt: str = "excel", columns: Optional[List[str]] = None, sidecars: bool = False):
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unsupported report format: {fmt}")
+        self.out_path = str(out_path)
+        self._write_path = _temp_path(self.out_path)
+        self.fmt = fmt
+        self.columns = list(columns) if columns else None
+        self.rows_written = 0
+        self._fp: Any = None
+        self._raw: Any = None
+        self._append: Any = None
+        self._pending: List[Dict[str, Any]] = []
+        self._closed = False
+        self._placed = False
+        self.summary = ReportSummary() if sidecars else None
+        self._rows_sidecar: Optional["ReportWriter"] = None
+        if sidecars and fmt != "parquet" and _have_pyarrow():
+            self._rows_sidecar = ReportWriter(sidecar_paths(self.out_path)[0], "parquet", columns)
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        self.discard()
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            if self.columns is None:
+                self.columns = list(row)
+            if self.fmt == "parquet":
+                self._pending.append(row)
+                if len(self._pending) >= PARQUET_BATCH_ROWS:
+                    self._flush_parquet()
+            else:
+                if self._append is None:
+                    self._open()
+                self._append([row.get(c) for c in self.columns])
+            if self.summary is not None:
+                self.summary.add(row)
+            if self._rows_sidecar is not None:
+                try:
+                    self._rows_sidecar.write_rows((row,))
+                except Exception as e:
+                    self._drop_rows_sidecar(e)
+            self.rows_written += 1
+
+    def close(self) -> None:
+        # closing twice (close() inside a with block) must not rewrite the report
+        if self._closed:
+            return
+        self._closed = True
+        if self.columns is None:
+            self.columns = []
+        if self.fmt == "parquet":
+            if self._pending or self._fp is None:
+                self._flush_parquet()
+            self._close_files()
+        else:
+            if self._append is None:
+                self._open()
+            if self.fmt == "excel":
+                self._fp.save(self._write_path)
+            else:
+                self._close_files()
+        self._fp = self._append = None
+        os.replace(self._write_path, self.out_path)
+        self._placed = True
+        if self.summary is not None:
+            self._write_sidecars()
+
+    def discard(self) -> None:
+        """Release the handles and delete the partial report and its sidecars.
+
+        A report that ``close`` already moved into place is deleted too, so
+        an unfinished write never leaves anything the catalog could pick up.
+        """
+        self._closed = True
+        if self._fp is not None and self.fmt != "excel":
+            try:
+                self._close_files()
+            except Exception as e:
+                LOG.debug("Could not close partial report %s: %s", self.out_path, e)
+        self._fp = self._append = None
+        if self._rows_sidecar is not None:
+            self._rows_sidecar.discard()
+        for path in (self._write_path, self.out_path if self._placed else None):
+            if path and os.path.exists(path):
+                os.unlink(path)
+        if self._placed and self.summary is not None:
+            remove_sidecars(self.out_path)
+
+    def _drop_rows_sidecar(self, error: Exception) -> None:
+        # the rows sidecar is an optimization; the report must not fail with it
+        LOG.warning("Skipping rows sidecar for %s: %s", self.out_path, error)
+        self._rows_sidecar.discard()
+        self._rows_sidecar = None
+
+    def _write_sidecars(self) -> None:
+        rows_path, summary_path = sidecar_paths(self.out_path)[:2]
+        rows_file = self.out_path if self.fmt == "parquet" else None
+        if self._rows_sidecar is not None:
+            try:
+                self._rows_sidecar.close()
+                rows_file = rows_path
+            except Exception as e:
+                self._drop_rows_sidecar(e)
+        summary = self.summary.to_dict()
+        summary["rows_file"] = os.path.basename(rows_file) if rows_file else None
+        # written last, so a summary newer than its report is complete
+        _write_summary(summary_path, summary)
+
+    def _close_files(self) -> None:
+        self._fp.close()
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+
+    def _open(self) -> None:
+        if self.fmt == "excel":
+            from openpyxl import Workbook
+
+            self._fp = Workbook(write_only=True)
+            sheet = self._fp.create_sheet("comparison")
+            self._append = sheet.append
+        else:
+            if self.fmt == "csv.gz":
+                # the gzip header names the report, not the temp file
+                self._raw = open(self._write_path, "wb")
+                gz = gzip.GzipFile(os.path.basename(self.out_path), "wb", fileobj=self._raw)
+                self._fp = io.TextIOWrapper(gz, newline="", encoding="utf-8")
+            else:
+                self._fp = open(self._write_path, "w", newline="", encoding="utf-8")
+            self._append = csv.writer(self._fp).writerow
+        self._append(self.columns)
+
+    def _flush_parquet(self) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet reports need the 'pyarrow' package") from e
+
+        columns = [_arrow_array(pa, [row.get(c) for row in self._pending]) for c in self.columns]
+        if self._fp is None:
+            # types come from the first batch; all-null columns are stored as strings
+            fields = [pa.field(c, pa.string() if pa.types.is_null(a.type) else a.type) for c, a in zip(self.columns, columns)]
+            self._fp = pq.ParquetWriter(self._write_path, pa.schema(fields))
+        schema = self._fp.schema
+        arrays = [_cast_array(pa, a, f.type) for a, f in zip(columns, schema)]
+        self._fp.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        self._pending = []
+
+
+def _as_text(values: List[Any]) -> List[Optional[str]]:
+    return [None if v is None else str(v) for v in values]
+
+
+def _arrow_array(pa, values: List[Any]):
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # mixed types, e.g. schema "type" values "text" and 5, are stored as text
+        return pa.array(_as_text(values), pa.string())
+
+
+def _cast_array(pa, array, target):
+    try:
+        return array.cast(target)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # a text column whose later batch holds other types; anything else cannot be stored
+        if not pa.types.is_string(target):
+            raise
+        return pa.array(_as_text(array.to_pylist()), pa.string())
+
+
+def _temp_path(path: str) -> str:
+    # hidden and without a report suffix, so the catalog never lists it
+    head, name = os.path.split(path)
+    return os.path.join(head, f".{name}.{uuid.uuid4().hex[:8]}.tmp")
+
+
+def _have_pyarrow() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _json_default(o):
+    # numpy scalars from DataFrame-backed summaries
+    return o.item() if hasattr(o, "item") else str(o)
+
+
+def _write_summary(path: str, summary: Dict[str, Any]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fp:
+        json.dump(summary, fp, ensure_ascii=False, default=_json_default)
+    os.replace(tmp, path)
+
+
+def _fresh(sidecar: str, report_path: str) -> bool:
+    try:
+        return os.path.getmtime(sidecar) >= os.path.getmtime(report_path)
+    except OSError:
+        return False
+
+
+def write_report(rows: Iterable[Dict[str, Any]], out_path: str, fmt: Optional[str] = None, sidecars: bool = False) -> int:
+    """Write ``rows`` (any iterable) to ``out_path`` and return the row count.
+
+    With no format, or the ``excel`` default, a recognised suffix on
+    ``out_path`` picks the format.
+    """
+    if fmt is None or fmt == "excel":
+        fmt = report_format(out_path) or "excel"
+    with ReportWriter(out_path, fmt, sidecars=sidecars) as writer:
+        writer.write_rows(rows)
+    LOG.debug("Wrote %d report rows to %s", writer.rows_written, out_path)
+    return writer.rows_written
+
+
+def read_report(path: str) -> "pd.DataFrame":
+    """Load a report, from its Parquet sidecar when one is up to date."""
+    import pandas as pd
+
+    rows_path = sidecar_paths(path)[0]
+    if _fresh(rows_path, path):
+        return pd.read_parquet(rows_path)
+    fmt = report_format(path)
+    if fmt == "excel":
+        return pd.read_excel(path)
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    # pandas infers gzip from the suffix
+    return pd.read_csv(path)
+
+
+def read_report_summary(path: str) -> Optional[Dict[str, Any]]:
+    """Return the JSON sidecar summary of a report if it is up to date, else None."""
+    summary_path = sidecar_paths(path)[1]
+    if not _fresh(summary_path, path):
+        return None
+    try:
+        with open(summary_path, encoding="utf-8") as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def load_report_summary(path: str) -> Dict[str, Any]:
+    """Return the ``ReportSummary`` of a report, from its JSON sidecar when fresh.
+
+    Reports without one (or with a stale one) are read once and the summary
+    is written back, so later calls are cheap.
+    """
+    cached = read_report_summary(path)
+    if cached is not None:
+        return cached
+
+    df = read_report(path)
+    summary = ReportSummary()
+    for row in df.astype(object).where(df.notna(), None).to_dict(orient="records"):
+        summary.add(row)
+    result = summary.to_dict()
+    result["rows_file"] = None
+    summary_path = sidecar_paths(path)[1]
+    try:
+        _write_summary(summary_path, result)
+    except OSError as e:
+        LOG.debug("Could not write report summary %s: %s", summary_path, e)
+    return result
+
+
+def gzip_sidecar(path: str) -> str:
+    """Return the path of a gzipped copy of the report, compressing it if missing or stale."""
+    gz_path = sidecar_paths(path)[4]
+    if _fresh(gz_path, path):
+        return gz_path
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(gz_path) or ".", suffix=".tmp")
+    try:
+        with open(path, "rb") as src, os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+            shutil.copyfileobj(src, gz, 1024 * 1024)
+        os.replace(tmp, gz_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    LOG.debug("Compressed %s for download", path)
+    return gz_path
+
 
-def write_report(rows: List[Dict[str, Any]], out_path: str, fmt: str = "excel") -> None:
-    df = pd.DataFrame(rows)
-    if fmt == "csv" or out_path.lower().endswith('.csv'):
-        df.to_csv(out_path, index=False)
-    else:
-        # excel
-        with pd.ExcelWriter(out_path, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="comparison")
+def remove_sidecars(path: str) -> None:
+    for sidecar in sidecar_paths(path):
+        try:
+            os.unlink(sidecar)
+        except FileNotFoundError:
+            pass
 
 
-__all__ = ["write_report"]
+__all__ = [
+    "write_report",
+    "read_report",
+    "report_format",
+    "is_report_file",
+    "sidecar_paths",
+    "load_report_summary",
+    "read_report_summary",
+    "remove_sidecars",
+    "gzip_sidecar",
+    "COMPRESSIBLE_FORMATS",
+    "ReportWriter",
+    "ReportSummary",
+    "REPORT_FORMATS",
+    "REPORT_MEDIA_TYPES",
+]
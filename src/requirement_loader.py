@@ -1,43 +1,127 @@
 import logging
-from typing import Dict, Any, List
-import pandas as pd
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional
+
+from .records import Requirement, norm_options, norm_text
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 LOG = logging.getLogger(__name__)
 
 
 REQUIRED_COLUMNS = {"req_id", "field_key", "type", "required"}
+# rows per batch when streaming a CSV export
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+def load_requirements(path: str, max_rows: Optional[int] = None) -> List[Requirement]:
+    rows: List[Requirement] = []
+    for batch in iter_requirement_batches(path, max_rows=max_rows):
+        rows.extend(batch)
+    return rows
+
 
+def iter_requirement_batches(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS, max_rows: Optional[int] = None) -> Iterator[List[Requirement]]:
+    """Yield requirement records in batches of at most ``chunk_rows``.
+
+    CSV files are read ``chunk_rows`` lines at a time, so only one chunk is
+    held as a DataFrame; Excel files are read whole and then batched. With
+    ``max_rows``, a file with more rows raises ValueError as soon as the
+    chunk that crosses the limit is read.
+    """
+    # pandas is imported on first load, not when the CLI or server starts
+    import pandas as pd
 
-def load_requirements(path: str) -> List[Dict[str, Any]]:
     if path.lower().endswith(('.xls', '.xlsx')):
         df = pd.read_excel(path, dtype=str)
-    else:
-        df = pd.read_csv(path, dtype=str)
+        _check_columns(df)
+        _check_rows(len(df), max_rows)
+        for start in range(0, len(df), chunk_rows):
+            yield _records(df.iloc[start:start + chunk_rows])
+        return
+
+    seen = 0
+    with pd.read_csv(path, dtype=str, chunksize=chunk_rows) as reader:
+        for i, chunk in enumerate(reader):
+            if i == 0:
+                _check_columns(chunk)
+            seen += len(chunk)
+            _check_rows(seen, max_rows)
+            if len(chunk):
+                yield _records(chunk)
+
 
-    cols = set(c.strip() for c in df.columns)
+def _check_rows(rows: int, max_rows: Optional[int]) -> None:
+    if max_rows is not None and rows > max_rows:
+        raise ValueError(f"Requirements file has more than {max_rows} rows")
+
+
+def _check_columns(df: "pd.DataFrame") -> None:
     missing = REQUIRED_COLUMNS - set(c.strip() for c in df.columns)
     if missing:
         LOG.error("Missing required columns in requirements file: %s", missing)
         raise ValueError(f"Missing required columns: {missing}")
 
+
+def _records(df: "pd.DataFrame") -> List[Requirement]:
+    # coerce column by column, then zip the plain lists into records
     df = df.fillna("")
+    n = len(df)
 
-    rows: List[Dict[str, Any]] = []
-    for _, r in df.iterrows():
-        item = {
-            "req_id": str(r.get("req_id") or "").strip(),
-            "field_key": str(r.get("field_key") or "").strip(),
-            "type": str(r.get("type") or "").strip(),
-            "required": _coerce_bool(r.get("required")),
-            "label": _maybe_str(r.get("label")),
-            "min_len": _maybe_int(r.get("min_len")),
-            "max_len": _maybe_int(r.get("max_len")),
-            "regex": _maybe_str(r.get("regex")),
-            "options": _maybe_list(r.get("options")),
-        }
-        rows.append(item)
+    def text(name):
+        if name not in df.columns:
+            return [""] * n
+        return [str(v).strip() for v in df[name].tolist()]
 
-    return rows
+    def coerced(name, *fns, missing=None):
+        if name not in df.columns:
+            return [[missing] * n for _ in fns]
+        return _map_unique(df[name].tolist(), *fns)
+
+    # repeated keys and types share one string and one normalized value
+    req_ids = text("req_id")
+    field_keys, key_lowers = coerced("field_key", _strip, _strip_lower, missing="")
+    types, type_norms = coerced("type", _strip, norm_text, missing="")
+    required, = coerced("required", _coerce_bool)
+    labels, = coerced("label", _maybe_str)
+    min_lens, = coerced("min_len", _maybe_int)
+    max_lens, = coerced("max_len", _maybe_int)
+    regexes, = coerced("regex", _maybe_str)
+    options, options_norms = coerced("options", _maybe_list, _maybe_options_norm)
+    # each row gets its own list, as before
+    options = [list(o) if o is not None else None for o in options]
+
+    return list(map(
+        Requirement.from_parts,
+        req_ids, field_keys, types, required, labels, min_lens, max_lens, regexes, options,
+        key_lowers, type_norms, options_norms,
+    ))
+
+
+def _map_unique(values: List[str], *fns) -> List[List[Any]]:
+    # requirement columns repeat a handful of values, so coerce each distinct value once;
+    # returns one column per fn
+    import pandas as pd
+
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    codes, uniques = codes.tolist(), uniques.tolist()
+    columns = []
+    for fn in fns:
+        coerced = [fn(v) for v in uniques]
+        columns.append([coerced[c] for c in codes])
+    return columns
+
+
+def _strip(v):
+    return str(v).strip()
+
+
+def _strip_lower(v):
+    return str(v).strip().lower()
+
+
+def _maybe_options_norm(v):
+    return norm_options(_maybe_list(v))
 
 
 def _coerce_bool(v):
@@ -75,4 +159,4 @@ def _maybe_list(v):
     return parts if parts else None
 
 
-__all__ = ["load_requirements"]
+__all__ = ["load_requirements", "iter_requirement_batches"]
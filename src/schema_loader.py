@@ -1,6 +1,19 @@
-import requests
+import asyncio
+import hashlib
+import json
 import logging
-from typing import Any, Dict, List
+import os
+import pickle
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .metrics import Timings
+
+if TYPE_CHECKING:
+    import requests
 
 LOG = logging.getLogger(__name__)
 
@@ -12,10 +25,48 @@ LABEL_CANDIDATES = ["label", "title", "displayName"]
 OPTIONS_CANDIDATES = ["options", "choices", "items"]
 VALIDATIONS_CANDIDATES = ["validations", "validation", "constraints", "props"]
 
+# keys whose values the streaming extractor keeps for field detection
+CAPTURE_KEYS = frozenset(
+    FIELD_KEY_CANDIDATES
+    + TYPE_CANDIDATES
+    + REQUIRED_CANDIDATES
+    + LABEL_CANDIDATES
+    + OPTIONS_CANDIDATES
+    + VALIDATIONS_CANDIDATES
+)
+# approximate size (JSON characters) of the bounded copies kept by the streaming extractor
+RAW_SNIPPET_BUDGET = 8000
+CAPTURE_VALUE_BUDGET = 1_000_000
+TRUNCATED = "... (truncated)"
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("SCHEMA_CACHE_DIR") or Path.home() / ".cache" / "qapilot" / "schemas")
+DEFAULT_CACHE_TTL = int(os.environ.get("SCHEMA_CACHE_TTL", "300"))
+DEFAULT_CACHE_MAX_BYTES = int(os.environ.get("SCHEMA_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+_SESSION: Optional["requests.Session"] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session() -> "requests.Session":
+    """Shared pooled session so repeated schema fetches reuse connections."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            # requests is only needed once a schema is fetched
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSION = session
+        return _SESSION
+
 
 def load_schema_from_url(url: str, timeout: int = 10) -> Any:
     try:
-        resp = requests.get(url, timeout=timeout)
+        resp = get_session().get(url, timeout=timeout)
         resp.raise_for_status()
         return resp.json()
     except Exception as e:
@@ -23,62 +74,74 @@ def load_schema_from_url(url: str, timeout: int = 10) -> Any:
         raise
 
 
-def extract_fields(schema_json: Any) -> List[Dict[str, Any]]:
-    results: List[Dict[str, Any]] = []
-
-    def visit(node: Any, path: List[str]):
-        if isinstance(node, dict):
-            # detect a field if it contains any field_key candidate
-            key_val = None
-            for k in FIELD_KEY_CANDIDATES:
-                if k in node:
-                    key_val = node.get(k)
-                    break
-
-            if key_val:
-                field = {
-                    "field_key": str(key_val).strip() if key_val is not None else None,
-                    "type": None,
-                    "required": None,
-                    "label": None,
-                    "options": None,
-                    "validations": None,
-                    "raw_json_path": "/".join(path),
-                    "raw": node,
-                }
-                for k in TYPE_CANDIDATES:
-                    if k in node:
-                        field["type"] = node.get(k)
-                        break
-                for k in REQUIRED_CANDIDATES:
-                    if k in node:
-                        field["required"] = node.get(k)
-                        break
-                for k in LABEL_CANDIDATES:
-                    if k in node:
-                        field["label"] = node.get(k)
-                        break
-                for k in OPTIONS_CANDIDATES:
-                    if k in node:
-                        field["options"] = node.get(k)
-                        break
-                for k in VALIDATIONS_CANDIDATES:
-                    if k in node:
-                        field["validations"] = node.get(k)
-                        break
-
-                results.append(field)
-
-            # continue traversal
-            for k, v in node.items():
-                visit(v, path + [str(k)])
-
-        elif isinstance(node, list):
-            for idx, item in enumerate(node):
-                visit(item, path + [f"[{idx}]"])
-
-    visit(schema_json, ["root"])
+def _field_from_node(node: Dict[str, Any], raw_json_path: str, raw: Any) -> Optional[Dict[str, Any]]:
+    # detect a field if it contains any field_key candidate
+    key_val = None
+    for k in FIELD_KEY_CANDIDATES:
+        if k in node:
+            key_val = node.get(k)
+            break
+
+    if not key_val:
+        return None
+
+    field = {
+        "field_key": str(key_val).strip() if key_val is not None else None,
+        "type": None,
+        "required": None,
+        "label": None,
+        "options": None,
+        "validations": None,
+        "raw_json_path": raw_json_path,
+        "raw": raw,
+    }
+    for attr, candidates in (
+        ("type", TYPE_CANDIDATES),
+        ("required", REQUIRED_CANDIDATES),
+        ("label", LABEL_CANDIDATES),
+        ("options", OPTIONS_CANDIDATES),
+        ("validations", VALIDATIONS_CANDIDATES),
+    ):
+        for k in candidates:
+            if k in node:
+                field[attr] = node.get(k)
+                break
+    return field
+
 
+def _iter_dicts(schema_json: Any) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """Yield ``(node, raw_json_path)`` for every dict in document (pre)order.
+
+    Iterative so deeply nested schemas cannot hit the recursion limit; the
+    path is a single list that is pushed/popped rather than copied per node,
+    and scalar leaves never touch it.
+    """
+    if not isinstance(schema_json, (dict, list)):
+        return
+    path = ["root"]
+    if isinstance(schema_json, dict):
+        yield schema_json, "root"
+        stack = [(iter(schema_json.items()), False)]
+    else:
+        stack = [(enumerate(schema_json), True)]
+    while stack:
+        items, in_list = stack[-1]
+        for k, node in items:
+            if isinstance(node, dict):
+                path.append(f"[{k}]" if in_list else str(k))
+                yield node, "/".join(path)
+                stack.append((iter(node.items()), False))
+                break
+            if isinstance(node, list):
+                path.append(f"[{k}]" if in_list else str(k))
+                stack.append((enumerate(node), True))
+                break
+        else:
+            stack.pop()
+            path.pop()
+
+
+def _dedupe(results: Iterator[Dict[str, Any]]) -> List[Dict[str, Any]]:
     # normalize and dedupe by field_key (case-insensitive)
     dedup: Dict[str, Dict[str, Any]] = {}
     for f in results:
@@ -98,4 +161,383 @@ def extract_fields(schema_json: Any) -> List[Dict[str, Any]]:
     return list(dedup.values())
 
 
-__all__ = ["load_schema_from_url", "extract_fields"]
+def extract_fields(schema_json: Any) -> List[Dict[str, Any]]:
+    results = (_field_from_node(node, raw_path, node) for node, raw_path in _iter_dicts(schema_json))
+    return _dedupe(f for f in results if f is not None)
+
+
+class _Frame:
+    __slots__ = ("is_map", "value", "attrs", "size", "budget", "key", "index", "seq", "path")
+
+    def __init__(self, is_map: bool, budget: int, seq: int, path: Optional[str]):
+        self.is_map = is_map
+        self.value: Any = {} if is_map else []
+        self.attrs: Dict[str, Any] = {}
+        self.size = 2
+        self.budget = budget
+        self.key: Optional[str] = None
+        self.index = 0
+        self.seq = seq
+        self.path = path
+
+    def child_slot(self) -> Tuple[str, int]:
+        if self.is_map:
+            return str(self.key), CAPTURE_VALUE_BUDGET if self.key in CAPTURE_KEYS else RAW_SNIPPET_BUDGET
+        return f"[{self.index}]", max(RAW_SNIPPET_BUDGET, self.budget - self.size)
+
+    def attach(self, value: Any, size: int) -> None:
+        full = self.size > self.budget
+        if self.is_map:
+            key = self.key
+            if key in CAPTURE_KEYS:
+                self.attrs[key] = value
+            size += len(key) + 4
+            if not full:
+                self.value[key] = value if self.size + size <= self.budget else TRUNCATED
+        else:
+            self.index += 1
+            if not full:
+                self.value.append(value if self.size + size <= self.budget else TRUNCATED)
+        self.size += size
+
+
+def _stream_records(fp: BinaryIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    try:
+        import ijson
+    except ImportError as e:
+        raise RuntimeError("streaming schema extraction requires the 'ijson' package") from e
+
+    frames: List[_Frame] = []
+    path: List[str] = []
+    seq = 0
+    for _, event, value in ijson.parse(fp, use_float=True):
+        if event == "map_key":
+            frames[-1].key = value
+            continue
+        if event in ("start_map", "start_array"):
+            seg, budget = frames[-1].child_slot() if frames else ("root", RAW_SNIPPET_BUDGET)
+            path.append(seg)
+            is_map = event == "start_map"
+            frames.append(_Frame(is_map, budget, seq, "/".join(path) if is_map else None))
+            seq += is_map
+            continue
+        if event in ("end_map", "end_array"):
+            frame = frames.pop()
+            path.pop()
+            if frame.is_map:
+                field = _field_from_node(frame.attrs, frame.path, frame.value)
+                if field is not None:
+                    yield frame.seq, field
+            value, size = frame.value, frame.size
+        else:
+            size = len(str(value)) + 2
+        if frames:
+            frames[-1].attach(value, size)
+
+
+def iter_fields_stream(fp: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """Parse schema JSON from a binary stream and yield field records as they close.
+
+    Records come out in the order their objects end (children before
+    parents) and are not deduplicated. ``raw`` is a bounded copy of the
+    object (about ``RAW_SNIPPET_BUDGET`` characters, or
+    ``CAPTURE_VALUE_BUDGET`` for objects that are option/validation
+    values) with ``TRUNCATED`` markers where content was dropped.
+    """
+    for _, field in _stream_records(fp):
+        yield field
+
+
+def extract_fields_stream(fp: BinaryIO) -> List[Dict[str, Any]]:
+    """Streaming counterpart of ``extract_fields``.
+
+    Returns the same fields in the same order, except that ``raw`` holds a
+    bounded copy instead of the live subtree.
+    """
+    records = sorted(_stream_records(fp), key=lambda r: r[0])
+    return _dedupe(f for _, f in records)
+
+
+def load_schema_fields_stream(url: str, timeout: int = 10) -> List[Dict[str, Any]]:
+    try:
+        with get_session().get(url, timeout=timeout, stream=True) as resp:
+            resp.raise_for_status()
+            resp.raw.decode_content = True
+            return extract_fields_stream(resp.raw)
+    except Exception as e:
+        LOG.exception("Failed to fetch or parse schema JSON: %s", e)
+        raise
+
+
+class SchemaCache:
+    """On-disk cache of schema bodies and their extracted fields.
+
+    Bodies are stored by content hash along with the URL's ETag and
+    Last-Modified. Within ``ttl`` seconds a URL is served without any request;
+    after that it is revalidated with a conditional GET, and a 304 reuses both
+    the stored body and the fields already extracted from it. The cache is
+    kept under ``max_bytes`` by evicting the least recently used content once
+    fields have been stored; the content just stored is never evicted, so a
+    single schema larger than ``max_bytes`` stays until the next one arrives.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, ttl: int = DEFAULT_CACHE_TTL, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        (self.directory / "urls").mkdir(parents=True, exist_ok=True)
+        (self.directory / "objects").mkdir(parents=True, exist_ok=True)
+
+    def _meta_path(self, url: str) -> Path:
+        return self.directory / "urls" / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def body_path(self, content_hash: str) -> Path:
+        return self.directory / "objects" / f"{content_hash}.json"
+
+    def _fields_path(self, content_hash: str, stream: bool) -> Path:
+        return self.directory / "objects" / f"{content_hash}.{'stream-' if stream else ''}fields.pickle"
+
+    def _read_meta(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._meta_path(url), encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def _write_atomic(self, path: Path, write) -> None:
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                write(fh)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def _write_meta(self, url: str, meta: Dict[str, Any]) -> None:
+        self._write_atomic(self._meta_path(url), lambda fh: fh.write(json.dumps(meta).encode("utf-8")))
+
+    def _revalidation(self, url: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, str]]]:
+        """Return the cached metadata and the conditional headers to send, or ``None`` headers if still fresh."""
+        meta = self._read_meta(url)
+        if meta and not self.body_path(meta["content_hash"]).exists():
+            meta = None
+        if meta and time.time() - meta["fetched_at"] < self.ttl:
+            _touch(self.body_path(meta["content_hash"]))
+            return meta, None
+
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return meta, headers
+
+    def _not_modified(self, url: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+        LOG.debug("Schema not modified: %s", url)
+        meta["fetched_at"] = time.time()
+        self._write_meta(url, meta)
+        _touch(self.body_path(meta["content_hash"]))
+        return meta
+
+    def _stored(self, url: str, body: "_BodyWriter", headers: Any) -> Dict[str, Any]:
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "content_hash": body.content_hash,
+            "size": body.size,
+            "fetched_at": time.time(),
+        }
+        # evicted once its fields are stored (see put_fields), so load_fields still finds the body
+        self._write_meta(url, meta)
+        return meta
+
+    def fetch(self, url: str, timeout: int = 10) -> Dict[str, Any]:
+        """Return cache metadata for ``url`` (incl. ``content_hash``), downloading only when needed."""
+        meta, headers = self._revalidation(url)
+        if headers is None:
+            return meta
+
+        with get_session().get(url, timeout=timeout, headers=headers, stream=True) as resp:
+            if resp.status_code == 304 and meta:
+                return self._not_modified(url, meta)
+            resp.raise_for_status()
+            resp.raw.decode_content = True
+            with _BodyWriter(self) as body:
+                for chunk in iter(lambda: resp.raw.read(1 << 16), b""):
+                    body.write(chunk)
+            return self._stored(url, body, resp.headers)
+
+    async def afetch(self, url: str, client: Any, timeout: int = 10) -> Dict[str, Any]:
+        """``fetch`` over an ``httpx.AsyncClient`` so callers on an event loop never block.
+
+        The download runs on the loop; metadata and body file I/O run in threads.
+        """
+        meta, headers = await asyncio.to_thread(self._revalidation, url)
+        if headers is None:
+            return meta
+
+        async with client.stream("GET", url, headers=headers, timeout=timeout) as resp:
+            if resp.status_code == 304 and meta:
+                return await asyncio.to_thread(self._not_modified, url, meta)
+            resp.raise_for_status()
+            body = await asyncio.to_thread(_BodyWriter, self)
+            try:
+                async for chunk in resp.aiter_bytes(1 << 16):
+                    await asyncio.to_thread(body.write, chunk)
+            except BaseException:
+                body.discard()
+                raise
+            await asyncio.to_thread(body.finish)
+            return await asyncio.to_thread(self._stored, url, body, resp.headers)
+
+    def load_fields(self, url: str, meta: Dict[str, Any], stream: bool = False) -> List[Dict[str, Any]]:
+        """Return the fields for a fetched body, extracting and storing them on a miss."""
+        content_hash = meta["content_hash"]
+        fields = self.get_fields(content_hash, stream=stream)
+        if fields is not None:
+            LOG.debug("Using cached fields for %s (%s)", url, content_hash[:12])
+            return fields
+
+        try:
+            with open(self.body_path(content_hash), "rb") as fh:
+                fields = extract_fields_stream(fh) if stream else extract_fields(json.load(fh))
+        except Exception as e:
+            # do not keep serving a body that cannot be parsed
+            self.invalidate(url)
+            LOG.exception("Failed to parse schema JSON: %s", e)
+            raise
+        self.put_fields(content_hash, fields, stream=stream)
+        return fields
+
+    def get_fields(self, content_hash: str, stream: bool = False) -> Optional[List[Dict[str, Any]]]:
+        path = self._fields_path(content_hash, stream)
+        try:
+            with open(path, "rb") as fh:
+                fields = pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        _touch(path)
+        return fields
+
+    def put_fields(self, content_hash: str, fields: List[Dict[str, Any]], stream: bool = False) -> None:
+        self._write_atomic(
+            self._fields_path(content_hash, stream),
+            lambda fh: pickle.dump(fields, fh, protocol=pickle.HIGHEST_PROTOCOL),
+        )
+        self.evict(keep=content_hash)
+
+    def invalidate(self, url: str) -> None:
+        self._meta_path(url).unlink(missing_ok=True)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Drop least recently used content until the cache fits in ``max_bytes``, sparing ``keep``."""
+        units: Dict[str, List[Path]] = {}
+        for p in (self.directory / "objects").iterdir():
+            if p.suffix != ".tmp":
+                units.setdefault(p.name.split(".", 1)[0], []).append(p)
+
+        entries = []
+        total = 0
+        for content_hash, paths in units.items():
+            stats = [p.stat() for p in paths if p.exists()]
+            size = sum(st.st_size for st in stats)
+            last_used = max((st.st_mtime for st in stats), default=0)
+            entries.append((last_used, content_hash, size, paths))
+            total += size
+
+        for _, content_hash, size, paths in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if content_hash == keep:
+                continue
+            for p in paths:
+                p.unlink(missing_ok=True)
+            total -= size
+            LOG.debug("Evicted cached schema content %s", paths[0].name)
+
+
+class _BodyWriter:
+    """Streams a response body into the cache's object store under its sha256."""
+
+    def __init__(self, cache: SchemaCache):
+        self.cache = cache
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.content_hash: Optional[str] = None
+        fd, self.tmp = tempfile.mkstemp(dir=str(cache.directory / "objects"), suffix=".tmp")
+        self.fh = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self.digest.update(chunk)
+        self.fh.write(chunk)
+        self.size += len(chunk)
+
+    def finish(self) -> None:
+        self.fh.close()
+        self.content_hash = self.digest.hexdigest()
+        os.replace(self.tmp, self.cache.body_path(self.content_hash))
+
+    def discard(self) -> None:
+        self.fh.close()
+        Path(self.tmp).unlink(missing_ok=True)
+
+    def __enter__(self) -> "_BodyWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.finish()
+
+
+def _touch(path: Path) -> None:
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def load_schema_fields(
+    url: str, timeout: int = 10, cache: Optional[SchemaCache] = None, stream: bool = False, timings: Optional[Timings] = None
+) -> List[Dict[str, Any]]:
+    """Fetch ``url`` and extract its fields, reusing ``cache`` when given.
+
+    ``stream`` selects ``extract_fields_stream`` over ``extract_fields``.
+    ``timings`` gets the ``fetch_schema`` and ``extract_fields`` stages (a
+    streamed uncached schema is parsed while it downloads, so it is all
+    ``fetch_schema``) and the body size when known.
+    """
+    timings = timings or Timings()
+    if cache is None:
+        if stream:
+            with timings.stage("fetch_schema"):
+                return load_schema_fields_stream(url, timeout=timeout)
+        with timings.stage("fetch_schema"):
+            schema_json = load_schema_from_url(url, timeout=timeout)
+        with timings.stage("extract_fields"):
+            return extract_fields(schema_json)
+
+    try:
+        with timings.stage("fetch_schema"):
+            meta = cache.fetch(url, timeout=timeout)
+    except Exception as e:
+        LOG.exception("Failed to fetch schema JSON: %s", e)
+        raise
+    timings.set("schema_bytes", meta.get("size"))
+    with timings.stage("extract_fields"):
+        return cache.load_fields(url, meta, stream=stream)
+
+
+__all__ = [
+    "load_schema_from_url",
+    "extract_fields",
+    "iter_fields_stream",
+    "extract_fields_stream",
+    "load_schema_fields_stream",
+    "load_schema_fields",
+    "get_session",
+    "SchemaCache",
+]
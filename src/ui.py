@@ -1,30 +1,56 @@
+import asyncio
+import functools
+import json
 import logging
+import re
+import shutil
 import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict, List, Optional, Set
 
 from fastapi import FastAPI, Form, UploadFile, File, Request
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.datastructures import UploadFile as StarletteUploadFile
 import os
 import time
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 from fastapi.middleware.cors import CORSMiddleware
 import os
-import requests
-import pandas as pd
+import httpx
 from dotenv import load_dotenv
 
 # load environment variables from .env (if present)
 load_dotenv()
 
 from .requirement_loader import load_requirements
-from .schema_loader import load_schema_from_url, extract_fields
-from .matcher import compare_requirement_to_schema
-from .report_writer import write_report
-from .report_visuals import generate_report_visuals
+from .schema_loader import SchemaCache
+from .matcher import SchemaIndex, compare_all, count_statuses, iter_compare_blocks
+from .report_writer import (
+    COMPRESSIBLE_FORMATS,
+    REPORT_FORMATS,
+    REPORT_MEDIA_TYPES,
+    gzip_sidecar,
+    ReportWriter,
+    load_report_summary,
+    remove_sidecars,
+    report_format,
+    write_report,
+)
+from .report_catalog import ReportCatalog
+from .report_rows import query_rows
+from .report_analysis import AnalysisBackend, AnalysisUnavailable, cached_analysis, make_backend, simulated_analysis, store_analysis
+from .report_visuals import cached_report_visuals, evict_orphaned_visuals, generate_report_visuals, visuals_dir
+from .jobs import JobManager, JobQueueFull
+from .batch import schema_map
+from .matrix import compare_matrix, matrix_columns
+from .metrics import MetricsRegistry, Timings
 
 LOG = logging.getLogger(__name__)
 
@@ -39,6 +65,59 @@ app.add_middleware(
 BASE = Path(__file__).resolve().parent.parent
 REPORTS_DIR = BASE / "reports"
 REPORTS_DIR.mkdir(exist_ok=True)
+# worker threads for the bulk fuzzy matching stage (-1 = all cores)
+MATCH_WORKERS = int(os.environ.get("MATCH_WORKERS", "1"))
+# shortlist fuzzy candidates with an n-gram index (worth it for very large schemas)
+MATCH_PRUNE = os.environ.get("MATCH_PRUNE", "").lower() in ("1", "true", "yes")
+# MATCH_CLOSEST=0 leaves best_match_key/score empty on MISSING rows (no exhaustive scoring with pruning)
+MATCH_CLOSEST = os.environ.get("MATCH_CLOSEST", "1").lower() in ("1", "true", "yes")
+# schema bodies and extracted fields, revalidated with conditional GETs (see SCHEMA_CACHE_* env vars)
+SCHEMA_CACHE = SchemaCache()
+# bounded pool for the blocking stages (parsing, extraction, matching, report writing)
+# so they never run on the event loop; threads because the data is too big to pickle
+COMPARE_POOL = ThreadPoolExecutor(max_workers=int(os.environ.get("COMPARE_POOL_SIZE", "4")), thread_name_prefix="compare")
+# background comparison jobs submitted through POST /jobs
+JOBS = JobManager(
+    concurrency=int(os.environ.get("JOB_CONCURRENCY", "2")),
+    max_queue=int(os.environ.get("JOB_QUEUE_LIMIT", "20")),
+)
+# default format for reports written by the web endpoints (excel, csv, csv.gz, parquet)
+REPORT_FORMAT = os.environ.get("REPORT_FORMAT", "excel")
+# limits for uploaded requirements files (0 disables a limit)
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_MAX_ROWS = int(os.environ.get("UPLOAD_MAX_ROWS", "1000000"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# temp copies of uploads not yet loaded (queued jobs); removed at shutdown at the latest
+_UPLOADS: Set[str] = set()
+# SQLite index of REPORTS_DIR behind the /reports listing
+REPORT_CATALOG = ReportCatalog(REPORTS_DIR)
+# report charts; pyplot is not thread-safe, so they render one at a time off the event loop
+VISUALS_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="visuals")
+_VISUALS_INFLIGHT: Dict[str, asyncio.Future] = {}
+# /reports/analysis backend: genai (GENAI_API_KEY), local (ANALYSIS_LOCAL_URL) or simulated
+ANALYSIS_BACKEND = os.environ.get("ANALYSIS_BACKEND", "genai")
+_ANALYSIS: Optional[AnalysisBackend] = None
+_ANALYSIS_INFLIGHT: Dict[str, asyncio.Future] = {}
+# recently used schema indexes by content hash, shared by compares and /api/snippet
+SCHEMA_INDEXES: "OrderedDict[str, SchemaIndex]" = OrderedDict()
+SCHEMA_INDEX_LIMIT = int(os.environ.get("SCHEMA_INDEX_LIMIT", "8"))
+_SCHEMA_INDEXES_LOCK = threading.Lock()
+# pooled async client for schema downloads
+# cumulative stage timings and sizes of finished comparisons, served by /metrics
+METRICS = MetricsRegistry()
+
+# created on the first schema fetch: building its SSL context is a large share of import time
+HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _http_client() -> httpx.AsyncClient:
+    global HTTP_CLIENT
+    if HTTP_CLIENT is None:
+        HTTP_CLIENT = httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+    return HTTP_CLIENT
 
 # expose reports folder so visuals/images can be served
 app.mount("/reports_files", StaticFiles(directory=str(REPORTS_DIR)), name="reports_files")
@@ -46,74 +125,319 @@ app.mount("/reports_files", StaticFiles(directory=str(REPORTS_DIR)), name="repor
 templates = Jinja2Templates(directory=str(BASE / "templates"))
 
 
+def _raw_snippet(match: dict) -> str:
+    try:
+        raw_snip = json.dumps(match.get("raw"), indent=2)
+        # truncate to reasonable length
+        if len(raw_snip) > 8000:
+            raw_snip = raw_snip[:8000] + "\n... (truncated)"
+    except Exception:
+        raw_snip = str(match.get("raw"))
+    return raw_snip
+
+
+async def _in_pool(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(COMPARE_POOL, functools.partial(fn, *args, **kwargs))
+
+
+def _schema_index(schema_id: str, load_fields, timings: Optional[Timings] = None) -> Optional[SchemaIndex]:
+    timings = timings or Timings()
+    with _SCHEMA_INDEXES_LOCK:
+        schema_index = SCHEMA_INDEXES.get(schema_id)
+        if schema_index is not None:
+            SCHEMA_INDEXES.move_to_end(schema_id)
+            return schema_index
+
+    with timings.stage("extract_fields"):
+        fields = load_fields()
+    if fields is None:
+        return None
+    with timings.stage("index_schema"):
+        schema_index = SchemaIndex(fields, prune=MATCH_PRUNE, closest_missing=MATCH_CLOSEST)
+    with _SCHEMA_INDEXES_LOCK:
+        SCHEMA_INDEXES[schema_id] = schema_index
+        while len(SCHEMA_INDEXES) > SCHEMA_INDEX_LIMIT:
+            SCHEMA_INDEXES.popitem(last=False)
+    return schema_index
+
+
+async def _fetch_schema(schema_url: str, timings: Optional[Timings] = None):
+    """Return ``(schema_id, SchemaIndex)``; the id is the schema's content hash."""
+    timings = timings or Timings()
+    with timings.stage("fetch_schema"):
+        meta = await SCHEMA_CACHE.afetch(schema_url, _http_client())
+    schema_id = meta["content_hash"]
+    timings.set("schema_bytes", meta.get("size"))
+    schema_index = await _in_pool(_schema_index, schema_id, lambda: SCHEMA_CACHE.load_fields(schema_url, meta), timings)
+    timings.set("fields", len(schema_index))
+    return schema_id, schema_index
+
+
+def _load_requirements(req_path: str, timings: Timings):
+    with timings.stage("load_requirements"):
+        reqs = load_requirements(req_path, max_rows=UPLOAD_MAX_ROWS or None)
+    timings.set("rows", len(reqs))
+    return reqs
+
+
+async def _load_inputs(req_path: str, schema_url: str, timings: Optional[Timings] = None):
+    """Load requirements and fetch the schema concurrently.
+
+    Returns ``(reqs, (schema_id, schema_index), error)`` where ``error`` is
+    the message for the first stage that failed.
+    """
+    timings = timings or Timings()
+    reqs, schema = await asyncio.gather(
+        _in_pool(_load_requirements, req_path, timings),
+        _fetch_schema(schema_url, timings),
+        return_exceptions=True,
+    )
+    if isinstance(reqs, BaseException):
+        LOG.error("Failed to load requirements: %s", reqs)
+        METRICS.inc("qapilot_comparison_errors_total", "Comparisons that failed while loading inputs.", stage="load_requirements")
+        return None, None, f"Failed to parse requirements file: {reqs}"
+    if isinstance(schema, BaseException):
+        LOG.error("Failed to load schema: %s", schema)
+        METRICS.inc("qapilot_comparison_errors_total", "Comparisons that failed while loading inputs.", stage="fetch_schema")
+        return None, None, f"Failed to fetch schema JSON: {schema}"
+    return reqs, schema, None
+
+
+def _compare_and_write(reqs, schema_index: SchemaIndex, report_fmt: str, source: dict, job=None, timings: Optional[Timings] = None):
+    timings = timings or Timings()
+    progress = None
+    if job is not None:
+        job.stage = "matching"
+
+        def progress(done):
+            job.rows_processed = done
+
+    # rows only reference their schema field (raw_json_path); snippets are served by /api/snippet
+    with timings.stage("match"):
+        rows = compare_all(reqs, schema_index, workers=MATCH_WORKERS, progress=progress)
+    counts = count_statuses(rows)
+    timings.set("fuzzy_fallbacks", sum(1 for r in rows if r["found"] != "YES"))
+
+    if job is not None:
+        job.stage = "writing"
+    out_path = _new_report_path(report_fmt)
+    with timings.stage("write_report"):
+        write_report(rows, str(out_path), fmt=report_fmt, sidecars=True)
+    return rows, counts, _catalog_report(out_path, source)
+
+
+def _matrix_and_write(reqs, indexes: Dict[str, SchemaIndex], report_fmt: str, source: dict):
+    rows, counts = compare_matrix(reqs, indexes, workers=MATCH_WORKERS)
+    out_path = _new_report_path(report_fmt)
+    with ReportWriter(str(out_path), report_fmt, columns=matrix_columns(list(indexes)), sidecars=True) as writer:
+        writer.write_rows(rows)
+    return rows, counts, _catalog_report(out_path, source)
+
+
+def _new_report_path(report_fmt: str) -> Path:
+    # reports directory with timestamped name; the suffix keeps reports started in the same second apart
+    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    return REPORTS_DIR / f"report_{ts}_{uuid.uuid4().hex[:8]}{REPORT_FORMATS[report_fmt]}"
+
+
+def _report_fmt(value: Optional[str]) -> Optional[str]:
+    fmt = value or REPORT_FORMAT
+    return fmt if fmt in REPORT_FORMATS else None
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def _copy_upload(src, dst: str) -> None:
+    written = 0
+    with open(dst, "wb") as out:
+        while True:
+            chunk = src.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            written += len(chunk)
+            if UPLOAD_MAX_BYTES and written > UPLOAD_MAX_BYTES:
+                raise UploadTooLarge(f"Requirements file is larger than {UPLOAD_MAX_BYTES} bytes")
+            out.write(chunk)
+
+
+async def _save_upload(file: UploadFile) -> str:
+    """Copy an uploaded requirements file to a temp file and return its path.
+
+    The upload is already spooled by the multipart parser, so it is copied in
+    chunks on the pool instead of being read into memory. The caller deletes
+    the file once the requirements are loaded.
+    """
+    if UPLOAD_MAX_BYTES and file.size is not None and file.size > UPLOAD_MAX_BYTES:
+        raise UploadTooLarge(f"Requirements file is larger than {UPLOAD_MAX_BYTES} bytes")
+    # the loader picks Excel or CSV by suffix
+    ext = Path(file.filename or "").suffix.lower()
+    fd, path = tempfile.mkstemp(suffix="_req" + (ext if ext in (".csv", ".xls", ".xlsx") else ""))
+    os.close(fd)
+    _UPLOADS.add(path)
+    try:
+        await file.seek(0)
+        await _in_pool(_copy_upload, file.file, path)
+    except BaseException:
+        _discard_upload(path)
+        raise
+    return path
+
+
+def _discard_upload(path: str) -> None:
+    _UPLOADS.discard(path)
+    Path(path).unlink(missing_ok=True)
+
+
+def _report_ref(out_path: Path, report_id: Optional[int] = None) -> dict:
+    return {"id": report_id, "path": str(out_path), "url": f"/download?path={str(out_path)}"}
+
+
+def _catalog_report(out_path: Path, source: dict) -> dict:
+    # source: schema_url, schema_id and requirements_name of the comparison
+    try:
+        report_id = REPORT_CATALOG.add(str(out_path), **source)
+    except Exception as e:
+        LOG.exception("Failed to catalog report %s: %s", out_path, e)
+        report_id = None
+    return _report_ref(out_path, report_id)
+
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def _encode_record(kind: str, payload: dict, fmt: str) -> str:
+    if fmt == "sse":
+        return f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps({"type": kind, **payload}) + "\n"
+
+
+def _next_block(blocks, writer: ReportWriter, fmt: str, timings: Timings):
+    with timings.stage("match"):
+        block = next(blocks, None)
+    if block is None:
+        return None, ""
+    with timings.stage("write_report"):
+        writer.write_rows(block)
+    return block, "".join(_encode_record("row", {"row": rep}, fmt) for rep in block)
+
+
+async def _stream_compare(reqs, schema, fmt: str, report_fmt: str, source: dict, timings: Timings):
+    """Emit a ``start`` record with the schema id, one ``row`` record per
+    requirement as blocks finish, then a ``summary`` record.
+
+    If the stream ends early (an error or the client going away) the
+    partial report is discarded.
+    """
+    schema_id, schema_index = schema
+    writer = None
+    # pool work on the writer; the report is discarded only once it has finished
+    pending = None
+    finished = False
+    try:
+        yield _encode_record("start", {"schema_id": schema_id}, fmt)
+        blocks = iter_compare_blocks(reqs, schema_index, workers=MATCH_WORKERS)
+        # rows are appended to the report as they stream out, so none are kept here
+        out_path = _new_report_path(report_fmt)
+        writer = ReportWriter(str(out_path), report_fmt, sidecars=True)
+        counts = count_statuses([])
+        fallbacks = 0
+        while True:
+            pending = COMPARE_POOL.submit(_next_block, blocks, writer, fmt, timings)
+            block, chunk = await asyncio.wrap_future(pending)
+            if block is None:
+                break
+            for k, n in count_statuses(block).items():
+                counts[k] += n
+            fallbacks += sum(1 for r in block if r["found"] != "YES")
+            yield chunk
+        with timings.stage("write_report"):
+            pending = COMPARE_POOL.submit(writer.close)
+            await asyncio.wrap_future(pending)
+        finished = True
+        timings.set("fuzzy_fallbacks", fallbacks)
+        METRICS.record(timings, "api_compare_stream")
+        report = await _in_pool(_catalog_report, out_path, source)
+        yield _encode_record("summary", {"counts": counts, "report": report, "schema_id": schema_id}, fmt)
+    except Exception as e:
+        LOG.exception("Streamed comparison failed: %s", e)
+        yield _encode_record("error", {"error": str(e)}, fmt)
+    finally:
+        # also reached on GeneratorExit/CancelledError when the client disconnects
+        if writer is not None and not finished:
+            if pending is not None:
+                pending.add_done_callback(lambda _: writer.discard())
+            else:
+                writer.discard()
+
+
+async def _run_compare_job(job, req_path: str, schema_url: str, report_fmt: str, requirements_name: Optional[str]):
+    job.stage = "loading"
+    timings = Timings()
+    try:
+        reqs, schema, error = await _load_inputs(req_path, schema_url, timings)
+    finally:
+        _discard_upload(req_path)
+    if error:
+        raise RuntimeError(error)
+
+    schema_id, schema_index = schema
+    source = {"schema_url": schema_url, "schema_id": schema_id, "requirements_name": requirements_name}
+    job.rows_total = len(reqs)
+    _, counts, job.report = await _in_pool(_compare_and_write, reqs, schema_index, report_fmt, source, job, timings)
+    METRICS.record(timings, "jobs")
+    job.counts = counts
+    # finished jobs are kept for polling, so only the summary stays in memory; rows are read back from the report
+    return {"counts": counts, "report": job.report, "schema_id": schema_id}
+
+
+@app.on_event("startup")
+async def _startup():
+    # pick up reports added or removed while the server was down
+    await _in_pool(REPORT_CATALOG.sync)
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await JOBS.shutdown()
+    # uploads of jobs cancelled before they started
+    for path in list(_UPLOADS):
+        _discard_upload(path)
+    if HTTP_CLIENT is not None:
+        await HTTP_CLIENT.aclose()
+    COMPARE_POOL.shutdown(wait=False)
+    VISUALS_POOL.shutdown(wait=False)
+
+
 @app.get("/")
 async def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
 @app.post("/compare")
-async def compare(request: Request, file: UploadFile = File(...), schema_url: str = Form(...)):
-    # Save uploaded file to temp path
-    tmp_req = tempfile.NamedTemporaryFile(delete=False, suffix="_req")
-    content = await file.read()
-    tmp_req.write(content)
-    tmp_req.flush()
-    tmp_req.close()
-
+async def compare(request: Request, file: UploadFile = File(...), schema_url: str = Form(...), format: Optional[str] = Form(None)):
+    report_fmt = _report_fmt(format)
+    if report_fmt is None:
+        return templates.TemplateResponse("index.html", {"request": request, "error": f"Unsupported report format: {format}"})
     try:
-        reqs = load_requirements(tmp_req.name)
-    except Exception as e:
-        LOG.exception("Failed to load requirements: %s", e)
-        return templates.TemplateResponse(
-            "index.html", {"request": request, "error": f"Failed to parse requirements file: {e}"}
-        )
+        req_path = await _save_upload(file)
+    except UploadTooLarge as e:
+        return templates.TemplateResponse("index.html", {"request": request, "error": str(e)}, status_code=413)
 
+    timings = Timings()
     try:
-        schema_json = load_schema_from_url(schema_url)
-    except Exception as e:
-        LOG.exception("Failed to load schema: %s", e)
-        return templates.TemplateResponse(
-            "index.html", {"request": request, "error": f"Failed to fetch schema JSON: {e}"}
-        )
+        reqs, schema, error = await _load_inputs(req_path, schema_url, timings)
+    finally:
+        _discard_upload(req_path)
+    if error:
+        return templates.TemplateResponse("index.html", {"request": request, "error": error})
 
-    schema_fields = extract_fields(schema_json)
-
-    rows = []
-    counts = {"MATCHED": 0, "MISMATCH": 0, "MISSING": 0, "POSSIBLE_MATCH": 0}
-    for r in reqs:
-        rep = compare_requirement_to_schema(r, schema_fields)
-        # attach raw snippet from matched schema field when available
-        raw_snip = None
-        best_key = rep.get("best_match_key") or rep.get("field_key")
-        if best_key:
-            match = next((f for f in schema_fields if (f.get("field_key") or "") == best_key), None)
-            if match:
-                try:
-                    import json
-
-                    raw_snip = json.dumps(match.get("raw"), indent=2)
-                    # truncate to reasonable length
-                    if len(raw_snip) > 8000:
-                        raw_snip = raw_snip[:8000] + "\n... (truncated)"
-                except Exception:
-                    raw_snip = str(match.get("raw"))
-        rep["raw_snippet"] = raw_snip
-        rows.append(rep)
-        st = rep.get("status")
-        if st == "MATCHED":
-            counts["MATCHED"] += 1
-        elif st == "MISMATCH":
-            counts["MISMATCH"] += 1
-        elif st == "POSSIBLE_MATCH":
-            counts["POSSIBLE_MATCH"] += 1
-        elif st == "MISSING":
-            counts["MISSING"] += 1
-
-    # Write report to reports directory with timestamped name
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    fname = f"report_{ts}.xlsx"
-    out_path = REPORTS_DIR / fname
-    write_report(rows, str(out_path), fmt="excel")
+    schema_id, schema_index = schema
+    source = {"schema_url": schema_url, "schema_id": schema_id, "requirements_name": file.filename}
+    rows, counts, report = await _in_pool(_compare_and_write, reqs, schema_index, report_fmt, source, None, timings)
+    METRICS.record(timings, "compare")
 
     return templates.TemplateResponse(
         "results.html",
@@ -121,97 +445,289 @@ async def compare(request: Request, file: UploadFile = File(...), schema_url: st
             "request": request,
             "counts": counts,
             "rows": rows,
-            "report_path": str(out_path),
+            "report_path": report["path"],
+            "schema_id": schema_id,
         },
     )
 
 
 @app.post("/api/compare")
-async def api_compare(file: UploadFile = File(...), schema_url: str = Form(...)):
-    # Process file upload and schema URL and return JSON result for SPA
-    tmp_req = tempfile.NamedTemporaryFile(delete=False, suffix="_req")
-    content = await file.read()
-    tmp_req.write(content)
-    tmp_req.flush()
-    tmp_req.close()
+async def api_compare(file: UploadFile = File(...), schema_url: str = Form(...), format: Optional[str] = Form(None), stream: Optional[str] = None):
+    # Process file upload and schema URL and return JSON result for SPA;
+    # ?stream=ndjson|sse streams per-row records followed by a summary instead
+    report_fmt = _report_fmt(format)
+    if report_fmt is None:
+        return JSONResponse({"error": f"Unsupported report format: {format}"}, status_code=400)
+    try:
+        req_path = await _save_upload(file)
+    except UploadTooLarge as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
 
+    timings = Timings()
     try:
-        reqs = load_requirements(tmp_req.name)
-    except Exception as e:
-        return JSONResponse({"error": f"Failed to parse requirements file: {e}"}, status_code=400)
+        reqs, schema, error = await _load_inputs(req_path, schema_url, timings)
+    finally:
+        _discard_upload(req_path)
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+
+    schema_id, schema_index = schema
+    source = {"schema_url": schema_url, "schema_id": schema_id, "requirements_name": file.filename}
+    if stream in STREAM_MEDIA_TYPES:
+        # headers go out before the rows, so streamed timings only reach /metrics
+        return StreamingResponse(_stream_compare(reqs, schema, stream, report_fmt, source, timings), media_type=STREAM_MEDIA_TYPES[stream])
+
+    rows, counts, report = await _in_pool(_compare_and_write, reqs, schema_index, report_fmt, source, None, timings)
+    METRICS.record(timings, "api_compare")
+
+    return JSONResponse(
+        {"counts": counts, "rows": rows, "report": report, "schema_id": schema_id},
+        headers={"Server-Timing": timings.server_timing()},
+    )
+
+
+@app.post("/api/compare/matrix")
+async def api_compare_matrix(file: UploadFile = File(...), schema_urls: List[str] = Form(...), format: Optional[str] = Form(None)):
+    # one requirements file against several schemas (repeat schema_urls; "dev=https://..." names a column)
+    report_fmt = _report_fmt(format)
+    if report_fmt is None:
+        return JSONResponse({"error": f"Unsupported report format: {format}"}, status_code=400)
+    try:
+        schemas = schema_map([u for u in schema_urls if u.strip()])
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if len(schemas) < 2:
+        return JSONResponse({"error": "A matrix needs at least two schema URLs"}, status_code=400)
+    try:
+        req_path = await _save_upload(file)
+    except UploadTooLarge as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+
+    # requirements are loaded once while every schema is fetched concurrently
+    try:
+        reqs, *fetched = await asyncio.gather(
+            _in_pool(load_requirements, req_path, max_rows=UPLOAD_MAX_ROWS or None),
+            *(_fetch_schema(url) for url in schemas.values()),
+            return_exceptions=True,
+        )
+    finally:
+        _discard_upload(req_path)
+    if isinstance(reqs, BaseException):
+        LOG.error("Failed to load requirements: %s", reqs)
+        return JSONResponse({"error": f"Failed to parse requirements file: {reqs}"}, status_code=400)
+    for name, result in zip(schemas, fetched):
+        if isinstance(result, BaseException):
+            LOG.error("Failed to load schema %s: %s", name, result)
+            return JSONResponse({"error": f"Failed to fetch schema JSON for {name}: {result}"}, status_code=400)
+
+    indexes = {name: schema_index for name, (_, schema_index) in zip(schemas, fetched)}
+    source = {"schema_url": None, "schema_id": None, "requirements_name": file.filename}
+    rows, counts, report = await _in_pool(_matrix_and_write, reqs, indexes, report_fmt, source)
+    return JSONResponse({
+        "schemas": [
+            {"name": name, "url": url, "schema_id": schema_id, "counts": counts[name]}
+            for (name, url), (schema_id, _) in zip(schemas.items(), fetched)
+        ],
+        "diverging": sum(1 for r in rows if r["diverges"]),
+        "rows": rows,
+        "report": report,
+    })
+
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text exposition of the cumulative comparison metrics
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/snippet")
+async def api_snippet(schema_id: str, path: Optional[str] = None, key: Optional[str] = None):
+    """Serve the schema JSON for one field of a compared schema.
+
+    The field is looked up by ``path`` (a row's ``raw_json_path``) or by
+    ``key`` (its ``best_match_key`` or ``field_key``).
+    """
+    if not re.fullmatch(r"[0-9a-f]{64}", schema_id):
+        return JSONResponse({"error": "invalid schema id"}, status_code=400)
+    schema_index = await _in_pool(_schema_index, schema_id, lambda: SCHEMA_CACHE.get_fields(schema_id))
+    if schema_index is None:
+        return JSONResponse({"error": "schema not cached; run the comparison again"}, status_code=404)
+
+    match = schema_index.by_path.get(path) if path else None
+    if match is None:
+        match = schema_index.get(key)
+    if match is None:
+        return JSONResponse({"error": "field not found"}, status_code=404)
+    return JSONResponse({
+        "field_key": match.get("field_key"),
+        "raw_json_path": match.get("raw_json_path"),
+        "snippet": _raw_snippet(match),
+    })
+
+
+@app.post("/jobs")
+async def submit_job(file: UploadFile = File(...), schema_url: str = Form(...), format: Optional[str] = Form(None)):
+    report_fmt = _report_fmt(format)
+    if report_fmt is None:
+        return JSONResponse({"error": f"Unsupported report format: {format}"}, status_code=400)
+    # the upload is only readable during this request, so persist it before queueing;
+    # the job deletes it once the requirements are loaded
+    try:
+        req_path = await _save_upload(file)
+    except UploadTooLarge as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
 
     try:
-        schema_json = load_schema_from_url(schema_url)
+        job = JOBS.submit(lambda job: _run_compare_job(job, req_path, schema_url, report_fmt, file.filename))
+    except JobQueueFull as e:
+        _discard_upload(req_path)
+        return JSONResponse({"error": str(e)}, status_code=429)
+    return JSONResponse({"id": job.id, "status_url": f"/jobs/{job.id}"}, status_code=202)
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "job not found"}, status_code=404)
+    return JSONResponse(job.to_dict())
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str, status: Optional[str] = None, q: Optional[str] = None, offset: int = 0, limit: int = 100):
+    """The job's counts and report plus one page of its rows, read from the
+    report like ``/reports/{id}/rows``."""
+    job = JOBS.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "job not found"}, status_code=404)
+    if job.status != "done":
+        return JSONResponse({"error": f"job is {job.status}", "job": job.to_dict()}, status_code=409)
+    path = job.result["report"]["path"]
+    if not Path(path).is_file():
+        return JSONResponse({"error": "report not found", **job.result}, status_code=404)
+    limit = max(0, min(limit, 1000))
+    try:
+        total, rows = await _in_pool(query_rows, path, status=status, q=q, offset=offset, limit=limit)
     except Exception as e:
-        return JSONResponse({"error": f"Failed to fetch schema JSON: {e}"}, status_code=400)
-
-    schema_fields = extract_fields(schema_json)
-
-    rows = []
-    counts = {"MATCHED": 0, "MISMATCH": 0, "MISSING": 0, "POSSIBLE_MATCH": 0}
-    for r in reqs:
-        rep = compare_requirement_to_schema(r, schema_fields)
-        # attach raw snippet
-        raw_snip = None
-        best_key = rep.get("best_match_key") or rep.get("field_key")
-        if best_key:
-            match = next((f for f in schema_fields if (f.get("field_key") or "") == best_key), None)
-            if match:
-                try:
-                    import json
-
-                    raw_snip = json.dumps(match.get("raw"), indent=2)
-                    if len(raw_snip) > 8000:
-                        raw_snip = raw_snip[:8000] + "\n... (truncated)"
-                except Exception:
-                    raw_snip = str(match.get("raw"))
-        rep["raw_snippet"] = raw_snip
-        rows.append(rep)
-        st = rep.get("status")
-        if st == "MATCHED":
-            counts["MATCHED"] += 1
-        elif st == "MISMATCH":
-            counts["MISMATCH"] += 1
-        elif st == "POSSIBLE_MATCH":
-            counts["POSSIBLE_MATCH"] += 1
-        elif st == "MISSING":
-            counts["MISSING"] += 1
-
-    # write report
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    fname = f"report_{ts}.xlsx"
-    out_path = REPORTS_DIR / fname
-    write_report(rows, str(out_path), fmt="excel")
+        LOG.exception("Failed to read rows of report %s: %s", path, e)
+        return JSONResponse({"error": f"failed to read report file: {e}"}, status_code=400)
+    return JSONResponse({**job.result, "total": total, "offset": offset, "limit": limit, "rows": rows})
 
-    return JSONResponse({"counts": counts, "rows": rows, "report": {"path": str(out_path), "url": f"/download?path={str(out_path)}"}})
 
+def _not_modified(request: Request, response: FileResponse) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = response.headers["etag"]
+        return any(tag.strip().removeprefix("W/") in (etag, "*") for tag in if_none_match.split(","))
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(response.headers["last-modified"]) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
 
-@app.get("/download")
-async def download(path: str):
-    return FileResponse(path, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", filename="report.xlsx")
+
+@app.api_route("/download", methods=["GET", "HEAD"])
+async def download(request: Request, path: str):
+    """Serve a report with its format's content type.
+
+    Responses carry ETag/Last-Modified and answer conditional requests with
+    304; ranges are served by FileResponse (Starlette 0.39+). CSV reports go
+    out gzipped (from a cached ``.download.gz`` sidecar) to clients that
+    accept it, except for range requests, which always get the plain file.
+    """
+    p = Path(path)
+    if not p.is_file():
+        return JSONResponse({"error": "report not found"}, status_code=404)
+    fmt = report_format(path) or "excel"
+    headers = {"Cache-Control": "no-cache"}
+    serve = str(p)
+    if fmt in COMPRESSIBLE_FORMATS:
+        headers["Vary"] = "Accept-Encoding"
+        if "range" not in request.headers and "gzip" in request.headers.get("accept-encoding", ""):
+            try:
+                serve = await _in_pool(gzip_sidecar, str(p))
+                headers["Content-Encoding"] = "gzip"
+            except OSError as e:
+                LOG.warning("Could not compress %s for download: %s", p, e)
+    response = FileResponse(
+        serve,
+        media_type=REPORT_MEDIA_TYPES[fmt],
+        filename=f"report{REPORT_FORMATS[fmt]}",
+        headers=headers,
+        stat_result=await _in_pool(os.stat, serve),
+    )
+    if _not_modified(request, response):
+        kept = {k: response.headers[k] for k in ("etag", "last-modified", "cache-control", "vary") if k in response.headers}
+        return Response(status_code=304, headers=kept)
+    return response
 
 
 @app.get("/reports")
-async def list_reports():
-    files = []
-    for p in sorted(REPORTS_DIR.iterdir(), reverse=True):
-        if p.suffix.lower() in (".xlsx", ".csv"):
-            stat = p.stat()
-            files.append({
-                "name": p.name,
-                "path": str(p),
-                "size": stat.st_size,
-                "modified": datetime.utcfromtimestamp(stat.st_mtime).isoformat() + "Z",
-            })
-    return JSONResponse(files)
+async def list_reports(
+    offset: int = 0,
+    limit: int = 100,
+    sort: str = "name",
+    order: str = "desc",
+    q: Optional[str] = None,
+    status: Optional[str] = None,
+    format: Optional[str] = None,
+    schema_url: Optional[str] = None,
+):
+    # one page from the report catalog; X-Total-Count carries the number of matches
+    try:
+        total, items = await _in_pool(
+            REPORT_CATALOG.query,
+            offset=offset,
+            limit=min(limit, 1000),
+            sort=sort,
+            order=order,
+            q=q,
+            status=status,
+            fmt=format,
+            schema_url=schema_url,
+        )
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return JSONResponse(items, headers={"X-Total-Count": str(total)})
 
 
+@app.get("/reports/{report_id}/rows")
+async def report_rows(report_id: int, status: Optional[str] = None, q: Optional[str] = None, offset: int = 0, limit: int = 100):
+    """One page of a stored report's rows, filtered by ``status`` and/or a
+    ``field_key``/``best_match_key`` prefix ``q``."""
+    entry = await _in_pool(REPORT_CATALOG.get, report_id)
+    if entry is None or not Path(entry["path"]).is_file():
+        return JSONResponse({"error": "report not found"}, status_code=404)
+    limit = max(0, min(limit, 1000))
+    try:
+        total, rows = await _in_pool(query_rows, entry["path"], status=status, q=q, offset=offset, limit=limit)
+    except Exception as e:
+        LOG.exception("Failed to read rows of report %s: %s", entry["path"], e)
+        return JSONResponse({"error": f"failed to read report file: {e}"}, status_code=400)
+    return JSONResponse({"report": entry, "total": total, "offset": offset, "limit": limit, "rows": rows})
+
+
+async def _report_visuals(path: str):
+    # images already rendered for this report version come straight back
+    imgs = cached_report_visuals(path, REPORTS_DIR)
+    if imgs is not None:
+        return imgs
+    # concurrent requests for the same report share one render
+    fut = _VISUALS_INFLIGHT.get(path)
+    if fut is None:
+        fut = asyncio.get_running_loop().run_in_executor(VISUALS_POOL, generate_report_visuals, path, REPORTS_DIR)
+        _VISUALS_INFLIGHT[path] = fut
+        fut.add_done_callback(lambda _: _VISUALS_INFLIGHT.pop(path, None))
+    return await asyncio.shield(fut)
+
 
 @app.get("/reports/visuals")
 async def reports_visuals(path: str):
     # path is the absolute path to the report file (as returned by /reports)
     try:
-        imgs = generate_report_visuals(path, REPORTS_DIR)
+        imgs = await _report_visuals(path)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=400)
 
@@ -220,197 +736,85 @@ async def reports_visuals(path: str):
     for p in imgs:
         p = Path(p)
         rel_dir = p.parent.name
-        public.append(f"/reports_files/{rel_dir}/{p.name}")
+        # re-rendered images keep their names, so version the URL
+        public.append(f"/reports_files/{rel_dir}/{p.name}?v={p.stat().st_mtime_ns}")
 
     return JSONResponse({"images": public})
 
 
+def _delete_report(p: Path) -> None:
+    p.unlink()
+    REPORT_CATALOG.remove(str(p))
+    remove_sidecars(str(p))
+    shutil.rmtree(visuals_dir(str(p), REPORTS_DIR), ignore_errors=True)
+    evict_orphaned_visuals(REPORTS_DIR)
+
+
 @app.post("/reports/delete")
 async def delete_report(path: str = Form(...)):
     p = Path(path)
     if not p.exists() or not p.is_file():
         return JSONResponse({"ok": False, "error": "file not found"}, status_code=404)
     try:
-        p.unlink()
+        # catalog, sidecars and visuals are all disk work, so it runs on the pool
+        await _in_pool(_delete_report, p)
         return JSONResponse({"ok": True})
     except Exception as e:
         return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
 
 
+def _analysis_backend() -> AnalysisBackend:
+    global _ANALYSIS
+    if _ANALYSIS is None:
+        _ANALYSIS = make_backend(ANALYSIS_BACKEND, _http_client)
+    return _ANALYSIS
+
+
+async def _analyze(path: str, backend: AnalysisBackend, summary: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        result = await backend.analyze(summary)
+    except AnalysisUnavailable as e:
+        # not cached, so the next view asks the backend again
+        LOG.info("Analysis backend %s not available (%s), producing simulated analysis", backend.name, e)
+        return simulated_analysis(summary)
+    await _in_pool(store_analysis, path, backend.name, result)
+    return result
+
+
 @app.post('/reports/analysis')
 async def reports_analysis(path: str = Form(...)):
     """
-    Generate a summary and full-length analysis for the given report file using Google Generative API.
-    Requires environment variable GENAI_API_KEY to be set with a valid API key.
+    Generate a summary and full-length analysis for the given report file with the
+    ANALYSIS_BACKEND (Google Generative API by default, which needs GENAI_API_KEY).
+    Results are cached per report content in the report's analysis sidecar.
     """
-    api_key = os.environ.get('GENAI_API_KEY')
-    if not api_key:
-        return JSONResponse({"error": "GENAI_API_KEY not set on server"}, status_code=400)
+    try:
+        backend = _analysis_backend()
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
 
     p = Path(path)
     if not p.exists() or not p.is_file():
         return JSONResponse({"error": "report file not found"}, status_code=404)
 
+    # counts and samples (mismatches first) come from the report's summary sidecar
     try:
-        # read a sample of rows from excel (first sheet)
-        df = pd.read_excel(str(p))
+        cached = await _in_pool(cached_analysis, str(p), backend.name)
+        if cached is not None:
+            return JSONResponse(cached)
+        summary = await _in_pool(load_report_summary, str(p))
     except Exception as e:
         return JSONResponse({"error": f"failed to read report file: {e}"}, status_code=400)
 
-    # prepare a concise representation for the model, including examples of mismatches
+    # concurrent requests for the same report share one backend call
+    fut = _ANALYSIS_INFLIGHT.get(str(p))
+    if fut is None:
+        fut = asyncio.ensure_future(_analyze(str(p), backend, summary))
+        _ANALYSIS_INFLIGHT[str(p)] = fut
+        fut.add_done_callback(lambda _: _ANALYSIS_INFLIGHT.pop(str(p), None))
     try:
-        counts = None
-        if 'status' in df.columns:
-            counts = df['status'].value_counts().to_dict()
-
-        # pick up to 10 sample rows (prefer mismatches then others)
-        samples = []
-        preferred = []
-        if {'req_id', 'field_key', 'status', 'best_match_key', 'raw_snippet'}.issubset(set(df.columns)):
-            # ensure raw_snippet column exists (it should, from write_report)
-            # prioritize MISMATCH rows
-            try:
-                mismatches = df[df['status'] == 'MISMATCH']
-            except Exception:
-                mismatches = df[df['status'].astype(str).str.upper() == 'MISMATCH']
-            for _, r in mismatches.head(8).iterrows():
-                preferred.append({
-                    'req_id': r.get('req_id'),
-                    'field_key': r.get('field_key'),
-                    'status': r.get('status'),
-                    'best_match_key': r.get('best_match_key'),
-                    'raw_snippet': (str(r.get('raw_snippet') or '')[:1000] + ('... (truncated)' if r.get('raw_snippet') and len(str(r.get('raw_snippet'))) > 1000 else ''))
-                })
-
-            # fill with other rows if needed
-            if len(preferred) < 10:
-                for _, r in df.head(10).iterrows():
-                    entry = {
-                        'req_id': r.get('req_id'),
-                        'field_key': r.get('field_key'),
-                        'status': r.get('status'),
-                        'best_match_key': r.get('best_match_key'),
-                        'raw_snippet': (str(r.get('raw_snippet') or '')[:1000] + ('... (truncated)' if r.get('raw_snippet') and len(str(r.get('raw_snippet'))) > 1000 else ''))
-                    }
-                    # avoid duplicates
-                    if entry not in preferred:
-                        preferred.append(entry)
-
-            samples = preferred[:10]
-        else:
-            samples = df.head(10).to_dict(orient='records')
-    except Exception:
-        samples = []
-        counts = None
-
-    prompt_lines = []
-    prompt_lines.append('You are an expert QA analyst. Provide a concise summary and a full-length report analysis of the QA comparison results. Use the provided counts and examples to ground your observations and cite example req_id values where relevant.')
-    if counts:
-        prompt_lines.append('Counts:')
-        for k, v in counts.items():
-            prompt_lines.append(f"- {k}: {v}")
-    prompt_lines.append('Here are up to 10 example rows (selected mismatches first) in JSON format:')
-    import json
-    prompt_lines.append(json.dumps(samples, indent=2, ensure_ascii=False))
-    prompt_lines.append('Produce: (1) a short summary paragraph (max 80-100 words) that highlights the most important findings, and (2) a longer full-length analysis (around 400-1200 words) that discusses patterns, the most common mismatches, references specific example req_id values, provides technical recommendations, and suggests next steps for remediation. Return both clearly labelled.')
-    prompt = '\n\n'.join(prompt_lines)
-
-    # call Google Generative API (REST). Try known endpoint variants (v1 then v1beta2).
-    endpoints = [
-        f"https://generativelanguage.googleapis.com/v1/models/text-bison-001:generate?key={api_key}",
-        f"https://generativelanguage.googleapis.com/v1beta2/models/text-bison-001:generate?key={api_key}",
-    ]
-    payload = {
-        "prompt": {"text": prompt},
-        "temperature": 0.2,
-        "maxOutputTokens": 1500,
-    }
-
-    last_err = None
-    data = None
-    for url in endpoints:
-        try:
-            resp = requests.post(url, json=payload, timeout=90)
-            resp.raise_for_status()
-            data = resp.json()
-            break
-        except requests.HTTPError as he:
-            # if 404 or not found, try next endpoint; otherwise capture and return later
-            last_err = he
-            LOG.warning("Generative API HTTP error for %s: %s (response: %s)", url, he, getattr(he.response, 'text', None))
-            if he.response is not None and he.response.status_code == 404:
-                continue
-            else:
-                break
-        except Exception as e:
-            last_err = e
-            LOG.exception("Generative API request failed for %s: %s", url, e)
-            continue
-
-    if data is None:
-        # If the generative API is not available (404) or fails, provide a simulated analysis
-        LOG.info("Generative API not available, producing simulated analysis")
-        try:
-            # build a simulated structured result based on counts
-            sim_counts = counts or {}
-            matched = int(sim_counts.get('MATCHED', 0) or 0)
-            mism = int(sim_counts.get('MISMATCH', 0) or 0)
-            miss = int(sim_counts.get('MISSING', 0) or 0)
-            total = max(1, matched + mism + miss)
-            score = int(max(40, min(95, round((matched / total) * 100))))
-            # heuristics for timings (ms)
-            fcp = f"{int(800 + (100 - score) * 12)}ms"
-            lcp = f"{int(1400 + (100 - score) * 14)}ms"
-            tbt = f"{int(80 + (100 - score) * 4)}ms"
-            speedIndex = f"{int(900 + (100 - score) * 10)}ms"
-            advice = (
-                "Minimize main-thread work by deferring non-critical JavaScript, "
-                "compress and properly size images, and add explicit caching headers for static assets."
-            )
-            structured = {
-                "performanceScore": score,
-                "fcp": fcp,
-                "lcp": lcp,
-                "tbt": tbt,
-                "speedIndex": speedIndex,
-                "advice": advice,
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "examples": samples,
-            }
-            # short summary and a longer analysis text
-            # reference a few example req_ids in the long text to tie analysis to actual data
-            example_ids = [str(x.get('req_id')) for x in (samples or []) if x.get('req_id')][:3]
-            examples_str = ', '.join(example_ids) if example_ids else 'N/A'
-            short = f"Summary: overall score {score}. Most issues relate to resource loading and main-thread work. Example affected req_ids: {examples_str}."
-            long_lines = [short, "\nRecommendations:"]
-            long_lines.append("- Defer non-critical JavaScript and split bundles to reduce main-thread work.")
-            long_lines.append("- Optimize and compress images; use responsive image sizes.")
-            long_lines.append("- Apply caching and CDN for static assets; minimize time to first byte.")
-            long_text = "\n".join(long_lines)
-        except Exception as e:
-            LOG.exception("Failed to produce simulated analysis: %s", e)
-            return JSONResponse({"error": f"generative API call failed: {last_err}"}, status_code=500)
-
-        return JSONResponse({"analysis": long_text, "structured": structured, "simulated": True})
-
-    # attempt to extract content from known response shapes
-    text = None
-    try:
-        if isinstance(data, dict):
-            if 'candidates' in data and len(data['candidates']) > 0:
-                text = data['candidates'][0].get('content') or data['candidates'][0].get('output')
-            elif 'outputs' in data and len(data['outputs']) > 0:
-                out = data['outputs'][0]
-                text = out.get('content') or out.get('text')
-            elif 'output' in data and isinstance(data['output'], list) and len(data['output'])>0:
-                text = data['output'][0].get('content')
-            elif 'candidates' in data:
-                text = json.dumps(data['candidates'])
-            else:
-                text = json.dumps(data)
-        else:
-            text = str(data)
-    except Exception:
-        text = str(data)
-
-    return JSONResponse({"analysis": text})
+        result = await asyncio.shield(fut)
+    except Exception as e:
+        LOG.exception("Analysis of %s failed: %s", p, e)
+        return JSONResponse({"error": f"analysis failed: {e}"}, status_code=500)
+    return JSONResponse(result)
@@ -0,0 +1,39 @@
+import json
+
+from src import batch
+
+
+def test_run_batch_writes_report_per_pair_and_summary(tmp_path, monkeypatch):
+    schemas = {
+        "http://x/dev.json": [{"field_key": "firstName", "type": "text"}],
+        "http://x/prod.json": [{"field_key": "firstName", "type": "text"}, {"field_key": "email", "type": "email"}],
+    }
+
+    def fake_load(url, cache=None, stream=False):
+        if url not in schemas:
+            raise IOError("unreachable")
+        return schemas[url]
+
+    monkeypatch.setattr(batch, "load_schema_fields", fake_load)
+    loaded = []
+    real_load_requirements = batch.load_requirements
+    monkeypatch.setattr(batch, "load_requirements", lambda path: loaded.append(path) or real_load_requirements(path))
+    sheets = tmp_path / "sheets"
+    sheets.mkdir()
+    (sheets / "a.csv").write_text("req_id,field_key,type,required\n1,firstName,text,\n2,email,email,\n")
+    (sheets / "b.csv").write_text("req_id,field_key,type,required\n1,firstName,text,\n")
+    manifest = tmp_path / "batch.json"
+    manifest.write_text(json.dumps({"requirements": ["sheets/*.csv"], "schemas": [{"name": "dev", "url": "http://x/dev.json"}, {"name": "prod", "url": "http://x/prod.json"}]}))
+
+    reqs, names = batch.load_manifest(str(manifest))
+    out = tmp_path / "out"
+    assert batch.run_batch(reqs, names, str(out), fmt="csv", jobs=1) == 2
+    # each requirements file is parsed once for both schemas
+    assert sorted(loaded) == sorted(reqs)
+    assert sorted(p.name for p in out.iterdir()) == ["a__dev.csv", "a__prod.csv", "b__dev.csv", "b__prod.csv", batch.SUMMARY_NAME]
+    summary = json.loads((out / batch.SUMMARY_NAME).read_text())
+    assert summary["status_counts"] == {"MATCHED": 5, "MISMATCH": 0, "MISSING": 1, "POSSIBLE_MATCH": 0}
+    assert batch.run_batch(reqs, names, str(out), fmt="csv", fail_on=False, jobs=1) == 0
+
+    # a schema that cannot be fetched fails its pairs and the batch
+    assert batch.run_batch(reqs, {"gone": "http://x/gone.json"}, str(out), fmt="csv", fail_on=False, jobs=1) == 1
@@ -0,0 +1,22 @@
+from benchmarks.generators import generate_requirements, generate_schema
+from benchmarks.run import find_regressions
+from src.matcher import SchemaIndex, compare_all, count_statuses
+from src.schema_loader import extract_fields
+
+
+def test_generated_requirements_follow_the_ratios():
+    schema = generate_schema(200, depth=3, breadth=3, options=30, seed=1)
+    fields = extract_fields(schema)
+    assert len(fields) == 200
+    assert {k for f in fields for k in f["raw"]} >= {"field_key", "fieldKey", "name", "key"}
+
+    reqs = generate_requirements(fields, 100, exact=0.6, fuzzy=0.3, missing=0.1, seed=1)
+    counts = count_statuses(compare_all(reqs, SchemaIndex(fields)))
+    assert counts == {"MATCHED": 60, "MISMATCH": 0, "MISSING": 10, "POSSIBLE_MATCH": 30}
+
+
+def test_find_regressions_uses_threshold_and_noise_floor():
+    baselines = {"small": {"compare_all": 1.0, "extract_fields": 0.001}}
+    results = {"small": {"compare_all": 1.2, "extract_fields": 0.004, "write_report": 9.0}}
+    assert find_regressions(results, baselines, threshold=0.25) == []
+    assert find_regressions(results, baselines, threshold=0.1) == ["small compare_all: 1.2000s vs baseline 1.0000s (+20%)"]
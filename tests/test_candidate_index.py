@@ -0,0 +1,58 @@
+import random
+
+from rapidfuzz import fuzz
+
+from src.candidate_index import CandidateIndex
+from src import matcher
+from src.matcher import SchemaIndex, compare_all
+
+
+def test_shortlist_keeps_every_key_above_cutoff():
+    choices = ["firstName", "first name", "lastName", "email", "emailAddress", "zip", "a"]
+    index = CandidateIndex(choices)
+    for query in ["firstname", "name first", "emailAdress", "zip1", "a", ""]:
+        shortlist = set(index.shortlist(query, 85).tolist())
+        for i, choice in enumerate(choices):
+            if fuzz.token_sort_ratio(query, choice) >= 85:
+                assert i in shortlist
+
+
+def test_pruned_compare_matches_exhaustive():
+    schema = [{"field_key": k, "type": "text"} for k in ["firstName", "lastName", "emailAddress", "phone"]]
+    reqs = [{"req_id": str(i), "field_key": k} for i, k in enumerate(["firstname1", "email_address", "phone", "qq"])]
+    exhaustive = compare_all(reqs, SchemaIndex(schema))
+    pruned = compare_all(reqs, SchemaIndex(schema, prune=True))
+    assert pruned == exhaustive
+
+
+def test_pruned_rows_match_exhaustive_below_cutoff():
+    rnd = random.Random(0)
+    letters = "abcdefgh"
+    keys = ["".join(rnd.choice(letters) for _ in range(rnd.randint(4, 12))) for _ in range(300)]
+    schema = [{"field_key": k, "type": "text"} for k in keys]
+    reqs = [{"req_id": str(i), "field_key": "".join(rnd.choice(letters) for _ in range(rnd.randint(3, 12)))} for i in range(300)]
+    # MISSING rows only report the closest shortlisted key, so statuses and matches agree...
+    pruned = compare_all(reqs, SchemaIndex(schema, prune=True))
+    exhaustive = compare_all(reqs, SchemaIndex(schema))
+    assert [(r["status"], r["raw_json_path"]) for r in pruned] == [(r["status"], r["raw_json_path"]) for r in exhaustive]
+    # ...and without the closest-key lookup whole rows do
+    assert compare_all(reqs, SchemaIndex(schema, prune=True, closest_missing=False)) == compare_all(reqs, SchemaIndex(schema, closest_missing=False))
+
+
+def test_pruning_scores_exhaustively_only_for_empty_shortlists(monkeypatch):
+    scored = []
+    cdist = matcher.process.cdist
+
+    def counting_cdist(queries, *args, **kwargs):
+        scored.extend(queries)
+        return cdist(queries, *args, **kwargs)
+
+    monkeypatch.setattr(matcher.process, "cdist", counting_cdist)
+    schema = [{"field_key": k} for k in ["firstName", "lastName", "emailAddress", "phone"]]
+    reqs = [{"req_id": str(i), "field_key": k} for i, k in enumerate(["firstNme", "emailAddres", "emailAddrXYZ", "qq"])]
+    compare_all(reqs, SchemaIndex(schema, prune=True))
+    # "emailAddrXYZ" has a shortlist but no hit; only "qq" (no shared grams) goes to the exhaustive pass
+    assert scored == ["qq"]
+    scored.clear()
+    compare_all(reqs, SchemaIndex(schema, prune=True, closest_missing=False))
+    assert scored == []
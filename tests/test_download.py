@@ -0,0 +1,18 @@
+def test_download_serves_byte_ranges(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from src import ui
+    from src.report_catalog import ReportCatalog
+
+    monkeypatch.setattr(ui, "REPORTS_DIR", tmp_path)
+    monkeypatch.setattr(ui, "REPORT_CATALOG", ReportCatalog(tmp_path))
+    report = tmp_path / "report.csv"
+    report.write_text("req_id,field_key,status\n1,firstName,MATCHED\n")
+    size = report.stat().st_size
+
+    # no lifespan: its shutdown would close the pools other tests share
+    resp = TestClient(ui.app).get("/download", params={"path": str(report)}, headers={"Range": "bytes=0-5", "Accept-Encoding": "gzip"})
+    assert resp.status_code == 206
+    assert resp.headers["content-range"] == f"bytes 0-5/{size}"
+    assert "content-encoding" not in resp.headers
+    assert resp.content == b"req_id"
@@ -0,0 +1,53 @@
+from src.incremental import ComparisonState
+from src.matcher import SchemaIndex, compare_all
+
+
+def _run(state, reqs, schema):
+    index = SchemaIndex(schema)
+    state.prepare(index)
+    rows = compare_all(reqs, index, fuzzy=state.memo.best_matches)
+    return rows, state.record(reqs, rows)
+
+
+def test_incremental_run_matches_full_compare(tmp_path):
+    path = str(tmp_path / "state.pkl")
+    reqs = [
+        {"req_id": "1", "field_key": "firstName", "type": "text"},
+        {"req_id": "2", "field_key": "emailAdress", "type": "email"},
+        {"req_id": "3", "field_key": "phoneNumber", "type": "text"},
+    ]
+    schema = [{"field_key": "firstName", "type": "text"}, {"field_key": "phone", "type": "text"}]
+
+    state = ComparisonState.load(path)
+    rows, changes = _run(state, reqs, schema)
+    assert [c["before"] for c in changes] == [None, None, None]
+    state.save(path)
+
+    schema = [{"field_key": "phone", "type": "text"}, {"field_key": "emailAddress", "type": "email"}]
+    state = ComparisonState.load(path)
+    rows, changes = _run(state, reqs, schema)
+    assert rows == compare_all(reqs, SchemaIndex(schema))
+    assert {(c["req_id"], c["before"], c["after"]) for c in changes} == {("1", "MATCHED", "MISSING"), ("2", "MISSING", "POSSIBLE_MATCH")}
+    assert not any(c["requirement_changed"] for c in changes)
+    # phoneNumber keeps its match; only queries whose best key was removed are scored from scratch
+    assert state.memo.results["phoneNumber"][0] == "phone"
+    assert state.memo.scored == 2
+
+
+def test_validation_only_schema_change_recompares_rows(tmp_path):
+    path = str(tmp_path / "state.pkl")
+    reqs = [{"req_id": "1", "field_key": "firstName", "type": "text", "max_len": 20}]
+    schema = [{"field_key": "firstName", "type": "text", "validations": {"maxLength": 20}}]
+    state = ComparisonState.load(path)
+    rows, _ = _run(state, reqs, schema)
+    assert rows[0]["status"] == "MATCHED"
+    state.save(path)
+
+    schema = [{"field_key": "firstName", "type": "text", "validations": {"maxLength": 30}}]
+    state = ComparisonState.load(path)
+    assert state.prepare(SchemaIndex(schema)) == {"added": 0, "removed": 0, "changed": 1}
+    state = ComparisonState.load(path)
+    rows, changes = _run(state, reqs, schema)
+    assert rows == compare_all(reqs, SchemaIndex(schema))
+    assert rows[0]["status"] == "MISMATCH"
+    assert changes == [{"req_id": "1", "field_key": "firstName", "before": "MATCHED", "after": "MISMATCH", "requirement_changed": False}]
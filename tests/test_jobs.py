@@ -0,0 +1,92 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+import pytest
+
+from src.jobs import JobManager, JobQueueFull
+from src.schema_loader import SchemaCache
+
+
+def test_job_manager_limits_queue_and_reports_results():
+    async def scenario():
+        manager = JobManager(concurrency=1, max_queue=2)
+        release = asyncio.Event()
+
+        async def work(job):
+            job.stage = "working"
+            await release.wait()
+            return {"ok": job.id}
+
+        first = manager.submit(work)
+        second = manager.submit(work)
+        with pytest.raises(JobQueueFull):
+            manager.submit(work)
+
+        await asyncio.sleep(0)
+        assert first.status == "running" and second.status == "queued"
+        release.set()
+        await asyncio.sleep(0.01)
+        assert first.result == {"ok": first.id}
+        assert manager.get(second.id).to_dict()["status"] == "done"
+
+        async def boom(job):
+            raise ValueError("bad input")
+
+        failed = manager.submit(boom)
+        await asyncio.sleep(0.01)
+        assert failed.status == "failed" and failed.error == "bad input"
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_jobs_write_separate_reports(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from src import ui
+    from src.report_catalog import ReportCatalog
+
+    schema = {"fields": [{"name": "firstName", "type": "text"}, {"name": "email", "type": "email"}]}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(schema).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(ui, "REPORTS_DIR", tmp_path)
+    monkeypatch.setattr(ui, "REPORT_CATALOG", ReportCatalog(tmp_path))
+    monkeypatch.setattr(ui, "SCHEMA_CACHE", SchemaCache(tmp_path / "cache"))
+    form = {"schema_url": f"http://127.0.0.1:{server.server_port}/schema.json", "format": "csv"}
+    upload = "req_id,field_key,type,required\n1,firstName,text,yes\n2,emial,email,no\n"
+    try:
+        with TestClient(ui.app) as client:
+            # both jobs are queued before either runs, so their reports start in the same second
+            ids = [client.post("/jobs", data=form, files={"file": ("reqs.csv", upload)}).json()["id"] for _ in range(2)]
+            reports = []
+            for job_id in ids:
+                for _ in range(200):
+                    status = client.get(f"/jobs/{job_id}").json()
+                    if status["status"] not in ("queued", "running"):
+                        break
+                    time.sleep(0.02)
+                assert status["status"] == "done", status
+                reports.append(status["report"])
+            result = client.get(f"/jobs/{ids[0]}/result", params={"limit": 1}).json()
+    finally:
+        server.shutdown()
+    assert reports[0]["path"] != reports[1]["path"]
+    assert "rows" not in ui.JOBS.get(ids[0]).result
+    assert result["total"] == 2 and [r["req_id"] for r in result["rows"]] == ["1"]
+    assert reports[0]["id"] != reports[1]["id"]
+    assert sorted(p.name for p in tmp_path.glob("report_*.csv")) == sorted(Path(r["path"]).name for r in reports)
@@ -1,4 +1,4 @@
-from src.matcher import compare_requirement_to_schema
+from src.matcher import SchemaIndex, compare_all, compare_requirement_to_schema, count_statuses, fuzzy_best_matches
 
 
 def test_compare_exact_match():
@@ -6,3 +6,31 @@ def test_compare_exact_match():
     schema = [{"field_key": "firstName", "type": "text", "required": True}]
     rep = compare_requirement_to_schema(req, schema)
     assert rep["status"] == "MATCHED"
+
+
+def test_compare_all_with_index():
+    schema = [
+        {"field_key": "firstName", "type": "text", "required": True},
+        {"field_key": "emailAddress", "type": "email", "required": False, "options": None},
+        {"field_key": "country", "type": "select", "options": {"a": "US", "b": "CA"}},
+    ]
+    reqs = [
+        {"req_id": "1", "field_key": "FIRSTNAME", "type": "Text", "required": True},
+        {"req_id": "2", "field_key": "email address", "type": "email", "required": True},
+        {"req_id": "3", "field_key": "country", "type": "select", "options": ["us", "mx"]},
+        {"req_id": "4", "field_key": "zzz", "type": "text"},
+    ]
+    index = SchemaIndex(schema)
+    rows = compare_all(reqs, index)
+    assert [r["status"] for r in rows] == ["MATCHED", "MISSING", "MISMATCH", "MISSING"]
+    assert rows[2]["differences"].startswith("options differ")
+    assert rows == [compare_requirement_to_schema(r, schema) for r in reqs]
+    assert count_statuses(rows) == {"MATCHED": 1, "MISMATCH": 1, "MISSING": 2, "POSSIBLE_MATCH": 0}
+
+
+def test_fuzzy_best_matches_cutoff():
+    choices = ["first name", "email", "name first"]
+    keys, scores = fuzzy_best_matches(["name first", "zip"], choices, score_cutoff=85)
+    # ties resolve to the first choice, like process.extractOne
+    assert keys == ["first name", None]
+    assert scores[0] == 100 and scores[1] == 0
@@ -0,0 +1,16 @@
+from src.matcher import SchemaIndex
+from src.matrix import compare_matrix, matrix_columns
+
+
+def test_compare_matrix_flags_diverging_rows():
+    dev = SchemaIndex([{"field_key": "firstName", "type": "text", "required": True}, {"field_key": "email", "type": "email"}])
+    prod = SchemaIndex([{"field_key": "firstName", "type": "text", "required": False}, {"field_key": "email", "type": "email"}])
+    reqs = [
+        {"req_id": "1", "field_key": "firstName", "type": "text", "required": True},
+        {"req_id": "2", "field_key": "email", "type": "email"},
+    ]
+    rows, counts = compare_matrix(reqs, {"dev": dev, "prod": prod})
+    assert list(rows[0]) == matrix_columns(["dev", "prod"])
+    assert rows[0]["diverges"] and rows[0]["divergence"] == "dev=MATCHED, prod=MISMATCH"
+    assert not rows[1]["diverges"] and rows[1]["dev:status"] == rows[1]["prod:status"] == "MATCHED"
+    assert counts["prod"]["MISMATCH"] == 1
@@ -0,0 +1,23 @@
+from src.metrics import MetricsRegistry, Timings
+
+
+def test_timings_render_as_cumulative_histograms():
+    timings = Timings()
+    with timings.stage("match"):
+        pass
+    with timings.stage("load_requirements"):
+        pass
+    timings.set("rows", 250)
+    timings.set("fields", None)
+    assert timings.server_timing().startswith("load_requirements;dur=")
+    assert set(timings.values) == {"rows"}
+
+    metrics = MetricsRegistry()
+    metrics.record(timings, "api_compare")
+    metrics.record(timings, "api_compare")
+    text = metrics.render()
+    assert 'qapilot_stage_seconds_bucket{stage="match",le="+Inf"} 2' in text
+    assert 'qapilot_comparison_rows_bucket{le="100"} 0' in text
+    assert 'qapilot_comparison_rows_bucket{le="1000"} 2' in text
+    assert "qapilot_comparison_rows_sum 500" in text
+    assert 'qapilot_comparisons_total{endpoint="api_compare"} 2' in text
@@ -0,0 +1,13 @@
+from src.matcher import SchemaIndex, compare_all
+from src.records import Requirement
+
+
+def test_requirement_normalizes_once_and_reads_like_a_dict():
+    req = Requirement.from_dict({"req_id": "1", "field_key": " Country ", "type": " Select", "options": ["US ", "ca"], "regex": " ^x$ "})
+    assert (req.key, req.key_lower, req.type_norm, req.regex_norm) == ("Country", "country", "select", "^x$")
+    assert req.options_norm == frozenset({"us", "ca"})
+    assert req["options"] == ["US ", "ca"] and req.get("label") is None and req.get("nope", 1) == 1
+    assert Requirement.from_dict(req.to_dict()) == req
+
+    index = SchemaIndex([{"field_key": "country", "type": "select", "options": ["us", "mx"]}])
+    assert compare_all([req], index) == compare_all([req.to_dict()], index)
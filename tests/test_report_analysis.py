@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.report_analysis import BACKENDS, AnalysisBackend, GenerativeBackend, cached_analysis, make_backend, register_backend, store_analysis
+from src.report_writer import remove_sidecars, sidecar_paths, write_report
+
+
+def test_analysis_is_cached_per_report_content(tmp_path):
+    report = tmp_path / "report.csv"
+    rows = [{"req_id": "1", "field_key": "a", "status": "MISMATCH", "differences": "type differs"}]
+    write_report(rows, str(report), fmt="csv", sidecars=True)
+
+    assert cached_analysis(str(report), "genai") is None
+    store_analysis(str(report), "genai", {"analysis": "text"})
+    assert cached_analysis(str(report), "genai") == {"analysis": "text"}
+    assert cached_analysis(str(report), "local") is None
+
+    # same content written again keeps the analysis, new content drops it
+    write_report(rows, str(report), fmt="csv", sidecars=True)
+    assert cached_analysis(str(report), "genai") == {"analysis": "text"}
+    write_report(rows * 2, str(report), fmt="csv", sidecars=True)
+    assert cached_analysis(str(report), "genai") is None
+
+    store_analysis(str(report), "genai", {"analysis": "text"})
+    remove_sidecars(str(report))
+    assert not (tmp_path / sidecar_paths(str(report))[3]).exists()
+
+
+def test_generative_backend_skips_missing_endpoints():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path == "/v1/generate":
+            return httpx.Response(404)
+        return httpx.Response(200, json={"candidates": [{"content": "analysis"}]})
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        backend = GenerativeBackend("test", ["http://llm/v1/generate", "http://llm/v2/generate"], lambda: client)
+        summary = {"status_counts": {"MISMATCH": 1}, "samples": []}
+        first = await backend.analyze(summary)
+        second = await backend.analyze(summary)
+        await client.aclose()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second == {"analysis": "analysis"}
+    assert calls == ["/v1/generate", "/v2/generate", "/v2/generate"]
+
+
+def test_incomplete_backends_fail_before_the_first_request():
+    class Incomplete(AnalysisBackend):
+        name = "incomplete"
+
+        def __init__(self, client=None):
+            pass
+
+    with pytest.raises(TypeError):
+        register_backend("incomplete", Incomplete)
+    register_backend("incomplete", lambda client: Incomplete())
+    try:
+        with pytest.raises(TypeError):
+            make_backend("incomplete", lambda: None)
+    finally:
+        BACKENDS.pop("incomplete")
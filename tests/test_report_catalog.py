@@ -0,0 +1,30 @@
+from src.report_catalog import ReportCatalog
+from src.report_writer import write_report
+
+
+def _report(directory, name, statuses):
+    path = directory / name
+    rows = [{"req_id": str(i), "field_key": f"k{i}", "status": s} for i, s in enumerate(statuses)]
+    write_report(rows, str(path), fmt="csv", sidecars=True)
+    return path
+
+
+def test_catalog_query_and_sync(tmp_path):
+    catalog = ReportCatalog(tmp_path)
+    a = _report(tmp_path, "report_a.csv", ["MATCHED", "MISMATCH"])
+    catalog.add(str(a), schema_url="http://example/schema.json", requirements_name="reqs.csv")
+    b = _report(tmp_path, "report_b.csv", ["MATCHED"])
+
+    # report_b was written behind the catalog's back
+    assert catalog.sync() == (1, 0)
+    total, items = catalog.query(sort="name", order="asc")
+    assert total == 2 and [i["name"] for i in items] == ["report_a.csv", "report_b.csv"]
+    assert items[0]["counts"]["MISMATCH"] == 1 and items[0]["requirements_name"] == "reqs.csv"
+
+    assert catalog.query(status="MISMATCH")[0] == 1
+    assert catalog.query(q="schema.json")[1][0]["name"] == "report_a.csv"
+    assert [i["name"] for i in catalog.query(limit=1, offset=1, sort="name")[1]] == ["report_a.csv"]
+
+    b.unlink()
+    assert catalog.sync() == (0, 1)
+    assert catalog.get(items[1]["id"]) is None
@@ -0,0 +1,32 @@
+import sqlite3
+
+from src.report_rows import _like_prefix, query_rows
+from src.report_writer import sidecar_paths, write_report
+
+
+def test_query_rows_filters_and_pages(tmp_path):
+    path = tmp_path / "report.csv"
+    rows = [
+        {"req_id": str(i), "field_key": f"email{i}" if i % 2 else f"name{i}", "status": "MISMATCH" if i % 3 == 0 else "MATCHED", "best_match_key": None}
+        for i in range(30)
+    ]
+    write_report(rows, str(path), fmt="csv", sidecars=True)
+
+    total, page = query_rows(str(path), status="mismatch", offset=2, limit=3)
+    assert total == 10
+    assert [r["req_id"] for r in page] == ["6", "9", "12"]
+
+    total, page = query_rows(str(path), q="EMAIL", status="MATCHED", limit=100)
+    assert total == 10 and all(r["field_key"].startswith("email") for r in page)
+    # q is a prefix, answered from the NOCASE indexes
+    assert query_rows(str(path), q="mail")[0] == 0
+    db = sqlite3.connect(sidecar_paths(str(path))[2])
+    plan = db.execute("EXPLAIN QUERY PLAN SELECT seq FROM rows WHERE field_key LIKE ? ESCAPE '\\'", [_like_prefix("e")]).fetchall()
+    db.close()
+    assert "INDEX rows_field_key" in plan[0][-1]
+
+    # the index is built once and reused while the report is unchanged
+    index_path = sidecar_paths(str(path))[2]
+    built = (tmp_path / index_path).stat().st_mtime_ns
+    query_rows(str(path))
+    assert (tmp_path / index_path).stat().st_mtime_ns == built
@@ -0,0 +1,20 @@
+from src.report_visuals import cached_report_visuals, evict_orphaned_visuals, generate_report_visuals, visuals_dir
+from src.report_writer import write_report
+
+
+def test_visuals_are_cached_per_report_version(tmp_path):
+    report = tmp_path / "report.csv"
+    rows = [{"req_id": "1", "field_key": "a", "status": "MISMATCH", "differences": "type differs"}]
+    write_report(rows, str(report), fmt="csv", sidecars=True)
+
+    assert cached_report_visuals(str(report), tmp_path) is None
+    images = generate_report_visuals(str(report), tmp_path)
+    assert cached_report_visuals(str(report), tmp_path) == images
+
+    # a rewritten report invalidates its images
+    write_report(rows * 2, str(report), fmt="csv", sidecars=True)
+    assert cached_report_visuals(str(report), tmp_path) is None
+
+    report.unlink()
+    assert evict_orphaned_visuals(tmp_path) == 1
+    assert not visuals_dir(str(report), tmp_path).exists()
@@ -0,0 +1,105 @@
+import gzip
+import os
+
+from src import report_writer
+from src.report_writer import (
+    REPORT_FORMATS,
+    ReportWriter,
+    gzip_sidecar,
+    load_report_summary,
+    read_report,
+    remove_sidecars,
+    report_format,
+    sidecar_paths,
+    write_report,
+)
+
+
+def test_write_report_formats_round_trip(tmp_path):
+    rows = [
+        {"req_id": "1", "field_key": "a", "status": "MATCHED", "best_match_score": 100},
+        {"req_id": "2", "field_key": "b", "status": "MISSING", "best_match_score": None},
+    ]
+    for fmt in ("excel", "csv", "csv.gz"):
+        out = tmp_path / f"report{REPORT_FORMATS[fmt]}"
+        assert write_report(iter(rows), str(out), fmt=fmt) == 2
+        assert report_format(str(out)) == fmt
+        df = read_report(str(out))
+        assert list(df.columns) == ["req_id", "field_key", "status", "best_match_score"]
+        assert df["status"].tolist() == ["MATCHED", "MISSING"]
+
+
+def test_report_writer_streams_blocks(tmp_path):
+    out = tmp_path / "report.csv"
+    with ReportWriter(str(out), "csv") as writer:
+        writer.write_rows([{"req_id": "1", "status": "MATCHED"}])
+        writer.write_rows([{"req_id": "2", "status": "MISSING"}])
+    assert writer.rows_written == 2
+    assert out.read_text().splitlines() == ["req_id,status", "1,MATCHED", "2,MISSING"]
+
+
+def test_sidecar_summary(tmp_path):
+    out = tmp_path / "report.csv"
+    rows = [
+        {"req_id": str(i), "field_key": f"k{i}", "status": "MISMATCH" if i % 3 else "MATCHED", "best_match_key": f"k{i}", "differences": "x" * i}
+        for i in range(12)
+    ]
+    write_report(rows, str(out), fmt="csv", sidecars=True)
+    summary = load_report_summary(str(out))
+    assert summary["rows"] == 12
+    assert summary["status_counts"] == {"MISMATCH": 8, "MATCHED": 4}
+    assert [t["field_key"] for t in summary["top_differences"][:2]] == ["k11", "k10"]
+    assert [s["req_id"] for s in summary["samples"]] == ["1", "2", "4", "5", "7", "8", "10", "11", "0", "3"]
+
+    # a report without a summary gets one computed from its rows
+    remove_sidecars(str(out))
+    assert load_report_summary(str(out))["status_counts"] == summary["status_counts"]
+
+
+def test_gzip_sidecar_is_reused_until_the_report_changes(tmp_path):
+    report = tmp_path / "report.csv"
+    write_report([{"req_id": "1", "status": "MATCHED"}], str(report), fmt="csv")
+    gz_path = gzip_sidecar(str(report))
+    assert gzip.decompress(open(gz_path, "rb").read()) == report.read_bytes()
+    mtime = os.stat(gz_path).st_mtime_ns
+    assert gzip_sidecar(str(report)) == gz_path and os.stat(gz_path).st_mtime_ns == mtime
+
+    os.utime(gz_path, ns=(mtime - 10**10, mtime - 10**10))
+    write_report([{"req_id": "2", "status": "MISSING"}], str(report), fmt="csv")
+    assert gzip.decompress(open(gzip_sidecar(str(report)), "rb").read()) == report.read_bytes()
+    assert report_format(gz_path) is None
+    remove_sidecars(str(report))
+    assert not os.path.exists(gz_path)
+
+
+def test_report_writer_discards_partial_output(tmp_path):
+    path = tmp_path / "report.csv"
+    try:
+        with ReportWriter(str(path), "csv", sidecars=True) as writer:
+            writer.write_rows([{"req_id": "1", "status": "MATCHED"}])
+            raise RuntimeError("client went away")
+    except RuntimeError:
+        pass
+    assert os.listdir(tmp_path) == []
+
+
+def test_mixed_type_columns_do_not_fail_reports(tmp_path, monkeypatch):
+    # schema "type" values are arbitrary JSON, e.g. "text" on one field and 5 on another
+    monkeypatch.setattr(report_writer, "PARQUET_BATCH_ROWS", 2)
+    rows = [
+        {"req_id": "1", "actual_type": "text", "status": "MATCHED"},
+        {"req_id": "2", "actual_type": 5, "status": "MISMATCH"},
+        {"req_id": "3", "actual_type": None, "status": "MISSING"},
+        {"req_id": "4", "actual_type": 7, "status": "MISMATCH"},
+    ]
+    for fmt in ("excel", "parquet"):
+        path = tmp_path / f"mixed_{fmt}{REPORT_FORMATS[fmt]}"
+        write_report(rows, str(path), fmt=fmt, sidecars=True)
+        assert os.path.exists(sidecar_paths(str(path))[0]) == (fmt == "excel")
+        assert read_report(str(path))["actual_type"].fillna("").tolist() == ["text", "5", "", "7"]
+
+    # numbers first and text in a later batch cannot share a column: the sidecar is skipped, the report is not
+    path = tmp_path / "numbers_first.csv"
+    write_report([{"actual_type": 5}, {"actual_type": 6}, {"actual_type": "text"}], str(path), fmt="csv", sidecars=True)
+    assert not os.path.exists(sidecar_paths(str(path))[0])
+    assert read_report(str(path))["actual_type"].tolist() == ["5", "6", "text"]
@@ -0,0 +1,43 @@
+import pytest
+
+from src.requirement_loader import iter_requirement_batches, load_requirements
+
+
+def test_load_requirements_coerces_columns(tmp_path):
+    path = tmp_path / "reqs.csv"
+    path.write_text(
+        "req_id,field_key,type,required,min_len,options\n"
+        "1, firstName ,text,Yes,3.0,\n"
+        "2,country,select,optional,x,\"US, CA,\"\n"
+        "3,email,email,,,US\n"
+    )
+    rows = load_requirements(str(path))
+    assert [r["field_key"] for r in rows] == ["firstName", "country", "email"]
+    assert [r["required"] for r in rows] == [True, False, None]
+    assert [r["min_len"] for r in rows] == [3, None, None]
+    assert [r["options"] for r in rows] == [None, ["US", "CA"], ["US"]]
+    assert rows[0]["label"] is None and rows[0]["max_len"] is None
+
+    batches = list(iter_requirement_batches(str(path), chunk_rows=2))
+    assert [len(b) for b in batches] == [2, 1]
+    assert [r for b in batches for r in b] == rows
+
+
+def test_load_requirements_missing_columns(tmp_path):
+    path = tmp_path / "reqs.csv"
+    path.write_text("req_id,type\n1,text\n")
+    with pytest.raises(ValueError):
+        load_requirements(str(path))
+
+
+def test_load_requirements_row_limit(tmp_path):
+    path = tmp_path / "reqs.csv"
+    path.write_text("req_id,field_key,type,required\n" + "".join(f"{i},f{i},text,yes\n" for i in range(5)))
+    assert len(load_requirements(str(path), max_rows=5)) == 5
+    with pytest.raises(ValueError, match="more than 4 rows"):
+        load_requirements(str(path), max_rows=4)
+    # the limit is checked per chunk, before later chunks are parsed
+    batches = iter_requirement_batches(str(path), chunk_rows=2, max_rows=3)
+    assert len(next(batches)) == 2
+    with pytest.raises(ValueError):
+        next(batches)
@@ -0,0 +1,68 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from src.schema_loader import SchemaCache, load_schema_fields
+
+SCHEMA = {"fields": [{"name": "firstName", "type": "text"}, {"name": "email", "type": "email"}]}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    statuses = []
+
+    def do_GET(self):
+        body = json.dumps(SCHEMA).encode()
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        _Handler.statuses.append(self.headers.get("If-None-Match"))
+
+    def log_message(self, *args):
+        pass
+
+
+def test_schema_cache_revalidates_with_etag(tmp_path):
+    server = HTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/schema.json"
+    try:
+        cache = SchemaCache(tmp_path, ttl=0)
+        first = load_schema_fields(url, cache=cache)
+        second = load_schema_fields(url, cache=cache)
+        assert [f["field_key"] for f in second] == [f["field_key"] for f in first] == ["firstName", "email"]
+        # the second fetch was conditional and answered with 304
+        assert _Handler.statuses == [None, '"v1"']
+
+        fresh = SchemaCache(tmp_path, ttl=3600)
+        load_schema_fields(url, cache=fresh)
+        assert len(_Handler.statuses) == 2
+    finally:
+        server.shutdown()
+
+
+def test_schema_cache_evicts_to_size(tmp_path):
+    cache = SchemaCache(tmp_path, max_bytes=10)
+    cache.put_fields("a" * 64, [{"field_key": "x" * 100}])
+    # the content just stored is never evicted, even when it alone exceeds max_bytes
+    assert cache.get_fields("a" * 64) == [{"field_key": "x" * 100}]
+    cache.put_fields("b" * 64, [{"field_key": "y" * 100}])
+    assert cache.get_fields("a" * 64) is None
+    assert cache.get_fields("b" * 64) is not None
+
+
+def test_schema_cache_keeps_oversized_body(tmp_path):
+    server = HTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/big.json"
+    try:
+        cache = SchemaCache(tmp_path, ttl=0, max_bytes=1)
+        fields = load_schema_fields(url, cache=cache)
+        assert [f["field_key"] for f in fields] == ["firstName", "email"]
+    finally:
+        server.shutdown()
@@ -1,5 +1,6 @@
+import io
 import json
-from src.schema_loader import extract_fields
+from src.schema_loader import extract_fields, extract_fields_stream
 
 
 def test_extract_fields_basic():
@@ -16,3 +17,21 @@ def test_extract_fields_basic():
     keys = {f["field_key"] for f in fields}
     assert "firstName" in keys
     assert "lastName" in keys
+
+
+def test_extract_fields_stream_matches_extract_fields():
+    data = {
+        "name": "form",
+        "sections": [
+            {"fields": [{"fieldKey": "email", "fieldType": "email", "validations": {"maxLength": 80}}]},
+            {"fields": [{"key": "country", "items": [{"id": "us", "label": "US"}], "mandatory": True}]},
+            {"fields": [{"name": "EMAIL", "label": "Email"}]},
+        ],
+    }
+
+    expected = extract_fields(data)
+    streamed = extract_fields_stream(io.BytesIO(json.dumps(data).encode()))
+    assert [f["raw_json_path"] for f in streamed] == [f["raw_json_path"] for f in expected]
+    for e, s in zip(expected, streamed):
+        assert {k: v for k, v in s.items() if k != "raw"} == {k: v for k, v in e.items() if k != "raw"}
+    assert streamed[1]["label"] == "Email"
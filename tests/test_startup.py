@@ -0,0 +1,31 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ("pandas", "matplotlib", "openpyxl", "requests", "pyarrow")
+
+
+def _python(code: str) -> str:
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True).stdout
+
+
+def _best_of(args, runs: int = 3) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, check=True, capture_output=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_startup_does_not_import_heavy_modules():
+    check = "import sys; print(' '.join(m for m in %r if m in sys.modules))" % (HEAVY,)
+    assert _python("import src.cli; " + check).split() == []
+    assert _python("import src.ui; " + check).split() == []
+
+
+def test_cli_help_is_faster_than_importing_pandas():
+    # relative, so the guard holds on slow and fast machines alike
+    assert _best_of(["main.py", "--help"]) < _best_of(["-c", "import pandas"])